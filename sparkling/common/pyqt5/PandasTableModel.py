@@ -22,10 +22,13 @@ log = logging.getLogger(__name__)
 
 # embedded in python
 from natsort import index_natsorted
+from re import ( compile as recompile, error as reerror, IGNORECASE )
 # pip install
-from numpy import argsort
+from numpy import ( arange, argsort, asarray, concatenate, cumsum, delete as npdelete,
+    empty, float64, int64, isin, lexsort, ones, searchsorted, sort as npsort, unique, zeros )
 import pandas as pd
-from PyQt5.QtCore import ( Qt, QAbstractTableModel )
+from pandas.api.types import is_numeric_dtype
+from PyQt5.QtCore import ( Qt, QAbstractTableModel, QModelIndex )
 # same project
 from sparkling.common.enums.MimeTypes import EMimeTypes
 from sparkling.common.BaseColumns import BaseColumns
@@ -45,6 +48,33 @@ class ColumnsMimeText( BaseColumns ):
     # i want to select specific rowilocs
     set_selected_rowilocs = 'set_selected_rowilocs'
     
+class ColumnsQuickFilter( BaseColumns ):
+    
+    # `PandasTableModel.quick_filter` returns a dictionary
+    # with these keys.
+    
+    # every term must be found among row values
+    terms = 'terms'
+    
+    # key = column, value = term or `callable( pd.Series of str )`
+    # that returns a boolean mask
+    columns = 'columns'
+    
+    # terms are regular expressions, not substrings
+    regex = 'regex'
+
+# appended rows wait in a buffer until there are
+# at least this many of them (or as many as the rest of rows)
+APPEND_BUFFER_ROWS_DEFAULT = 1000
+
+# separates values in search strings, so that a term
+# can't match the end of one value and the start of another
+SEARCH_SEPARATOR = '\x1f'
+
+# every removed range of rows costs a copy of `df`,
+# more ranges than this are removed at once
+REMOVE_RANGES_MAX = 16
+    
 #     @classmethod
 #     def encode_into_text( cls, dictionary ):
 #         items = []
@@ -61,33 +91,263 @@ class ColumnsMimeText( BaseColumns ):
 #             dictionary[k] = v
 #         return dictionary
 
+def _render_strings( s ):
+    
+    # Converts column values into strings
+    # exactly the way they are shown, all at once.
+    
+    return s.fillna( '' ).astype( str ).to_numpy( dtype=object )
+
+def _search_strings( df ):
+    
+    # All values of every row joined into a single
+    # lowercase string, built column by column.
+    
+    strings = pd.Series( '', index=df.index, dtype=object )
+    for coliloc in range( df.columns.size ):
+        strings = strings + SEARCH_SEPARATOR + _render_strings( df.iloc[ :, coliloc ] )
+    
+    return strings.str.lower()
+
+def _natural_ranks( s ):
+    
+    # Dense ranks of column values in natural order
+    # (`2` < `10`, numbers between strings are compared
+    # as numbers), equal values share the same rank.
+    # Vectorized whenever values are numbers.
+    
+    if is_numeric_dtype( s ):
+        return s.rank( method='dense', na_option='bottom' ).to_numpy( dtype=int64 )
+    
+    if s.astype( str ).str.fullmatch( r'\d+' ).all():
+        # whole numbers stored as str, natsort sees
+        # signs and decimal points as text
+        return pd.to_numeric( s ).rank( method='dense' ).to_numpy( dtype=int64 )
+    
+    values = _render_strings( s )
+    if len( values )==0:
+        return empty( 0, dtype=int64 )
+    
+    # the slow part, once per column
+    order = asarray( index_natsorted( values ), dtype=int64 )
+    ordered = values[ order ]
+    is_new_value = concatenate([ [0], ( ordered[1:] != ordered[:-1] ).astype( int64 ) ])
+    
+    ranks = empty( len(values), dtype=int64 )
+    ranks[ order ] = cumsum( is_new_value )
+    return ranks
+
 class PandasTableModel( QAbstractTableModel ):
     
-    # will hold `pd.DataFrame`
+    # `df` will hold `pd.DataFrame`
     # use `TableView.switch_df` to set it
-    df = None
+    # (see the property below)
+    __df = None
+    
+    # appended rows that are not in `__df` yet:
+    # a list of df chunks and their shown strings,
+    # one list per column; they are consolidated
+    # whenever `df` is needed
+    __pending = None # future list
+    __pending_display = None # future list
+    __n_pending = 0
+    # whether pending rows are numbered by their positions,
+    # see `add_rows`
+    __is_pending_renumbered = True
     
     # i set/use them in `TableView.switch_df`
     # purely artificial artifact
     columns_to_hide = None
     
+    # `df.index` values of rows that were edited, moved
+    # or inserted since `df` was last saved somewhere,
+    # see `dirty_subdf` and `mark_clean`
+    dirty_locs = None # future set
+    
+    # shown strings, one numpy array per column,
+    # rendered on first paint of that column;
+    # `None` = nothing is rendered
+    # Lazy on purpose: nodes may have hundreds of properties
+    # and most columns are hidden, so `switch_df` would
+    # render a lot of strings that nobody ever sees.
+    __display = None # future list
+    
+    # key = column, value = `pd.Series` of natural ranks
+    # with the same index as `df`, see `_natural_ranks`;
+    # survives sorting, reordering, appending and deleting rows
+    __sort_keys = None # future dictionary
+    
+    # `[ ( column, is_asc ) ]`, the first one is the most important
+    __sort_columns = None # future list
+    
+    # quick filter, see `set_quick_filter`;
+    # `None` = all rows are shown
+    __quick_filter = None # future dictionary
+    
+    # `df` positions of shown rows, ascending;
+    # `None` = all rows are shown
+    __row_map = None # future numpy array
+    
+    # lowercase values of each row, `pd.Series`
+    # with the same index as `df`, see `_search_strings`
+    __search_text = None
+    
+    # lazy mode, see `set_page_source`
+    __fetch_page = None
+    __page_size = None
+    __is_fetching = False
+    # sorted rows wait for the rest of the pages, see `sort_by`
+    __is_fetching_rest = False
+    __is_in_fetch_rest = False
+    
     def __init__( self,
                   parent=None,
                   *args, **kwargs ):
         super( PandasTableModel, self ).__init__(
             parent, *args, **kwargs )
         
-        self.df = pd.DataFrame()
+        self.__replace_df( pd.DataFrame() )
         self.columns_to_hide = None
+        self.dirty_locs = set()
+        self.__sort_keys = {}
+        self.__sort_columns = []
 
+    @property
+    def df( self ):
+        
+        # Read-only outside of this class: whatever is
+        # written directly into it is not shown and
+        # not remembered by caches. Use `switch_df`,
+        # `replace_subdf`, `add_column` and others.
+        
+        self.__consolidate()
+        return self.__df
+    
+    @df.setter
+    def df( self, df ):
+        # same as `switch_df`
+        self.switch_df( df )
+    
+    def __replace_df( self, df ):
+        
+        # `df` is replaced, caches are
+        # taken care of by whoever calls me.
+        
+        self.__df = df
+        self.__pending = []
+        self.__pending_display = None
+        self.__n_pending = 0
+        self.__is_pending_renumbered = True
+    
     def rowCount( self, parent=None ):
         # Reserved `PyQt5` method.
-        return len( self.df.index )
+        if self.__row_map is None:
+            return len( self.__df.index ) + self.__n_pending
+        return len( self.__row_map )
 
     def columnCount( self, parent=None ):
         # Reserved `PyQt5` method.
-        return self.df.columns.size
+        return self.__df.columns.size
 
+    def canFetchMore( self, parent=QModelIndex() ):
+        
+        # Reserved `PyQt5` method. Is called when
+        # GUI scrolled to the last rows.
+        
+        if parent.isValid():
+            # tables have no children
+            return False
+        
+        return not self.__fetch_page is None
+    
+    def fetchMore( self, parent=QModelIndex() ):
+        
+        # Reserved `PyQt5` method.
+        # Requests the next page of rows, they are
+        # appended whenever they arrive.
+        
+        if not self.canFetchMore( parent ) or self.__is_fetching:
+            return
+        
+        self.__is_fetching = True
+        fetch_page = self.__fetch_page
+        
+        def page_received( df ):
+            self.__page_received_event( fetch_page, df )
+        
+        fetch_page( self.__page_size, page_received )
+    
+    def __page_received_event( self, fetch_page, df ):
+        
+        # I end up here when a page requested
+        # in `fetchMore` was downloaded.
+        
+        if not fetch_page is self.__fetch_page:
+            # contents were replaced meanwhile
+            return
+        
+        self.__is_fetching = False
+        
+        if df is None:
+            log.error( 'failed to fetch more rows, no more rows will be fetched' )
+            self.__fetch_page = None
+            self.__is_fetching_rest = False
+            return
+        if len( df.index ) < self.__page_size:
+            # last page
+            self.__fetch_page = None
+        
+        # rows from another page may have other properties,
+        # `__append_rows` takes care of it
+        self.__append_rows( df )
+        
+        if not self.__is_fetching_rest:
+            return
+        if self.is_complete():
+            # all rows are here, sorting is right at last
+            self.__is_fetching_rest = False
+            self.__sort()
+            return
+        self.__fetch_rest()
+    
+    def __fetch_rest( self ):
+        
+        # Fetches pages one after another until the last one,
+        # see `sort_by`. Pages that arrive right away are
+        # fetched by this loop, pages downloaded in background
+        # call me again from `__page_received_event`.
+        
+        if self.__is_in_fetch_rest:
+            return
+        
+        self.__is_in_fetch_rest = True
+        while self.__is_fetching_rest and not self.is_complete() and not self.__is_fetching:
+            self.fetchMore()
+        self.__is_in_fetch_rest = False
+    
+    def set_page_source( self, fetch_page, page_size ):
+        
+        # My custom method. I may use it manually.
+        # Current `df` is only the beginning:
+        # `fetch_page( page_size, page_received )` downloads
+        # the next `page_size` rows, in background if it wants to,
+        # and calls `page_received( df )` in GUI thread
+        # (`None` on failure, a shorter df = the last page).
+        # Pages are fetched whenever GUI scrolls to the end.
+        # Sorting turns paging off, see `sort_by`.
+        
+        self.__fetch_page = fetch_page
+        self.__page_size = page_size
+        self.__is_fetching = False
+        self.__is_fetching_rest = False
+    
+    def is_complete( self ):
+        
+        # My custom method. I may use it manually.
+        # Whether all rows are here.
+        
+        return self.__fetch_page is None
+    
     def flags( self, index ):
         
         # Reserved `PyQt5` method.
@@ -122,8 +382,11 @@ class PandasTableModel( QAbstractTableModel ):
 
         if role == Qt.DisplayRole:
             # just showing
-            value = self.df.iloc[ index.row(), index.column() ]
-            return '' if pd.isna(value) else str(value)
+            rowiloc = index.row() if self.__row_map is None else self.__row_map[ index.row() ]
+            n_consolidated = len( self.__df.index )
+            if rowiloc >= n_consolidated:
+                return self.__pending_display[ index.column() ][ rowiloc-n_consolidated ]
+            return self.__display_column( index.column() )[ rowiloc ]
 
     def setData( self, index, value, role=Qt.EditRole ):
         
@@ -132,7 +395,12 @@ class PandasTableModel( QAbstractTableModel ):
         # to the underlying array.
         
         if role==Qt.EditRole:
-            self.df.iloc[ index.row(), index.column() ] = str(value)
+            rowiloc = index.row() if self.__row_map is None else self.__row_map[ index.row() ]
+            self.df.iloc[ rowiloc, index.column() ] = str(value)
+            self.__display_column( index.column() )[ rowiloc ] = str(value)
+            self.__sort_keys.pop( self.df.columns[ index.column() ], None )
+            self.__forget_search_text([ self.df.index[ rowiloc ] ])
+            self.dirty_locs.add( self.df.index[ rowiloc ] )
             self.dataChanged.emit( index, index )
             return True
 
@@ -148,7 +416,7 @@ class PandasTableModel( QAbstractTableModel ):
         if orientation==Qt.Horizontal and role==Qt.DisplayRole:
             # table header, just showing
             if self.columnCount()==0: return 'NODATA'
-            return self.df.columns[iloc]
+            return self.__df.columns[iloc]
 
         return None
         
@@ -160,26 +428,68 @@ class PandasTableModel( QAbstractTableModel ):
         # help:
         # https://www.saltycrane.com/blog/2007/12/pyqt-43-qtableview-qabstracttablemodel/
         
-        if coliloc >= self.columnCount(): return
+        if coliloc < 0 or coliloc >= self.columnCount(): return
         
-        self.layoutAboutToBeChanged.emit()
-        
-        col = self.df.columns[ coliloc ]
+        # a single column, see `sort_by`
         is_asc = True if sort_order==Qt.AscendingOrder else False
+        self.sort_by([ ( self.df.columns[ coliloc ], is_asc ) ])
+        
+    def sort_by( self, sort_columns ):
+        
+        # My custom method. I may use it manually.
+        # Sorts by `[ ( column, is_asc ) ]`,
+        # the first column is the most important.
+        # If there are pages left (see `set_page_source`),
+        # rows that are here are sorted right away,
+        # the rest of the pages are fetched one after another
+        # and all rows are sorted again after the last one:
+        # rows of a page can't be appended after sorted rows.
+        
+        sort_columns = [ ( col, bool(is_asc) ) for col, is_asc in sort_columns if col in self.df.columns ]
+        if len( sort_columns )==0:
+            return
+        self.__sort_columns = sort_columns
+        
+        self.__sort()
+        
+        if not self.is_complete():
+            self.__is_fetching_rest = True
+            self.__fetch_rest()
     
-        # simple sorting
-        #self.df.sort_values( col, inplace=True, ascending=is_asc )
+    def __sort( self ):
         
-        # natural sorting between numbers ans strings
-        # help:
-        # https://pandas.pydata.org/pandas-docs/stable/reference/api/pandas.DataFrame.sort_values.html
-        self.df.sort_values(
-            col, inplace=True, ascending=is_asc,
-            key=lambda x: argsort( index_natsorted(self.df[col]) )
-            )
+        # Sorts rows by `__sort_columns`, see `sort_by`.
+        
+        sort_columns = self.sort_columns()
+        if len( sort_columns )==0:
+            return
+        
+        self.layoutAboutToBeChanged.emit()
+        
+        old_index = self.df.index
+    
+        # natural sorting between numbers ans strings,
+        # stable: equal rows keep their current order;
+        # `lexsort` wants the most important key last
+        keys = []
+        for c, a in reversed( sort_columns ):
+            ranks = self.__sort_ranks( c )
+            keys.append( ranks if a else -ranks )
+        self.__replace_df( self.df.iloc[ lexsort( keys ) ] )
+        
+        self.__mark_moved( old_index )
+        self.__remap_rows( old_index )
+        self.__display = None
             
         self.layoutChanged.emit()
     
+    def sort_columns( self ):
+        
+        # My custom method. I may use it manually.
+        # Columns of the last `sort_by`, see there.
+        
+        return [ ( col, is_asc ) for col, is_asc in self.__sort_columns if col in self.df.columns ]
+    
     def supportedDragActions( self ):
         
         # The user `drags` something from here.
@@ -335,11 +645,13 @@ class PandasTableModel( QAbstractTableModel ):
                     
                     subdf_index = data.property( ColumnsMimeText.drag_df_locs )
                     if not subdf_index is None:
-                        # communicate back to `view`
-                        rowilocs = list(range( row, row+len(subdf_index) ))
-                        data.setProperty( ColumnsMimeText.set_selected_rowilocs, rowilocs )
                         # perform actions
-                        return self.__reorder_subdf( subdf_index, row )
+                        if not self.__reorder_subdf( subdf_index, row ):
+                            return False
+                        # communicate back to `view`
+                        rowilocs = self.view_rowilocs( self.df.index.get_indexer( subdf_index ) )
+                        data.setProperty( ColumnsMimeText.set_selected_rowilocs, [ int(rowiloc) for rowiloc in rowilocs ] )
+                        return True
         
         log.error( 'not implemented, rejecting by default' )
         return False
@@ -348,19 +660,34 @@ class PandasTableModel( QAbstractTableModel ):
             
         # My custom method. I may use it manually.
         
-        self.layoutAboutToBeChanged.emit()
-        
         if type( values ) == list:
-            
-            if not len(values)==self.rowCount():
+            if not len(values)==len( self.df.index ):
                 raise IndexError
-                
-            self.df[column] = values
-            
         else:
-            self.df[column] = str(values)
-
-        self.layoutChanged.emit()
+            values = str(values)
+        
+        if not column in self.df.columns:
+            
+            coliloc = self.columnCount()
+            self.beginInsertColumns( QModelIndex(), coliloc, coliloc )
+            self.df[column] = values
+            if not self.__display is None:
+                self.__display.append( None )
+            self.__search_text = None
+            self.mark_dirty( self.df.index )
+            self.endInsertColumns()
+            return
+        
+        # existing column, only values change
+        coliloc = self.df.columns.get_loc( column )
+        self.df[column] = values
+        self.__sort_keys.pop( column, None )
+        self.__search_text = None
+        if not self.__display is None:
+            self.__display[ coliloc ] = None
+        self.mark_dirty( self.df.index )
+        if self.rowCount() > 0:
+            self.dataChanged.emit( self.index( 0, coliloc ), self.index( self.rowCount()-1, coliloc ) )
         
     def add_rows( self, rows ):
             
@@ -372,40 +699,33 @@ class PandasTableModel( QAbstractTableModel ):
         # to explicitly allow this method in order to avoid
         # unpredictable `df.index` values
 
-        self.layoutAboutToBeChanged.emit()
-
         df = pd.DataFrame( rows )
-        self.df = self.df.append( df, ignore_index=True )
-
-        self.layoutChanged.emit()
+        if len( df.index )==0:
+            return
+        
+        # all rows are renumbered, `df.index` = positions
+        self.__renumber()
+        n_old = self.__n_rows()
+        df.index = pd.RangeIndex( n_old, n_old+len(df.index) )
+        self.__append_rows( df )
+        self.mark_dirty( df.index )
 
     def add_df( self, df ):
             
         # My custom method. I may use it manually.
         # Assumes that `df.index` is in harmony with `self.df.index`.
 
-        self.layoutAboutToBeChanged.emit()
-
-        self.df = self.df.append( df )
-
-        self.layoutChanged.emit()
+        self.__append_rows( df )
+        self.mark_dirty( df.index )
 
     def delete_rows( self, rowilocs ):
             
         # My custom method. I may use it manually.
+        # `rowilocs` are `df` positions, see `df_rowilocs`.
 
-        if self.rowCount()==0: return
-        
-        self.layoutAboutToBeChanged.emit()
-
-        index = self.df.iloc[ rowilocs ].index
-        self.df.drop( index=index, inplace=True )
+        if len( self.df.index )==0: return
         
-        if self.rowCount()==0:
-            # reset columns as well
-            self.df = pd.DataFrame()
-        
-        self.layoutChanged.emit()
+        self.__remove_rows( rowilocs )
         
     def switch_df( self, df ):
             
@@ -413,7 +733,16 @@ class PandasTableModel( QAbstractTableModel ):
         # Completely replaces underlying `df`, GUI table headers.
 
         self.layoutAboutToBeChanged.emit()
-        self.df = df
+        self.__replace_df( df )
+        self.dirty_locs = set()
+        self.__sort_keys = {}
+        self.__search_text = None
+        self.__display = None
+        self.__fetch_page = None
+        self.__is_fetching = False
+        self.__is_fetching_rest = False
+        if not self.__quick_filter is None:
+            self.__row_map = self.__matching_rows().nonzero()[0]
         self.layoutChanged.emit()
             
     def replace_row_series( self, new_s ):
@@ -422,12 +751,29 @@ class PandasTableModel( QAbstractTableModel ):
         # Completely replaces specific `self.df` rows
         # with matching `new_s.index`.
         
-        self.layoutAboutToBeChanged.emit()
-        
-        same_index = self.df.index.isin( new_s.index )
-        self.df.loc[ same_index, new_s.name ] = new_s.values
-        
-        self.layoutChanged.emit()
+        # only rows that i have
+        rowilocs = self.df.index.get_indexer( new_s.index )
+        is_mine = rowilocs >= 0
+        if not is_mine.any():
+            return
+        rowilocs = rowilocs[ is_mine ]
+        new_s = new_s[ is_mine ]
+        
+        self.__insert_columns([ new_s.name ])
+        coliloc = self.df.columns.get_loc( new_s.name )
+        
+        # aligned by `df.index`, whatever the order
+        self.df.iloc[ rowilocs, coliloc ] = new_s.to_numpy()
+        self.mark_dirty( new_s.index )
+        self.__sort_keys.pop( new_s.name, None )
+        self.__forget_search_text( new_s.index )
+        
+        if not self.__display is None and not self.__display[ coliloc ] is None:
+            self.__display[ coliloc ][ rowilocs ] = _render_strings( new_s )
+        
+        rowilocs = self.view_rowilocs( rowilocs )
+        if len( rowilocs ) > 0:
+            self.dataChanged.emit( self.index( rowilocs[0], coliloc ), self.index( rowilocs[-1], coliloc ) )
 
     def replace_subdf( self, df ):
             
@@ -436,20 +782,42 @@ class PandasTableModel( QAbstractTableModel ):
         # (according to `df.index`),
         # this affects GUI.
         
-        if len(df)==0: return
+        # only rows that i have
+        rowilocs = self.df.index.get_indexer( df.index )
+        is_mine = rowilocs >= 0
+        if not is_mine.any(): return
+        rowilocs = rowilocs[ is_mine ]
+        df = df[ is_mine ]
         
-        self.layoutAboutToBeChanged.emit()
+        self.__insert_columns( df.columns )
             
-        # delete old, insert new
-        for col in self.df.columns:
-            self.df.loc[ df.index, col ] = pd.NA
-        for col in df.columns:
-            self.df.loc[ df.index, col ] = df[col]
-        
-        # remove only fully empty rows
-        self.df.dropna( how='all', inplace=True )
-        
-        self.layoutChanged.emit()
+        # delete old, insert new: the whole rows are
+        # replaced at once, columns missing from `df` become empty
+        block = df.reindex( columns=self.df.columns )
+        old_block = self.df.iloc[ rowilocs ].copy()
+        self.df.iloc[ rowilocs, : ] = block.to_numpy( dtype=object )
+        self.mark_dirty( df.index )
+        self.__forget_search_text( df.index )
+        
+        # sort keys of columns that did not change stay valid
+        is_changed = ( old_block != block ) & ~( old_block.isna() & block.isna() )
+        for col in self.df.columns[ is_changed.any( axis=0 ).to_numpy() ]:
+            self.__sort_keys.pop( col, None )
+        
+        # re-render and repaint only replaced rows
+        self.__render_rows( rowilocs )
+        view_rowilocs = self.view_rowilocs( rowilocs )
+        if len( view_rowilocs ) > 0:
+            self.dataChanged.emit(
+                self.index( view_rowilocs.min(), 0 ),
+                self.index( view_rowilocs.max(), self.columnCount()-1 )
+                )
+        
+        # remove only rows that became fully empty,
+        # other rows were not touched
+        empty_rowilocs = rowilocs[ block.isna().all( axis=1 ).to_numpy() ]
+        if len( empty_rowilocs ) > 0:
+            self.__remove_rows( empty_rowilocs )
                 
     def __reorder_subdf( self, subdf_index, target_rowiloc ):
         
@@ -474,29 +842,558 @@ class PandasTableModel( QAbstractTableModel ):
             log.error( 'unknown index format, need pd.Int64Index, not implemented, not doing anything' )
             return False
             
-        # obtain old index excluding `subdf_index`
-        old_index = list(self.df.index[ ~self.df.index.isin(subdf_index) ])
+        # `target_rowiloc` is where i see it,
+        # rows hidden by quick filter stay in between
+        if not self.__row_map is None and target_rowiloc >= 0:
+            if target_rowiloc < len( self.__row_map ):
+                target_rowiloc = int( self.__row_map[ target_rowiloc ] )
+            else:
+                target_rowiloc = len( self.df.index )
+        
+        # `move_rows` counts only the rows that stay,
+        # moved rows above the target don't count
+        rowilocs = self.df.index.get_indexer( subdf_index )
+        if target_rowiloc >= 0:
+            target_rowiloc -= int( ( rowilocs < target_rowiloc ).sum() )
+        
+        self.move_rows( rowilocs, target_rowiloc )
+        
+        return True
+    
+    def move_rows( self, rowilocs, target_rowiloc ):
+        
+        # My custom method. I may use it manually.
+        # Moves rows with given `df` positions (in given order)
+        # in front of the `target_rowiloc`-th of the rows that stay;
+        # negative `target_rowiloc` = to the end.
+        
+        rowilocs = asarray( rowilocs, dtype=int64 )
+        if len( rowilocs )==0:
+            return
+        
+        is_moved = zeros( len( self.df.index ), dtype=bool )
+        is_moved[ rowilocs ] = True
+        rest = ( ~is_moved ).nonzero()[0]
+        
+        if target_rowiloc < 0 or target_rowiloc > len( rest ):
+            target_rowiloc = len( rest )
+        
+        order = concatenate([ rest[:target_rowiloc], rowilocs, rest[target_rowiloc:] ])
+        
+        # a single block of rows can be moved
+        # without rearranging the whole view
+        first, last = int( rowilocs[0] ), int( rowilocs[-1] )
+        is_block = last-first+1==len( rowilocs ) and ( rowilocs[1:] > rowilocs[:-1] ).all()
+        if self.__row_map is None and is_block:
+            
+            destination = target_rowiloc if target_rowiloc <= first else target_rowiloc+len( rowilocs )
+            if destination in [ first, last+1 ]:
+                # already there
+                return
+            
+            if self.beginMoveRows( QModelIndex(), first, last, QModelIndex(), destination ):
+                self.__permute( order )
+                self.endMoveRows()
+                return
         
-        # some rows retain their positions
-        new_index = old_index[:target_rowiloc]
+        self.__rearrange( order )
+    
+    def shift_rows( self, rowilocs, up=True ):
+        
+        # My custom method. I may use it manually.
+        # Moves every block of rows with given `df` positions
+        # one shown row up / down: the row above / below
+        # the block jumps over it.
+        
+        n_shown = self.rowCount()
+        is_selected = zeros( n_shown, dtype=bool )
+        is_selected[ self.view_rowilocs( rowilocs ) ] = True
+        
+        is_after_selected = concatenate([ [False], is_selected[:-1] ])
+        is_before_selected = concatenate([ is_selected[1:], [False] ])
+        starts = ( is_selected & ~is_after_selected ).nonzero()[0]
+        ends = ( is_selected & ~is_before_selected ).nonzero()[0]
+        
+        keys = arange( n_shown, dtype=float64 )
+        if up:
+            can_move = starts > 0
+            keys[ starts[ can_move ]-1 ] = ends[ can_move ] + 0.5
+        else:
+            can_move = ends < n_shown-1
+            keys[ ends[ can_move ]+1 ] = starts[ can_move ] - 0.5
+        
+        if not can_move.any():
+            return
+        
+        if self.__row_map is None and len( starts )==1:
+            # single block
+            first = int( starts[0] )
+            self.move_rows( arange( first, ends[0]+1 ), first-1 if up else first+1 )
+            return
+        
+        # stable, rows keep their order within blocks
+        view_order = argsort( keys, kind='stable' )
+        if self.__row_map is None:
+            self.__rearrange( view_order )
+            return
+        
+        # hidden rows stay in place
+        order = arange( len( self.df.index ) )
+        order[ self.__row_map ] = self.__row_map[ view_order ]
+        self.__rearrange( order )
+    
+    def __permute( self, order ):
+        
+        # Rows are rearranged, `order` holds old `df` positions
+        # in their new order. GUI is notified elsewhere.
+        # Returns new position of each old position.
+        
+        old_index = self.df.index
+        self.__replace_df( self.df.iloc[ order ] )
+        self.__mark_moved( old_index )
+        
+        if not self.__display is None:
+            self.__display = [ column if column is None else column[ order ] for column in self.__display ]
         
-        # then i need to group the `subdf` ones
-        new_index.extend( list(subdf_index) )
+        new_rowilocs = empty( len( order ), dtype=int64 )
+        new_rowilocs[ order ] = arange( len( order ) )
+        if not self.__row_map is None:
+            self.__row_map = npsort( new_rowilocs[ self.__row_map ] )
         
-        # then i need to add the rest of them
-        # while retaining their order
-        for v in old_index[target_rowiloc:]:
-            if not v in new_index:
-                new_index.append( v )
+        return new_rowilocs
+    
+    def __rearrange( self, order ):
+        
+        # Same as `__permute`, and GUI keeps track of rows:
+        # selection and current row follow them.
+        
+        old_row_map = self.__row_map
         
-        # apply the new index to sort rows
         self.layoutAboutToBeChanged.emit()
-        self.df = self.df.reindex([ loc for loc in new_index ])
+        
+        new_rowilocs = self.__permute( order )
+        
+        # old view positions -> new view positions
+        if old_row_map is None:
+            view_map = new_rowilocs
+        else:
+            view_map = searchsorted( self.__row_map, new_rowilocs[ old_row_map ] )
+        
+        old_indexes = self.persistentIndexList()
+        new_indexes = [ self.index( int( view_map[ index.row() ] ), index.column() ) for index in old_indexes ]
+        self.changePersistentIndexList( old_indexes, new_indexes )
+        
         self.layoutChanged.emit()
+    
+    def mark_dirty( self, locs ):
+        # My custom method. I may use it manually.
+        self.dirty_locs.update( locs )
+    
+    def mark_clean( self, locs=None ):
+        
+        # My custom method. I may use it manually.
+        # Rows with given `locs` (or all rows) were saved.
+        
+        if locs is None:
+            self.dirty_locs = set()
+        else:
+            self.dirty_locs.difference_update( locs )
+    
+    def dirty_subdf( self ):
+        
+        # My custom method. I may use it manually.
+        # Rows that were changed since they were saved,
+        # in current order.
+        
+        if len( self.dirty_locs )==0:
+            return self.df.iloc[ :0 ]
+        
+        return self.df[ self.df.index.isin( self.dirty_locs ) ]
+    
+    def set_quick_filter( self, terms=None, columns=None, regex=False ):
+        
+        # My custom method. I may use it manually.
+        # Shows only rows that contain every one of `terms`
+        # (case insensitive) among their values and whose
+        # `columns` match (see `ColumnsQuickFilter`).
+        # `df` stays as it is. No terms = all rows are shown.
+        # Returns `False` if given regular expressions are invalid.
+        
+        c = ColumnsQuickFilter
+        
+        terms = [ term for term in ( terms or [] ) if not term=='' ]
+        columns = { col: term for col, term in ( columns or {} ).items() if not term=='' }
+        
+        if regex:
+            try:
+                for term in terms + [ term for term in columns.values() if type(term) is str ]:
+                    recompile( term )
+            except reerror as ex:
+                log.debug( f'not filtering, invalid regular expression: {ex}' )
+                return False
+        
+        self.beginResetModel()
+        
+        if len( terms )==0 and len( columns )==0:
+            self.__quick_filter = None
+            self.__row_map = None
+        else:
+            self.__quick_filter = {
+                c.terms: terms,
+                c.columns: columns,
+                c.regex: regex,
+                }
+            self.__row_map = self.__matching_rows().nonzero()[0]
+        
+        self.endResetModel()
         
         return True
     
+    def quick_filter( self ):
+        # My custom method. I may use it manually.
+        return self.__quick_filter
+    
+    def df_rowilocs( self, rowilocs ):
+        
+        # My custom method. I may use it manually.
+        # Positions of rows in view -> their positions in `df`.
+        
+        if self.__row_map is None:
+            return [ int(rowiloc) for rowiloc in rowilocs ]
+        
+        return [ int( self.__row_map[ rowiloc ] ) for rowiloc in rowilocs ]
+    
+    def view_rowilocs( self, rowilocs ):
+        
+        # My custom method. I may use it manually.
+        # Positions of rows in `df` -> their positions in view,
+        # ascending; hidden rows are skipped.
+        
+        rowilocs = unique( asarray( rowilocs, dtype=int64 ) )
+        if self.__row_map is None:
+            return rowilocs
+        
+        return searchsorted( self.__row_map, rowilocs[ isin( rowilocs, self.__row_map ) ] )
+    
+    def view_rowiloc( self, rowiloc ):
+        
+        # My custom method. I may use it manually.
+        # Position in view of the first shown row
+        # at or after `df` position `rowiloc`.
+        
+        if self.__row_map is None:
+            return rowiloc
+        
+        return int( searchsorted( self.__row_map, rowiloc ) )
+    
+    def __matching_rows( self, df=None ):
+        
+        # Boolean mask of rows that pass quick filter,
+        # either of my `df` or of given `df`.
+        
+        c = ColumnsQuickFilter
+        
+        spec = self.__quick_filter
+        if df is None:
+            df = self.df
+            strings = self.__search_strings()
+        else:
+            strings = _search_strings( df )
+        
+        mask = ones( len( df.index ), dtype=bool )
+        
+        for term in spec[c.terms]:
+            if spec[c.regex]:
+                mask &= strings.str.contains( term, flags=IGNORECASE, regex=True, na=False ).to_numpy( dtype=bool )
+            else:
+                mask &= strings.str.contains( term.lower(), regex=False, na=False ).to_numpy( dtype=bool )
+        
+        for col, term in spec[c.columns].items():
+            if not col in df.columns:
+                mask[:] = False
+                break
+            values = pd.Series( _render_strings( df[col] ), index=df.index )
+            if callable( term ):
+                mask &= asarray( term( values ), dtype=bool )
+            else:
+                mask &= values.str.contains( term, case=False, regex=spec[c.regex], na=False ).to_numpy( dtype=bool )
+        
+        return mask
+    
+    def __search_strings( self ):
+        
+        # Search strings of my rows in current order.
+        # Only rows that are missing from cache are rendered.
+        
+        strings = self.__search_text
+        if strings is None or not self.df.index.is_unique:
+            strings = _search_strings( self.df )
+        else:
+            strings = strings.reindex( self.df.index )
+            missing = strings.isna().to_numpy()
+            if missing.any():
+                strings[ missing ] = _search_strings( self.df[ missing ] ).to_numpy()
+        
+        if self.df.index.is_unique:
+            self.__search_text = strings
+        
+        return strings
+    
+    def __forget_search_text( self, locs ):
+        
+        # Rows with given `locs` were changed.
+        
+        if not self.__search_text is None:
+            self.__search_text = self.__search_text.drop( locs, errors='ignore' )
+    
+    def __remap_rows( self, old_index ):
+        
+        # Rows were reordered, shown rows stay shown.
+        
+        if self.__row_map is None:
+            return
+        
+        shown = old_index[ self.__row_map ]
+        self.__row_map = self.df.index.isin( shown ).nonzero()[0]
+    
+    def __sort_ranks( self, col ):
+        
+        # Natural ranks of column values in current row order.
+        # Cached ranks are reused as long as they cover
+        # every row.
+        
+        ranks = self.__sort_keys.get( col )
+        if not ranks is None and self.df.index.is_unique:
+            ranks = ranks.reindex( self.df.index )
+            if not ranks.isna().any():
+                return ranks.to_numpy( dtype=int64 )
+        
+        ranks = pd.Series( _natural_ranks( self.df[col] ), index=self.df.index )
+        if self.df.index.is_unique:
+            self.__sort_keys[col] = ranks
+        
+        return ranks.to_numpy()
+    
+    def __insert_columns( self, columns ):
+        
+        # Appends empty columns that I don't have yet.
+        
+        columns = [ col for col in columns if not col in self.__df.columns ]
+        if len( columns )==0:
+            return
+        
+        n_old = self.columnCount()
+        self.beginInsertColumns( QModelIndex(), n_old, n_old+len(columns)-1 )
+        for col in columns:
+            self.__df[col] = pd.NA
+        if not self.__display is None:
+            self.__display.extend( [ None ]*len(columns) )
+        if not self.__pending_display is None:
+            self.__pending_display.extend([ [ '' ]*self.__n_pending for col in columns ])
+        self.endInsertColumns()
+    
+    def __append_rows( self, df ):
+        
+        # Appends rows to the end,
+        # their new columns come first.
+        
+        if len( df.index )==0:
+            return
+        
+        self.__insert_columns( df.columns )
+        
+        n_old = self.__n_rows()
+        
+        if self.__row_map is None:
+            self.beginInsertRows( QModelIndex(), n_old, n_old+len(df.index)-1 )
+            self.__buffer_rows( df )
+            self.endInsertRows()
+        
+        else:
+            # only matching rows are shown
+            new_rowilocs = self.__matching_rows( df ).nonzero()[0] + n_old
+            n_shown = len( self.__row_map )
+            if len( new_rowilocs ) > 0:
+                self.beginInsertRows( QModelIndex(), n_shown, n_shown+len(new_rowilocs)-1 )
+            self.__buffer_rows( df )
+            self.__row_map = concatenate([ self.__row_map, new_rowilocs ])
+            if len( new_rowilocs ) > 0:
+                self.endInsertRows()
+        
+        # amortized: every row is copied a few times at most
+        if self.__n_pending >= max( APPEND_BUFFER_ROWS_DEFAULT, len( self.__df.index ) ):
+            self.__consolidate()
+    
+    def __buffer_rows( self, df ):
+        
+        # Appended rows are shown right away,
+        # but copied into `__df` later.
+        
+        if self.__pending_display is None:
+            self.__pending_display = [ [] for col in self.__df.columns ]
+        
+        for col, strings in zip( self.__df.columns, self.__pending_display ):
+            if col in df.columns:
+                strings.extend( _render_strings( df[col] ).tolist() )
+            else:
+                strings.extend( [ '' ]*len(df.index) )
+        
+        n_old = self.__n_rows()
+        self.__is_pending_renumbered = self.__is_pending_renumbered \
+            and df.index.equals( pd.RangeIndex( n_old, n_old+len(df.index) ) )
+        
+        self.__pending.append( df )
+        self.__n_pending += len( df.index )
+    
+    def __consolidate( self ):
+        
+        # Pending rows join `__df` with a single copy.
+        # GUI sees no difference.
+        
+        if self.__n_pending==0:
+            return
+        
+        df = pd.concat( [ self.__df ] + self.__pending )
+        df = df[ self.__df.columns ]
+        
+        if not self.__display is None:
+            self.__display = [ column if column is None else concatenate([ column, asarray( strings, dtype=object ) ]) for column, strings in zip( self.__display, self.__pending_display ) ]
+        
+        # also forgets pending rows
+        self.__replace_df( df )
+    
+    def __renumber( self ):
+        
+        # `df.index` becomes row positions. Everything
+        # that remembers rows by `df.index` follows them.
+        
+        # appended rows stay pending if they are numbered already
+        if self.__is_pending_renumbered and self.__df.index.equals( pd.RangeIndex( len( self.__df.index ) ) ):
+            return
+        
+        old_index = self.df.index
+        positions = pd.RangeIndex( len( old_index ) )
+        
+        self.dirty_locs = set( positions[ old_index.isin( self.dirty_locs ) ] )
+        self.__sort_keys = { col: pd.Series( ranks.reindex( old_index ).to_numpy(), index=positions ) for col, ranks in self.__sort_keys.items() }
+        if not self.__search_text is None:
+            self.__search_text = pd.Series( self.__search_text.reindex( old_index ).to_numpy(), index=positions )
+        
+        self.__replace_df( self.df.set_axis( positions ) )
+    
+    def __n_rows( self ):
+        # Including pending ones.
+        return len( self.__df.index ) + self.__n_pending
+    
+    def __remove_rows( self, rowilocs ):
+        
+        # Removes rows with given `df` positions
+        # range by range (as I see them), the last range first,
+        # so that remaining `rowilocs` stay valid.
+        
+        rowilocs = unique( asarray( rowilocs, dtype=int64 ) )
+        
+        if not self.__row_map is None:
+            # hidden rows go silently, shown rows
+            # keep their positions in view
+            shown = self.view_rowilocs( rowilocs )
+            self.__drop_rows( rowilocs[ ~isin( rowilocs, self.__row_map ) ] )
+            rowilocs = shown
+        
+        ranges = []
+        for rowiloc in rowilocs:
+            rowiloc = int( rowiloc )
+            if len( ranges ) > 0 and ranges[-1][1]==rowiloc-1:
+                ranges[-1][1] = rowiloc
+            else:
+                ranges.append( [ rowiloc, rowiloc ] )
+        
+        if len( ranges ) > REMOVE_RANGES_MAX:
+            
+            # a single copy of `df`,
+            # GUI forgets selection though
+            self.beginResetModel()
+            if self.__row_map is None:
+                self.__drop_rows( rowilocs )
+            else:
+                self.__drop_rows( self.__row_map[ rowilocs ] )
+            self.endResetModel()
+            ranges = []
+        
+        for first, last in reversed( ranges ):
+            
+            self.beginRemoveRows( QModelIndex(), first, last )
+            if self.__row_map is None:
+                self.__drop_rows( range( first, last+1 ) )
+            else:
+                self.__drop_rows( self.__row_map[ first:last+1 ] )
+            self.endRemoveRows()
+        
+        if len( self.df.index )==0 and self.columnCount() > 0:
+            # reset columns as well
+            self.beginRemoveColumns( QModelIndex(), 0, self.columnCount()-1 )
+            self.__replace_df( pd.DataFrame() )
+            self.__display = None
+            self.endRemoveColumns()
+    
+    def __drop_rows( self, rowilocs ):
+        
+        # Drops rows with given `df` positions,
+        # GUI is notified elsewhere.
+        
+        rowilocs = unique( asarray( rowilocs, dtype=int64 ) )
+        if len( rowilocs )==0:
+            return
+        
+        keep = ones( len( self.df.index ), dtype=bool )
+        keep[ rowilocs ] = False
+        self.dirty_locs.difference_update( self.df.index[ rowilocs ] )
+        self.__replace_df( self.df[ keep ] )
+        
+        if not self.__display is None:
+            self.__display = [ column if column is None else npdelete( column, rowilocs ) for column in self.__display ]
+        
+        if not self.__row_map is None:
+            row_map = self.__row_map[ ~isin( self.__row_map, rowilocs ) ]
+            self.__row_map = row_map - searchsorted( rowilocs, row_map )
+    
+    def __display_column( self, coliloc ):
+        
+        # Shown strings of a single column.
+        
+        # `df` may have been changed from outside
+        if self.__display is None or not len( self.__display )==self.columnCount():
+            self.__display = [ None ]*self.columnCount()
+        
+        column = self.__display[ coliloc ]
+        if column is None or not len( column )==len( self.__df.index ):
+            column = self.__display[ coliloc ] = _render_strings( self.__df.iloc[ :, coliloc ] )
+        
+        return column
+    
+    def __render_rows( self, rowilocs ):
+        
+        # Rows with given `rowilocs` were replaced.
+        
+        if self.__display is None:
+            return
+        
+        rowilocs = rowilocs[ rowilocs >= 0 ]
+        for coliloc, column in enumerate( self.__display ):
+            if not column is None:
+                column[ rowilocs ] = _render_strings( self.df.iloc[ rowilocs, coliloc ] )
+    
+    def __mark_moved( self, old_index ):
+        
+        # Rows that changed their position are dirty,
+        # rows that kept it are not.
+        
+        if not len( old_index )==len( self.df.index ):
+            self.mark_dirty( self.df.index )
+            return
+        
+        self.mark_dirty( self.df.index[ self.df.index != old_index ] )
+    
 #---------------------------------------------------------------------------+++
-# end 2023.10.20
-# __reorder_subdf
-
+# end 2026.10.18
+# sorting fetches the rest of the pages
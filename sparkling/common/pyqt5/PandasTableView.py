@@ -23,15 +23,43 @@ log = logging.getLogger(__name__)
 # embedded in python
 # pip install
 import pandas as pd
-from PyQt5.QtCore import Qt, QMimeData, QItemSelectionModel, QItemSelection
-from PyQt5.QtWidgets import QTableView, QAbstractItemView
-from PyQt5.QtGui import QDrag
+from PyQt5.QtCore import Qt, QMimeData, QItemSelectionModel, QItemSelection, QTimer
+from PyQt5.QtWidgets import QApplication, QTableView, QAbstractItemView, QHeaderView, QLineEdit, QShortcut
+from PyQt5.QtGui import QDrag, QKeySequence
 # same project
 from sparkling.common.pyqt5.PandasTableModel import (
     PandasTableModel,
     BaseColumns, ColumnsMimeText
     )
 #from sparkling.common.enums.MimeTypes import EMimeTypes
+
+# quick filter waits until I stop typing, ms
+QUICK_FILTER_DELAY_MS_DEFAULT = 200
+
+QUICK_FILTER_PLACEHOLDER = 'Filter: words, column:word or /regex/ (Esc to close)'
+
+def parse_quick_filter( text, columns ):
+    
+    # Converts quick filter bar text into
+    # `PandasTableModel.set_quick_filter` parameters:
+    # - `/something/` is a single regular expression,
+    # - `column:something` must be found in that column,
+    # - every other word must be found anywhere.
+    
+    text = text.strip()
+    if len( text ) > 1 and text.startswith( '/' ) and text.endswith( '/' ):
+        return [ text[1:-1] ], {}, True
+    
+    terms = []
+    column_terms = {}
+    for word in text.split():
+        col, sep, term = word.partition( ':' )
+        if sep==':' and col in columns:
+            column_terms[col] = term
+        else:
+            terms.append( word )
+    
+    return terms, column_terms, False
         
 class EMouseMoveModes( BaseColumns ):
     
@@ -57,26 +85,62 @@ class PandasTableView( QTableView ):
 
     _MODEL = None
     
+    # all rows have the height of a single text line,
+    # set once for the whole vertical header instead
+    # of row by row
+    _uniform_row_height = None
+    
     # the user may press a button and drag a mouse across
     # this widget, widget reactions may vary
     __mouse_move_mode = EMouseMoveModes.drag_select
     
+    # hidden until needed, see `show_quick_filter`
+    __quick_filter_bar = None
+    __quick_filter_timer = None
+    
     def __init__( self,
                   parent,
+                  uniform_row_height=True,
                   *args, **kwargs ):
         super( PandasTableView, self ).__init__( parent, *args, **kwargs )
+        
+        self._uniform_row_height = uniform_row_height
 
         # appearance
         self.setShowGrid( False )
         self.setAlternatingRowColors( True )
         self.setSelectionBehavior( self.SelectRows )
         self.setWordWrap( False )
-        self.setSortingEnabled( True )
+        # header clicks are turned into sort columns here,
+        # see `__sort_indicator_changed_event`
+        self.horizontalHeader().setSectionsClickable( True )
+        self.horizontalHeader().setSortIndicatorShown( True )
+        self.horizontalHeader().sortIndicatorChanged.connect( self.__sort_indicator_changed_event )
         self.setDragDropMode( QAbstractItemView.DragDrop )
+        if self._uniform_row_height:
+            self.verticalHeader().setSectionResizeMode( QHeaderView.Fixed )
+            self._force_font_metrics()
 
         # instantly populate
         self._MODEL = PandasTableModel( self )
         self.setModel( self._MODEL )
+        
+        # lazy mode appends rows on scrolling
+        self._MODEL.rowsInserted.connect( self.__rows_inserted_event )
+
+        # quick filter bar floats over the bottom rows
+        self.__quick_filter_bar = QLineEdit( self )
+        self.__quick_filter_bar.setPlaceholderText( QUICK_FILTER_PLACEHOLDER )
+        self.__quick_filter_bar.setClearButtonEnabled( True )
+        self.__quick_filter_bar.hide()
+        QShortcut( QKeySequence( Qt.Key_Escape ), self.__quick_filter_bar,
+            self.hide_quick_filter, context=Qt.WidgetShortcut )
+        
+        self.__quick_filter_timer = QTimer( self )
+        self.__quick_filter_timer.setSingleShot( True )
+        self.__quick_filter_timer.setInterval( QUICK_FILTER_DELAY_MS_DEFAULT )
+        self.__quick_filter_timer.timeout.connect( self.__apply_quick_filter_event )
+        self.__quick_filter_bar.textChanged.connect( self.__quick_filter_edited_event )
 
     def rowCount( self, parent=None ):
         # Reserved `PyQt5` method.
@@ -86,6 +150,21 @@ class PandasTableView( QTableView ):
         # Reserved `PyQt5` method.
         return self._MODEL.columnCount()
     
+    def updateGeometries( self ):
+        
+        # Reserved `PyQt5` method. Is called whenever
+        # viewport, headers or scrollbars change.
+        
+        super( PandasTableView, self ).updateGeometries()
+        
+        if self.__quick_filter_bar is None:
+            # not created yet
+            return
+        
+        vg = self.viewport().geometry()
+        height = self.__quick_filter_bar.sizeHint().height()
+        self.__quick_filter_bar.setGeometry( vg.left(), vg.bottom()+1-height, vg.width(), height )
+    
     def selectedItems( self ):
 
         # Reserved `PyQt5` method. Returns some internal
@@ -326,14 +405,15 @@ class PandasTableView( QTableView ):
         
         # My custom method. I may use it manually.
         # Allows me to get the exact row numbers
-        # that are currently selected.
+        # that are currently selected: positions in `df`,
+        # not in view (they differ while quick filter is on).
 
         rowilocs = []
         for item in self.selectedItems():
             rowiloc = item.row()
             rowilocs.append( rowiloc )
             
-        return list( set(rowilocs) )
+        return self._MODEL.df_rowilocs( list( set(rowilocs) ) )
             
     def selected_subdf( self ):
         
@@ -361,6 +441,10 @@ class PandasTableView( QTableView ):
         # TODO
         # appropriate for other uses as well
         
+        # `rowiloc` is a `df` position,
+        # some rows may be hidden by quick filter
+        rowiloc = self._MODEL.view_rowiloc( rowiloc )
+        
         # in `self.df` i may have an unknown number of rows
         # in order to be able to `select a row after given rowiloc`,
         # i need so many rows
@@ -396,6 +480,35 @@ class PandasTableView( QTableView ):
 
         self.select_next_row( rowilocs[0] )
         
+    def move_selection_up( self ):
+        # My custom method. I may use it manually.
+        self.__shift_selection( up=True )
+    
+    def move_selection_down( self ):
+        # My custom method. I may use it manually.
+        self.__shift_selection( up=False )
+    
+    def move_selection_to_top( self ):
+        
+        # My custom method. I may use it manually.
+        # Selected rows keep their order.
+        
+        rowilocs = sorted( self.selected_rowilocs() )
+        if len(rowilocs)==0: return
+        
+        self._MODEL.move_rows( rowilocs, 0 )
+        self.scrollToTop()
+    
+    def __shift_selection( self, up ):
+        
+        rowilocs = self.selected_rowilocs()
+        if len(rowilocs)==0: return
+        
+        # selection follows moved rows
+        self._MODEL.shift_rows( rowilocs, up=up )
+        if self.currentIndex().isValid():
+            self.scrollTo( self.currentIndex() )
+        
     def get_df( self ):
         # My custom method. I may use it manually.
         # For external use only. I don't want anyone except
@@ -483,6 +596,99 @@ class PandasTableView( QTableView ):
         # My custom method. I may use it manually.
         self._MODEL.add_df( df )
         self._force_font_metrics()
+    
+    def set_page_source( self, fetch_page, page_size ):
+        # My custom method. I may use it manually.
+        self._MODEL.set_page_source( fetch_page, page_size )
+    
+    def __rows_inserted_event( self, parent, first_rowiloc, last_rowiloc ):
+        
+        # Fetched rows need the same height
+        # as the rest of them.
+        
+        if self._uniform_row_height:
+            # they have it already
+            return
+        
+        font_height = self.fontMetrics().height()
+        for rowiloc in range( first_rowiloc, last_rowiloc+1 ):
+            self.setRowHeight( rowiloc, font_height )
+    
+    def dirty_subdf( self ):
+        # My custom method. I may use it manually.
+        return self._MODEL.dirty_subdf()
+    
+    def sort_by( self, sort_columns ):
+        # My custom method. I may use it manually.
+        # See `PandasTableModel.sort_by`.
+        self._MODEL.sort_by( sort_columns )
+    
+    def __sort_indicator_changed_event( self, coliloc, order ):
+        
+        # I clicked a column header.
+        # Shift + click sorts by one more column
+        # (or flips the order of a chosen one),
+        # a simple click sorts by this column only.
+        
+        if coliloc < 0 or coliloc >= self._MODEL.columnCount():
+            return
+        
+        col = self._MODEL.df.columns[ coliloc ]
+        is_asc = order==Qt.AscendingOrder
+        
+        sort_columns = self._MODEL.sort_columns()
+        if QApplication.keyboardModifiers() & Qt.ShiftModifier:
+            if col in [ c for c, _ in sort_columns ]:
+                sort_columns = [ ( c, is_asc if c==col else a ) for c, a in sort_columns ]
+            else:
+                sort_columns.append( ( col, is_asc ) )
+        else:
+            sort_columns = [ ( col, is_asc ) ]
+        
+        self.sort_by( sort_columns )
+    
+    def set_quick_filter( self, terms=None, columns=None, regex=False ):
+        # My custom method. I may use it manually.
+        # See `PandasTableModel.set_quick_filter`.
+        return self._MODEL.set_quick_filter( terms=terms, columns=columns, regex=regex )
+    
+    def show_quick_filter( self ):
+        
+        # My custom method. I may use it manually.
+        # Shows quick filter bar, rows are filtered as I type.
+        
+        self.__quick_filter_bar.show()
+        self.__quick_filter_bar.raise_()
+        self.__quick_filter_bar.setFocus()
+        self.__quick_filter_bar.selectAll()
+    
+    def hide_quick_filter( self ):
+        
+        # My custom method. I may use it manually.
+        # All rows are shown again.
+        
+        self.__quick_filter_timer.stop()
+        self.__quick_filter_bar.hide()
+        self.__quick_filter_bar.clear()
+        self.set_quick_filter()
+        self.setFocus()
+    
+    def __quick_filter_edited_event( self, text ):
+        # wait until i stop typing
+        self.__quick_filter_timer.start()
+    
+    def __apply_quick_filter_event( self ):
+        
+        terms, column_terms, regex = parse_quick_filter(
+            self.__quick_filter_bar.text(), self._MODEL.df.columns )
+        
+        # a half-typed regular expression keeps previous rows
+        self.set_quick_filter( terms=terms, columns=column_terms, regex=regex )
+        self._force_font_metrics()
+    
+    def mark_clean( self, locs=None ):
+        # My custom method. I may use it manually.
+        self._MODEL.mark_clean( locs )
             
     def _force_font_metrics( self ):
                
@@ -490,9 +696,18 @@ class PandasTableView( QTableView ):
         
         # make sure rows have appropriate height
         font_height = self.fontMetrics().height()
+        
+        if self._uniform_row_height:
+            # does not depend on row count
+            header = self.verticalHeader()
+            if not header.defaultSectionSize()==font_height:
+                header.setMinimumSectionSize( min( header.minimumSectionSize(), font_height ) )
+                header.setDefaultSectionSize( font_height )
+            return
+        
         for rowiloc in range( self._MODEL.rowCount() ):
             self.setRowHeight( rowiloc, font_height )
         
 #---------------------------------------------------------------------------+++
-# end 2023.10.20
-# better comments
+# end 2026.10.18
+# header clicks choose sort columns
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+#Python utility "Test for Pandas TableModel". Checks natural sorting of a "Pandas TableModel" PyQt5 object. Copyright (C) 2023 Anna Anikina
+#
+#This program is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#This program is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+#---------------------------------------------------------------------------+++
+# Run with `pytest`.
+
+# embedded in python
+# pip install
+import pytest
+pd = pytest.importorskip( 'pandas' )
+natsorted = pytest.importorskip( 'natsort' ).natsorted
+pytest.importorskip( 'PyQt5' )
+# same project
+from sparkling.common.pyqt5.PandasTableModel import _natural_ranks
+
+def dense( ranks ):
+    # only the order of ranks matters, not where they start
+    return list( pd.Series( ranks ).rank( method='dense' ).astype( int ) )
+
+def test_strings_with_numbers():
+    
+    s = pd.Series([ 'file10', 'file2', 'file1', 'file2' ])
+    assert dense( _natural_ranks( s ) ) == [ 3, 2, 1, 2 ]
+
+def test_numbers_stored_as_str():
+    
+    s = pd.Series([ '10', '2', '1', '02' ])
+    assert dense( _natural_ranks( s ) ) == [ 3, 2, 1, 2 ]
+    
+    # same as natsort: signs and decimal points are text
+    s = pd.Series([ '10', '2', '-1', '2.5' ])
+    assert list( s.iloc[ _natural_ranks( s ).argsort( kind='stable' ) ] ) == natsorted( s )
+
+def test_numbers_missing_last():
+    
+    s = pd.Series([ 3.0, None, 1.0, 3.0 ])
+    assert dense( _natural_ranks( s ) ) == [ 2, 3, 1, 2 ]
+
+def test_ranks_sort_like_values():
+    
+    s = pd.Series([ 'b', 'a10', 'a9', '', 'a9' ])
+    ranks = _natural_ranks( s )
+    assert list( s.iloc[ ranks.argsort( kind='stable' ) ] ) == [ '', 'a9', 'a9', 'a10', 'b' ]
+
+def test_empty():
+    assert len( _natural_ranks( pd.Series( [], dtype=object ) ) )==0
+
+#---------------------------------------------------------------------------+++
+# end 2026.10.18
+# numbers stored as str are sorted like natsort does
@@ -0,0 +1,411 @@
+# -*- coding: utf-8 -*-
+#Python utility "Test for Pandas TableModel rows". Checks how a "Pandas TableModel" PyQt5 object moves, appends, removes and replaces rows. Copyright (C) 2023 Anna Anikina
+#
+#This program is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#This program is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+#---------------------------------------------------------------------------+++
+# Run with `pytest`, no display is needed.
+
+# embedded in python
+import os
+os.environ.setdefault( 'QT_QPA_PLATFORM', 'offscreen' )
+# pip install
+import pytest
+pd = pytest.importorskip( 'pandas' )
+pytest.importorskip( 'natsort' )
+QtCore = pytest.importorskip( 'PyQt5.QtCore' )
+from PyQt5.QtWidgets import QApplication
+# same project
+from sparkling.common.pyqt5.PandasTableModel import (
+    PandasTableModel, ColumnsMimeText,
+    APPEND_BUFFER_ROWS_DEFAULT, REMOVE_RANGES_MAX
+    )
+
+@pytest.fixture( scope='module' )
+def app():
+    return QApplication.instance() or QApplication( [] )
+
+@pytest.fixture
+def model( app ):
+    
+    # 6 rows `a`..`f` with index 10..15
+    
+    m = PandasTableModel()
+    m.switch_df( pd.DataFrame( { 'title': list( 'abcdef' ) }, index=range( 10, 16 ) ) )
+    return m
+
+class Spy:
+    
+    # Remembers names of emitted signals,
+    # and rows of `rowsRemoved`.
+    
+    def __init__( self, m ):
+        self.signals = []
+        self.removed = []
+        for name in [ 'rowsMoved', 'rowsRemoved', 'rowsInserted',
+                      'layoutChanged', 'modelReset', 'dataChanged' ]:
+            getattr( m, name ).connect( lambda *args, name=name: self.signals.append( name ) )
+        m.rowsRemoved.connect( lambda parent, first, last: self.removed.append( ( first, last ) ) )
+
+def titles( m ):
+    return ''.join( m.df['title'] )
+
+def shown( m ):
+    return ''.join([ m.data( m.index( rowiloc, 0 ) ) for rowiloc in range( m.rowCount() ) ])
+
+def drop( m, locs, row ):
+    
+    # same as dragging rows with given `df.index`
+    # onto shown `row`
+    
+    data = QtCore.QMimeData()
+    data.setText( '' )
+    data.setProperty( ColumnsMimeText.drag_df_locs, pd.Index( locs ) )
+    return m.dropMimeData( data, QtCore.Qt.MoveAction, row, 0, QtCore.QModelIndex() )
+
+def test_move_rows_block( model ):
+    
+    spy = Spy( model )
+    
+    # `b`, `c` in front of `e`, counted among the rows that stay
+    model.move_rows( [ 1, 2 ], 2 )
+    assert titles( model ) == 'adbcef'
+    assert spy.signals == [ 'rowsMoved' ]
+    
+    # already there
+    model.move_rows( [ 2, 3 ], 2 )
+    assert titles( model ) == 'adbcef'
+    assert spy.signals == [ 'rowsMoved' ]
+    
+    # to the end
+    model.move_rows( [ 0 ], -1 )
+    assert titles( model ) == 'dbcefa'
+
+def test_move_rows_scattered( model ):
+    
+    spy = Spy( model )
+    
+    # given order is kept
+    model.move_rows( [ 4, 0 ], 1 )
+    assert titles( model ) == 'beacdf'
+    assert spy.signals == [ 'layoutChanged' ]
+    assert model.dirty_locs == set([ 10, 11, 12, 13, 14 ])
+
+def test_move_rows_filtered( model ):
+    
+    model.set_quick_filter( columns={ 'title': '[ace]' }, regex=True )
+    assert shown( model ) == 'ace'
+    
+    spy = Spy( model )
+    
+    # hidden rows stay in between
+    model.move_rows( [ 4 ], 1 )
+    assert titles( model ) == 'aebcdf'
+    assert shown( model ) == 'aec'
+    assert spy.signals == [ 'layoutChanged' ]
+
+def test_shift_rows( model ):
+    
+    model.shift_rows( [ 2, 3 ], up=True )
+    assert titles( model ) == 'acdbef'
+    
+    # every block jumps over its neighbour
+    model.shift_rows( [ 0, 3, 4 ], up=False )
+    assert titles( model ) == 'cadfbe'
+    
+    # nowhere to go
+    spy = Spy( model )
+    model.shift_rows( [ 0 ], up=True )
+    assert titles( model ) == 'cadfbe'
+    assert spy.signals == []
+
+def test_shift_rows_filtered( model ):
+    
+    model.set_quick_filter( columns={ 'title': '[ace]' }, regex=True )
+    
+    # `e` jumps over shown `c`, hidden `d` stays
+    model.shift_rows( [ 4 ], up=True )
+    assert titles( model ) == 'abedcf'
+    assert shown( model ) == 'aec'
+
+def test_drop( model ):
+    
+    # `a`, `b` dropped onto `e`
+    assert drop( model, [ 10, 11 ], 4 )
+    assert titles( model ) == 'cdabef'
+    
+    # onto empty space
+    assert drop( model, [ 12 ], -1 )
+    assert titles( model ) == 'dabefc'
+
+def test_drop_filtered( model ):
+    
+    model.set_quick_filter( columns={ 'title': '[ace]' }, regex=True )
+    
+    # `a` dropped onto shown `e`, lands right before it
+    assert drop( model, [ 10 ], 2 )
+    assert titles( model ) == 'bcdaef'
+    assert shown( model ) == 'cae'
+
+def test_append_buffer( model ):
+    
+    spy = Spy( model )
+    
+    # shown right away, new columns come first
+    model.add_df( pd.DataFrame( { 'title': [ 'g' ], 'year': [ 2001 ] }, index=[ 16 ] ) )
+    model.add_df( pd.DataFrame( { 'title': [ 'h' ] }, index=[ 17 ] ) )
+    assert spy.signals == [ 'rowsInserted', 'rowsInserted' ]
+    assert model.rowCount()==8 and model.columnCount()==2
+    assert shown( model ) == 'abcdefgh'
+    assert model.data( model.index( 6, 1 ) ) == '2001'
+    assert model.data( model.index( 7, 1 ) ) == ''
+    
+    # a single frame whenever `df` is needed
+    assert list( model.df.index ) == list( range( 10, 18 ) )
+    assert titles( model ) == 'abcdefgh'
+    assert model.dirty_locs == set([ 16, 17 ])
+
+def test_append_buffer_consolidates( app ):
+    
+    m = PandasTableModel()
+    m.switch_df( pd.DataFrame( { 'title': [ 'a' ] } ) )
+    n = APPEND_BUFFER_ROWS_DEFAULT + 5
+    for loc in range( 1, n ):
+        m.add_df( pd.DataFrame( { 'title': [ str(loc) ] }, index=[ loc ] ) )
+    
+    assert m.rowCount()==n
+    assert m.data( m.index( n-1, 0 ) ) == str( n-1 )
+    assert list( m.df.index ) == list( range( n ) )
+
+def test_append_buffer_filtered( model ):
+    
+    model.set_quick_filter( [ 'x' ] )
+    model.add_df( pd.DataFrame( { 'title': [ 'x1', 'y', 'x2' ] }, index=[ 16, 17, 18 ] ) )
+    
+    # only matching rows are shown
+    assert shown( model ) == 'x1x2'
+
+def test_add_rows_renumbers( model ):
+    
+    # edited row is remembered by its new number
+    model.mark_clean()
+    model.setData( model.index( 1, 0 ), 'B' )
+    assert model.dirty_locs == set([ 11 ])
+    
+    model.add_rows([ { 'title': 'g' } ])
+    assert list( model.df.index ) == list( range( 7 ) )
+    assert model.dirty_locs == set([ 1, 6 ])
+    assert list( model.dirty_subdf()['title'] ) == [ 'B', 'g' ]
+    
+    model.add_rows([ { 'title': 'h' }, { 'title': 'i' } ])
+    assert list( model.df.index ) == list( range( 9 ) )
+    assert model.dirty_locs == set([ 1, 6, 7, 8 ])
+
+def test_add_rows_renumbers_sort_keys( app ):
+    
+    m = PandasTableModel()
+    m.switch_df( pd.DataFrame( { 'title': [ 'a', 'b', 'c' ] } ) )
+    m.sort( 0, QtCore.Qt.AscendingOrder )
+    
+    # `0` is gone, `2` (`c`) is the first one now
+    m.delete_rows( [ 0 ] )
+    m.move_rows( [ 1 ], 0 )
+    assert titles( m ) == 'cb'
+    
+    # `c` and `b` become `0` and `1`, the new one is `2`
+    m.add_rows([ { 'title': 'a' } ])
+    m.sort( 0, QtCore.Qt.DescendingOrder )
+    assert titles( m ) == 'cba'
+
+def test_add_rows_renumbers_search_text( app ):
+    
+    m = PandasTableModel()
+    m.switch_df( pd.DataFrame( { 'title': [ 'x', 'y' ] } ) )
+    m.set_quick_filter( [ 'x' ] )
+    m.set_quick_filter()
+    m.sort( 0, QtCore.Qt.DescendingOrder )
+    
+    m.add_rows([ { 'title': 'z' } ])
+    m.set_quick_filter( [ 'x' ] )
+    assert shown( m ) == 'x'
+
+def test_remove_ranges( model ):
+    
+    model.mark_dirty( [ 11, 12, 13 ] )
+    spy = Spy( model )
+    
+    # the last range first, so that positions stay valid
+    model.delete_rows( [ 4, 1, 2 ] )
+    assert titles( model ) == 'adf'
+    assert spy.removed == [ ( 4, 4 ), ( 1, 2 ) ]
+    assert not 'modelReset' in spy.signals
+    assert model.dirty_locs == set([ 13 ])
+
+def test_remove_ranges_filtered( model ):
+    
+    model.set_quick_filter( columns={ 'title': '[ace]' }, regex=True )
+    spy = Spy( model )
+    
+    # hidden `b` goes silently, `c` and `e` are shown
+    # one after another
+    model.delete_rows( [ 1, 2, 4 ] )
+    assert titles( model ) == 'adf'
+    assert shown( model ) == 'a'
+    assert spy.removed == [ ( 1, 2 ) ]
+
+def test_remove_ranges_reset( app ):
+    
+    m = PandasTableModel()
+    n = 2*( REMOVE_RANGES_MAX+1 )
+    m.switch_df( pd.DataFrame( { 'title': [ str(iloc) for iloc in range( n ) ] } ) )
+    spy = Spy( m )
+    
+    # too many ranges, a single reset instead
+    m.delete_rows( range( 0, n, 2 ) )
+    assert spy.signals == [ 'modelReset' ]
+    assert list( m.df['title'] ) == [ str(iloc) for iloc in range( 1, n, 2 ) ]
+    assert m.data( m.index( 0, 0 ) ) == '1'
+
+def test_remove_everything( model ):
+    
+    model.delete_rows( range( 6 ) )
+    assert model.rowCount()==0 and model.columnCount()==0
+
+def test_replace_subdf( model ):
+    
+    model.add_column( 'year', '2001' )
+    model.sort( 0, QtCore.Qt.DescendingOrder )
+    model.mark_clean()
+    spy = Spy( model )
+    
+    # whole rows are replaced, missing columns become empty,
+    # unknown rows are ignored
+    model.replace_subdf( pd.DataFrame( { 'title': [ 'B', 'E' ], 'genre': [ 'x', 'y' ] }, index=[ 11, 14 ] ) )
+    model.replace_subdf( pd.DataFrame( { 'title': [ 'z' ] }, index=[ 99 ] ) )
+    assert list( model.df.columns ) == [ 'title', 'year', 'genre' ]
+    assert titles( model ) == 'fEdcBa'
+    assert model.data( model.index( 1, 1 ) ) == ''
+    assert model.data( model.index( 1, 2 ) ) == 'y'
+    assert model.data( model.index( 0, 1 ) ) == '2001'
+    assert model.dirty_locs == set([ 11, 14 ])
+    assert 'dataChanged' in spy.signals and not 'modelReset' in spy.signals
+    
+    # changed column is sorted by new values
+    model.sort( 0, QtCore.Qt.AscendingOrder )
+    assert titles( model ) == 'BEacdf'
+
+def test_replace_subdf_removes_empty_rows( model ):
+    
+    model.set_quick_filter( columns={ 'title': '[ace]' }, regex=True )
+    spy = Spy( model )
+    
+    # rows that became fully empty are removed
+    model.replace_subdf( pd.DataFrame( { 'title': [ None, 'C' ] }, index=[ 10, 12 ] ) )
+    assert titles( model ) == 'bCdef'
+    assert shown( model ) == 'Ce'
+    assert spy.removed == [ ( 0, 0 ) ]
+
+def test_df_setter_forgets_caches( model ):
+    
+    # strings, search text and sort keys of old rows
+    model.set_quick_filter( [ 'a' ] )
+    model.set_quick_filter()
+    model.sort( 0, QtCore.Qt.AscendingOrder )
+    assert shown( model ) == 'abcdef'
+    
+    # same index, other values
+    model.df = pd.DataFrame( { 'title': list( 'fedcba' ) }, index=range( 10, 16 ) )
+    assert shown( model ) == 'fedcba'
+    model.set_quick_filter( [ 'a' ] )
+    assert shown( model ) == 'a'
+    model.set_quick_filter()
+    model.sort( 0, QtCore.Qt.AscendingOrder )
+    assert shown( model ) == 'abcdef'
+
+def test_sort_by( app ):
+    
+    m = PandasTableModel()
+    m.switch_df( pd.DataFrame( { 'album': [ 'a10', 'a9', 'a9', 'a10' ], 'title': list( 'wxyz' ) } ) )
+    
+    # the first column is the most important one,
+    # unknown columns are skipped
+    m.sort_by([ ( 'album', True ), ( 'genre', True ), ( 'title', False ) ])
+    assert titles( m ) == 'yxzw'
+    assert m.sort_columns() == [ ( 'album', True ), ( 'title', False ) ]
+    
+    # a header click sorts by a single column
+    m.sort( 1, QtCore.Qt.AscendingOrder )
+    assert titles( m ) == 'wxyz'
+    assert m.sort_columns() == [ ( 'title', True ) ]
+
+def pages( titles_, page_size, requests=None ):
+    
+    # page source of `set_page_source` over `titles_`,
+    # pages arrive right away or, with `requests`,
+    # when the test calls them
+    
+    fetched = []
+    
+    def fetch_page( n, page_received ):
+        start = 3 + len( fetched )*page_size
+        df = pd.DataFrame( { 'title': list( titles_[ start:start+n ] ) }, index=range( start, min( start+n, len( titles_ ) ) ) )
+        fetched.append( df )
+        if requests is None:
+            page_received( df )
+        else:
+            requests.append( lambda: page_received( df ) )
+    
+    return fetch_page
+
+def test_sort_by_fetches_the_rest( app ):
+    
+    m = PandasTableModel()
+    m.switch_df( pd.DataFrame( { 'title': list( 'gec' ) } ) )
+    m.set_page_source( pages( 'gecafdb', 2 ), 2 )
+    
+    m.sort_by([ ( 'title', True ) ])
+    assert m.is_complete()
+    assert titles( m ) == 'abcdefg'
+
+def test_sort_by_fetches_the_rest_in_background( app ):
+    
+    requests = []
+    m = PandasTableModel()
+    m.switch_df( pd.DataFrame( { 'title': list( 'gec' ) } ) )
+    m.set_page_source( pages( 'gecafdb', 2, requests ), 2 )
+    
+    # rows that are here are sorted right away
+    m.sort_by([ ( 'title', True ) ])
+    assert titles( m ) == 'ceg'
+    assert len( requests )==1
+    
+    requests.pop(0)()
+    assert len( requests )==1
+    requests.pop(0)()
+    # the last page is shorter, empty here
+    assert titles( m ) == 'cegafdb'
+    requests.pop(0)()
+    assert m.is_complete()
+    assert titles( m ) == 'abcdefg'
+    
+    # new contents don't wait for pages of old ones
+    m.set_page_source( pages( 'gecafdb', 2, requests ), 2 )
+    m.sort_by([ ( 'title', False ) ])
+    m.switch_df( pd.DataFrame( { 'title': list( 'xy' ) } ) )
+    requests.pop(0)()
+    assert titles( m ) == 'xy'
+
+#---------------------------------------------------------------------------+++
+# end 2026.10.18
+# created
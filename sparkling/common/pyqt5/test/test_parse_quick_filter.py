@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+#Python utility "Test for Quick Filter". Checks how the quick filter bar text of a "Pandas TableView" is parsed. Copyright (C) 2023 Anna Anikina
+#
+#This program is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#This program is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+#---------------------------------------------------------------------------+++
+# Run with `pytest`.
+
+# embedded in python
+# pip install
+import pytest
+pytest.importorskip( 'pandas' )
+pytest.importorskip( 'natsort' )
+pytest.importorskip( 'PyQt5' )
+# same project
+from sparkling.common.pyqt5.PandasTableView import parse_quick_filter
+
+COLUMNS = [ 'title', 'artist' ]
+
+def test_words():
+    assert parse_quick_filter( '  foo   Bar ', COLUMNS ) == ( [ 'foo', 'Bar' ], {}, False )
+
+def test_column_terms():
+    
+    assert parse_quick_filter( 'title:abc foo artist:x:y', COLUMNS ) \
+        == ( [ 'foo' ], { 'title': 'abc', 'artist': 'x:y' }, False )
+    
+    # not a column, an ordinary word
+    assert parse_quick_filter( 'year:1999', COLUMNS ) == ( [ 'year:1999' ], {}, False )
+
+def test_regex():
+    
+    assert parse_quick_filter( ' /a b+/ ', COLUMNS ) == ( [ 'a b+' ], {}, True )
+    
+    # a single slash is an ordinary word
+    assert parse_quick_filter( '/', COLUMNS ) == ( [ '/' ], {}, False )
+
+def test_empty():
+    assert parse_quick_filter( '   ', COLUMNS ) == ( [], {}, False )
+
+#---------------------------------------------------------------------------+++
+# end 2026.10.18
+# created
@@ -24,7 +24,12 @@ log = logging.getLogger(__name__)
 # pip install
 import pandas as pd
 # same project
-from sparkling.neo4j.Connection import Connection as BaseConnection
+from sparkling.neo4j.Connection import Connection as BaseConnection, BATCH_SIZE_DEFAULT
+from sparkling.neo4j.Neo4jColumns import LABELS_LIST
+from sparkling.neo4j.QueryCache import (
+    QueryCache, is_write_query,
+    CACHE_MAX_BYTES_DEFAULT, CACHE_TTL_DEFAULT
+    )
 from sparkling.grimoire.PlaylistColumns import (
     ColumnsPlaylist, NEO4J_LABEL_PLAYLIST,
     NODE, DB_DEFAULT,
@@ -33,6 +38,25 @@ from sparkling.grimoire.PlaylistColumns import (
     )
 # common
 from sparkling.common import unique_loc
+from sparkling.common.BaseColumns import BaseColumns
+
+class ColumnsReplaceSummary( BaseColumns ):
+    
+    # `Connection.replace_nodes` returns a dictionary
+    # with these keys.
+    
+    # how many nodes got new properties
+    replaced = 'replaced'
+    
+    # how many nodes got new labels
+    relabeled = 'relabeled'
+    
+    # identities that were not found on server
+    missing = 'missing'
+    
+    # identities that were not replaced because
+    # their transaction failed
+    failed = 'failed'
     
 class Connection( BaseConnection ):
     
@@ -45,10 +69,74 @@ class Connection( BaseConnection ):
     # static list
     _db_names = []
     
-    def __init__( self, socket, username, password ):
+    # responses of read queries,
+    # `None` = caching is disabled
+    _cache = None
+    
+    def __init__( self, socket, username, password,
+                  cache_max_bytes=CACHE_MAX_BYTES_DEFAULT,
+                  cache_ttl=CACHE_TTL_DEFAULT ):
         
         super( Connection, self ).__init__( socket, username, password )
         
+        if cache_max_bytes > 0:
+            self._cache = QueryCache( max_bytes=cache_max_bytes, ttl=cache_ttl )
+        
+    def query( self, query, db_name=None, params=None, cache=True ):
+        
+        # Same as parent, but identical read queries
+        # are answered from cache unless `cache` is `False`.
+        # Write queries drop cached responses of their db.
+        
+        if self._cache is None:
+            return super( Connection, self ).query( query, db_name=db_name, params=params )
+        
+        if is_write_query( query ):
+            try:
+                return super( Connection, self ).query( query, db_name=db_name, params=params )
+            finally:
+                self._cache.invalidate( db_name )
+        
+        if not cache:
+            # read once, never asked again
+            return super( Connection, self ).query( query, db_name=db_name, params=params )
+        
+        key = self._cache.key( query, db_name=db_name, params=params )
+        response = self._cache.get( key )
+        if response is not None:
+            return response
+        
+        # db may be written to while i'm reading
+        generation = self._cache.generation( db_name )
+        response = super( Connection, self ).query( query, db_name=db_name, params=params )
+        if response is not None:
+            self._cache.put( key, response, generation=generation )
+        
+        return response
+    
+    def write( self, work, db_name=None, *args, **kwargs ):
+        
+        # Whatever `work` does, cached responses
+        # of this db are no longer valid.
+        
+        try:
+            return super( Connection, self ).write( work, db_name, *args, **kwargs )
+        finally:
+            if not self._cache is None:
+                self._cache.invalidate( db_name )
+    
+    def cache_stats( self ):
+        
+        # For tuning. See `ColumnsCacheStats`.
+        
+        if self._cache is None:
+            return {}
+        return self._cache.stats()
+    
+    def clear_cache( self ):
+        if not self._cache is None:
+            self._cache.invalidate()
+        
     def dl_db_names( self ):
         
         # Always returns a list.
@@ -66,7 +154,7 @@ class Connection( BaseConnection ):
         log.debug( 'successfully obtained %s db names'%len(self._db_names) )
         return self._db_names
     
-    def import_from_csv( self, src, db_name ):
+    def import_from_csv( self, src, db_name, batch_size=BATCH_SIZE_DEFAULT ):
         
         # Imports rows from .csv into current playlist database as nodes.
         # Supports reserved columns.
@@ -75,114 +163,130 @@ class Connection( BaseConnection ):
         # or
         # - reserved (please see sparkling.neo4j.Columns).
         
-        df = pd.read_csv( src )
-        df.reset_index( drop=True, inplace=True ) # remove old identities
-        df.fillna( '', inplace=True ) # i want only str
-        
-        nodes = ColumnsPlaylist.df2nodes( df )
+        # The .csv is never fully loaded: I read it in chunks
+        # of `batch_size` rows and send each chunk in a single
+        # transaction.
+        # Returns identities in .csv row order.
         
         identities = []
-        for node in nodes:
+        
+        chunks = pd.read_csv( src, dtype=str, chunksize=batch_size ) # i want only str
+        for df in chunks:
+            
+            df.fillna( '', inplace=True )
             
-            response = self.query(
-                f'CREATE {node} RETURN ID({NODE}) AS id',
-                db_name=db_name
-                )
+            new_identities = self.create_nodes( df, db_name=db_name )
+            if new_identities is None:
+                log.error( f'failed to import rows {len(identities)}-{len(identities)+len(df.index)} from {src} to db {db_name}, previous rows were imported, stopping' )
+                break
             
-            if response is None:
-                log.error( f'failed to connect to server to create node {node} in db {db_name}' )
-            else:
-                for record in response:
-                    identities.append( str( record['id'] ) ) # !!!
+            identities.extend([ str(identity) for identity in new_identities ]) # !!!
+            log.debug( f'imported {len(identities)} rows from {src}' )
         
         return identities
     
-    def export_db_to_df( self, db_name ):
+    def export_db_to_df( self, db_name, batch_size=BATCH_SIZE_DEFAULT ):
         
         # Saves whole db nodes data to disk.
         
-        query = f'MATCH ({NODE}) RETURN {NODE}'
+        query = f'MATCH ({NODE}) RETURN {NODE}, labels({NODE}) AS {LABELS_LIST}'
             
         # get df
+        # records are converted batch by batch,
+        # labels are returned together with nodes
         
-        response = self.query( query, db_name=db_name )
-            
-        if response is None:
+        try:
+            batches = self.query_iter( query, db_name=db_name, batch_size=batch_size )
+            df = ColumnsPlaylist.batches2df( batches )
+        except Exception:
             log.error( 'can\'t get a response' )
             return
-                
-        df = pd.DataFrame([ r[NODE] for r in response ])
-        df.index = [ r[NODE].id for r in response ]
-        df.fillna( '', inplace=True )
         
-        ColumnsPlaylist.fill_reserved_columns(
-            self, df, db_name=db_name )
+        if df is None:
+            # empty db
+            return pd.DataFrame()
         
         return df
         
-    def replace_nodes( self, df, db_name ):
+    def replace_nodes( self, df, db_name, batch_size=BATCH_SIZE_DEFAULT ):
         
-        #--------------------+++
-        # Definitions.
+        # Fully replaces nodes with values from df.
+        # I expect df.index to contain ID(node).
+        
+        # Each chunk of `batch_size` rows is sent within a single
+        # transaction: one `UNWIND` query for all properties, then
+        # one query per distinct label change.
+        # Returns a summary of what changed
+        # (see `ColumnsReplaceSummary`).
         
         # short name for convenience
         c = self.Columns
+        cs = ColumnsReplaceSummary
         
-        def replace_labels():
+        # reserved column `labels` may be absent - this means that
+        # labels were not changed
+        has_labels = c.neo4j_labels in df.columns
+        
+        summary = {
+            cs.replaced: 0,
+            cs.relabeled: 0,
+            cs.missing: [],
+            cs.failed: [],
+            }
+        
+        df = df.fillna( '' )
+        for start in range( 0, len(df.index), batch_size ):
             
-            # Update reserved column `labels`.
+            chunk = df.iloc[ start:start+batch_size ]
+            identities = [ int(loc) for loc in chunk.index ]
+            records = chunk.to_dict( 'records' )
             
-            if not c.neo4j_labels in df.columns:
-                # nothing to replace - labels were
-                # not chaged
-                return
-                
-            # get old ones
-            old_labels = None
-            if response is not None:
-                old_labels = []
-                for r in response: old_labels.extend( r['labels_list'] )
-                if len( old_labels )>0:
-                    old_labels = LABEL_SEPARATOR.join(old_labels)
+            rows = [ {
+                'identity': identity,
+                'props': c.clean_node_parameters( row ),
+                } for identity, row in zip( identities, records ) ]
             
-            # get new ones
-            new_labels = LABEL_SEPARATOR.join(
-                row[c.neo4j_labels].split(MULTIVALUE_SEPARATOR) )
+            def work( tx ):
+                
+                # replace parameters
+                response = tx.run( c.convert_bulk_replace(), { 'rows': rows } )
+                old_labels = { r['identity']: r[LABELS_LIST] for r in response }
+                
+                # replace reserved columns
+                # group nodes by label change, so that i send
+                # one query per distinct change rather then per node
+                changes = {}
+                if has_labels:
+                    for identity, row in zip( identities, records ):
+                        if not identity in old_labels:
+                            continue
+                        change = c.get_label_changes( old_labels[identity], row[c.neo4j_labels] )
+                        if change == ( '', '' ):
+                            continue
+                        changes.setdefault( change, [] ).append( identity )
+                
+                for ( to_remove, to_add ), changed in changes.items():
+                    query = c.convert_bulk_relabel( to_remove, to_add )
+                    tx.run( query, { 'identities': changed } ).consume()
+                
+                return old_labels.keys(), sum([ len(v) for v in changes.values() ])
             
-            # replace
+            result = self.write( work, db_name=db_name )
+            if result is None:
+                log.error( f'failed to replace {len(identities)} nodes in db {db_name}' )
+                summary[cs.failed].extend( identities )
+                continue
             
-            none_to_some = len(new_labels)>0 and not( type(old_labels) == str )
-            some_to_none = type(old_labels) == str and len(new_labels)==0
-            some_to_some = type(old_labels) == str and len(new_labels)>0
+            found, n_relabeled = result
+            summary[cs.replaced] += len( found )
+            summary[cs.relabeled] += n_relabeled
+            summary[cs.missing].extend([ identity for identity in identities if not identity in found ])
             
-            query = None
-            if none_to_some:
-                query = f'MATCH ({NODE}) WHERE ID({NODE})={identity} SET {NODE}:{new_labels}'
-            elif some_to_none:
-                query = f'MATCH ({NODE}) WHERE ID({NODE})={identity} REMOVE {NODE}:{old_labels}'
-            elif some_to_some:
-                query = f'MATCH ({NODE}) WHERE ID({NODE})={identity} REMOVE {NODE}:{old_labels} SET {NODE}:{new_labels}'
-            if query:
-                self.query( query, db_name=db_name )
-        
-        #--------------------+++
-        # Actual code.
-        
-        # Fully replaces nodes with values from df.
-        # I expect df.index to contain ID(node).
-        
-        for identity, row in df.fillna('').iterrows():
-            
-            # replace parameters
-            params = c.convert_node_parameters( dict(row) )
-            query = f'MATCH ({NODE}) WHERE ID({NODE})={identity} SET {NODE}={params} RETURN labels({NODE}) AS labels_list'
-            response = self.query( query, db_name=db_name )
+        if len( summary[cs.missing] ) > 0:
+            log.error( f'{len(summary[cs.missing])} nodes to replace were not found in db {db_name}' )
             
-            # replace reserved columns
-            # order is important, because i chain return
-            # values in order to reduce the number of server requests
-            replace_labels()
-
+        return summary
+    
     def _create_default_full_text_search_index( self, db_name ):
         
         # Creates default `full-text search index` on all `nodes`
@@ -214,5 +318,5 @@ class Connection( BaseConnection ):
         self.query( command, db_name=db_name )
             
 #---------------------------------------------------------------------------+++
-# end 2023.10.14
-# simplified
+# end 2026.10.18
+# pages can bypass the cache
@@ -30,6 +30,9 @@ from sparkling.grimoire.GrimoireNeo4jConnection import (
     Connection,
     NODE, DB_DEFAULT
     )
+from sparkling.neo4j.DbExporter import DbExporter, ColumnsExportFormats
+from sparkling.neo4j.QueryCache import CACHE_MAX_BYTES_DEFAULT, CACHE_TTL_DEFAULT
+from sparkling.neo4j.QueryStats import QUERY_STATS, SLOW_QUERY_SECONDS_DEFAULT
 from sparkling.grimoire.pyqt5.FileRenamer import PresetFileRenamer
 
 def generate_neo4j_settings( src ):
@@ -39,6 +42,15 @@ def generate_neo4j_settings( src ):
 socket: #bolt://localhost:7687
 username: SOME_USERNAME
 password: SOME_PASSWORD
+# optional, responses of identical queries are reused
+# 0 = disable caching
+#cache_max_bytes: 67108864
+#cache_ttl: 300
+# optional, queries slower than this are written to slow_queries.log
+#slow_query_seconds: 1.0
+# optional, capture PROFILE/EXPLAIN of slow queries, once per query;
+# PROFILE runs a slow read query again in background
+#capture_query_plans: false
 ..."""
         
     savef( src, text )
@@ -72,6 +84,7 @@ class MainDoer( DAutorunDoer ):
     class Files:
         NEO4J_SETTINGS = 'neo4j_settings.yaml'
         RENAMING_RULES = 'renaming_rules.yaml'
+        SLOW_QUERIES_LOG = 'slow_queries.log'
         
     class Presets:
         FileRenamer = None
@@ -88,6 +101,7 @@ class MainDoer( DAutorunDoer ):
         self.Folders.EXPORTED_CSV = self.set_folder( self.Folders.EXPORTED_CSV )
         self.Files.NEO4J_SETTINGS = self.set_file( self.Files.NEO4J_SETTINGS )
         self.Files.RENAMING_RULES = self.set_file( self.Files.RENAMING_RULES )
+        self.Files.SLOW_QUERIES_LOG = self.set_file( self.Files.SLOW_QUERIES_LOG )
         # presets
         if not os.path.isfile( self.Files.RENAMING_RULES ):
             generate_renaming_rules( self.Files.RENAMING_RULES )
@@ -116,6 +130,8 @@ class MainDoer( DAutorunDoer ):
             socket=settings['socket'],
             username=settings['username'],
             password=settings['password'],
+            cache_max_bytes=settings.get( 'cache_max_bytes', CACHE_MAX_BYTES_DEFAULT ),
+            cache_ttl=settings.get( 'cache_ttl', CACHE_TTL_DEFAULT ),
             )
         
         if not conn.is_valid():
@@ -123,6 +139,11 @@ class MainDoer( DAutorunDoer ):
             os.startfile( src )
             return False
         
+        # instrumentation
+        QUERY_STATS.slow_query_seconds = settings.get( 'slow_query_seconds', SLOW_QUERY_SECONDS_DEFAULT )
+        QUERY_STATS.capture_plans = settings.get( 'capture_query_plans', False )
+        QUERY_STATS.set_slow_log( self.Files.SLOW_QUERIES_LOG )
+        
         self.conn = conn
         return True
         
@@ -145,22 +166,37 @@ class MainDoer( DAutorunDoer ):
         
         df.to_csv( src, index=True ) # keep identities just in case
     
-    def export_db_to_csv( self, db_name ):
+    def export_db_to_csv( self, db_name, fmt=ColumnsExportFormats.csv, resume=True ):
+        
+        # Saves whole db to disk chunk by chunk,
+        # memory usage does not depend on db size.
+        # If previous export of this db was interrupted,
+        # it will be continued.
         
         if not self.conn:
             log.error( 'no conn' )
             return
         
-        df = self.conn.export_db_to_df( db_name )
-        
         # save to disk
         
         src = os.path.join(
             self.Folders.EXPORTED_CSV,
-            f'full_{db_name}.csv'
+            f'full_{db_name}.{fmt}'
             )
         
-        df.to_csv( src, index=True ) # keep identities just in case
+        def report_progress( n_rows, n_total ):
+            log.info( f'exporting db {db_name}: {n_rows}/{n_total} rows' )
+        
+        try:
+            exporter = DbExporter(
+                self.conn, db_name, src,
+                fmt=fmt,
+                progress_callback=report_progress
+                )
+        except ( ValueError, ImportError ) as ex:
+            log.error( f'can\'t export db {db_name} because {ex}' )
+            return
+        exporter.run( resume=resume )
             
     def autorun( self ):
         
@@ -177,11 +213,15 @@ class MainDoer( DAutorunDoer ):
         if len( self.conn._db_names )==0:
             self.conn.dl_db_names()
         
+        # playlists saved by older versions
+        # keep their members in a str
+        self.conn.Columns.migrate_identities_to_members( self.conn )
+        
         # TODO
         # remember last used playist, auto load it
         
         return True, 'ok'
     
 #---------------------------------------------------------------------------+++
-# end 2023.10.19
-# hardcoded field names in example renaming rules
+# end 2026.10.18
+# export errors are logged
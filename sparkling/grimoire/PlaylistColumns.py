@@ -16,6 +16,10 @@
 
 #---------------------------------------------------------------------------+++
 
+# logging
+import logging
+log = logging.getLogger(__name__)
+
 # same project
 # code
 from sparkling.grimoire.GrimoireNeo4jColumns import (
@@ -24,7 +28,7 @@ from sparkling.grimoire.GrimoireNeo4jColumns import (
     LABEL_SEPARATOR, MULTIVALUE_SEPARATOR,
     SEARCH_INDEX_DEFAULT
     )
-from sparkling.neo4j.Neo4jColumns import QUERY_KEYWORDS
+from sparkling.neo4j.Neo4jColumns import QUERY_KEYWORDS, LABELS_LIST
 # common
 from sparkling.common import unique_loc
 # enums
@@ -62,6 +66,12 @@ class ColumnsPlaylist( Columns ):
     db_name = 'db_name'
     
     # which nodes were manually added to this playlist previously?
+    # int list, in playlist order; it is changed only by
+    # dedicated incremental queries (see `add_members`)
+    members = 'playlist_members'
+    
+    # legacy space-separated str version of `members`,
+    # see `migrate_identities_to_members`
     identities = 'identities'
     
     # which nodes were automatically filtered in this playlist
@@ -77,7 +87,8 @@ class ColumnsPlaylist( Columns ):
     # screen names
     texts = {
         db_name: 'DB name',
-        identities: 'Node IDs',
+        members: 'Node IDs',
+        identities: 'Node IDs (legacy)',
         auto_query: 'Auto Query',
         plugins: 'Plugins',
         Columns.title: 'Playlist name',
@@ -102,17 +113,52 @@ class ColumnsPlaylist( Columns ):
     @classmethod
     def validate_identities( cls, playlist ):
         
+        # Converts legacy `identities` into `members`.
+        
         if not cls.identities in playlist:
             return
         
-        identities = playlist[cls.identities]
+        identities = playlist.pop( cls.identities )
+        if cls.members in playlist:
+            return
         if type(identities)==str:
             if len( identities.strip() ) > 0:
-                # everything ok
-                return
+                playlist[cls.members] = [ int(loc) for loc in identities.split(' ') if loc!='' ]
         
-        # query is bad
-        playlist.pop( cls.identities )
+    @classmethod
+    def get_members( cls, playlist ):
+        
+        # Standard way to get playlist members
+        # as list of int, in playlist order.
+        
+        cls.validate_identities( playlist )
+        
+        members = playlist.get( cls.members )
+        if type(members) in [ list, tuple ]:
+            return [ int(loc) for loc in members ]
+        
+        return []
+    
+    @classmethod
+    def keeps_members( cls, playlist ):
+        
+        # Whether `members` of this playlist mean anything:
+        # saved playlists remember their row ordering,
+        # manual playlists consist of members.
+        # Results of unsaved auto queries are never remembered.
+        
+        return cls.identity in playlist or not cls.auto_query in playlist
+    
+    @classmethod
+    def set_auto_query( cls, playlist, query ):
+        
+        # Members found by the previous query
+        # mean nothing for the new one.
+        
+        if not playlist.get( cls.auto_query )==query:
+            playlist.pop( cls.members, None )
+            playlist.pop( cls.identities, None )
+        playlist[cls.auto_query] = query
     
     @classmethod
     def validate_plugins( cls, settings ):
@@ -147,7 +193,7 @@ class ColumnsPlaylist( Columns ):
     @classmethod
     def get_contents_query( cls, playlist ):
         
-        # Creates appropriate `query` or `None`
+        # Creates appropriate `( query, params )` or `None`
         # for chosen `playlist definition` so that I can
         # download this playlist's contents easily
         # whenever suitable time comes.
@@ -156,37 +202,262 @@ class ColumnsPlaylist( Columns ):
         # `identities` and `auto query` are present,
         # in such case i want to prioritize the `auto query`
         
+        # both queries return plain nodes, `load_df` will
+        # make them return labels (and only the necessary
+        # properties) as well
+        
         cls.validate_auto_query( playlist )
         if cls.auto_query in playlist:
             # i already have a database query
-            return playlist[cls.auto_query]
+            return playlist[cls.auto_query], {}
         
-        cls.validate_identities( playlist )
-        if cls.identities in playlist:
+        identities = cls.get_members( playlist )
+        if len( identities ) > 0:
             # i need to construct a standard identities
             # query with a predefined node variable name
             
-            identities = playlist[cls.identities].split(' ')
             query = f'MATCH ({NODE}) ' \
-                f'WHERE toString(ID({NODE})) IN {identities} ' \
+                f'WHERE ID({NODE}) IN $identities ' \
                 f'RETURN {NODE}'
                 
-            return query
+            return query, { 'identities': identities }
         
         # no necessary fields = no query
     
+    @classmethod
+    def load_contents( cls, conn, playlist, columns=None ):
+        
+        # Downloads contents of given `playlist` as df.
+        # Returns `None` if the playlist is empty or the query failed.
+        
+        if cls.identity in playlist:
+            # members in settings may be outdated,
+            # db is always right
+            members = cls.dl_members( conn, playlist[cls.identity] )
+            if not members is None:
+                playlist[cls.members] = members
+        
+        contents_query = cls.get_contents_query( playlist )
+        if contents_query is None:
+            return
+        
+        if cls.auto_query in playlist:
+            query, params = contents_query
+            df = cls.load_df( conn, query, db_name=playlist[cls.db_name], params=params, columns=columns )
+            
+            members = cls.get_members( playlist )
+            if df is None or len( members )==0:
+                return df
+            
+            # enforce specific row ordering
+            # help:
+            # https://stackoverflow.com/questions/30009948/how-to-reorder-indexed-rows-based-on-a-list-in-pandas-data-frame
+            return df.reindex( members )
+        
+        # big manual playlists are downloaded in chunks,
+        # already in playlist order
+        return cls.load_df_by_identities( conn, cls.get_members( playlist ), db_name=playlist[cls.db_name], columns=columns )
+    
     @classmethod
     def add_identities( cls, settings, identities ):
         
         # Standard way to add some identities
-        # to current settings.
-        
-        if cls.identities in settings:
-            new = settings[ cls.identities ].split(' ')
-            new.extend(identities)
-            settings[ cls.identities ] = ' '.join( set(new) )
-        else:
-            settings[ cls.identities ] = ' '.join( identities )
+        # to settings that are not saved to db.
+        # For playlists saved to db see `add_members`.
+        
+        members = cls.get_members( settings )
+        known = set( members )
+        for loc in identities:
+            loc = int(loc)
+            if not loc in known:
+                members.append( loc )
+                known.add( loc )
+        settings[ cls.members ] = members
+    
+    @classmethod
+    def convert_members_add( cls, playlist_identity, identities, position=None ):
+        
+        # Query that inserts `identities` into playlist members
+        # before `position` (or appends them), skipping the ones
+        # that are already there. Only new identities are sent.
+        # Returns `( query, params )`.
+        
+        query = f'MATCH (p) WHERE ID(p) = $playlist ' \
+            f'WITH p, {cls.__old_members()} AS old ' \
+            f'WITH p, old, [ x IN $identities WHERE NOT x IN old ] AS new, coalesce( $position, size(old) ) AS pos ' \
+            f'SET p.{cls.members} = old[..pos] + new + old[pos..] ' \
+            f'REMOVE p.{cls.identities} ' \
+            f'RETURN p.{cls.members} AS members'
+        
+        params = {
+            'playlist': int(playlist_identity),
+            'identities': cls.__unique( identities ),
+            'position': position,
+            }
+        
+        return query, params
+    
+    @classmethod
+    def convert_members_remove( cls, playlist_identity, identities ):
+        
+        # Query that removes `identities` from playlist members.
+        
+        query = f'MATCH (p) WHERE ID(p) = $playlist ' \
+            f'SET p.{cls.members} = [ x IN {cls.__old_members()} WHERE NOT x IN $identities ] ' \
+            f'REMOVE p.{cls.identities} ' \
+            f'RETURN p.{cls.members} AS members'
+        
+        params = {
+            'playlist': int(playlist_identity),
+            'identities': cls.__unique( identities ),
+            }
+        
+        return query, params
+    
+    @classmethod
+    def convert_members_move( cls, playlist_identity, identities, position ):
+        
+        # Query that moves `identities` so that they start at `position`
+        # (counted without them), keeping their given order.
+        
+        query = f'MATCH (p) WHERE ID(p) = $playlist ' \
+            f'WITH p, [ x IN {cls.__old_members()} WHERE NOT x IN $identities ] AS rest ' \
+            f'SET p.{cls.members} = rest[..$position] + [ x IN $identities WHERE x IN {cls.__old_members()} ] + rest[$position..] ' \
+            f'REMOVE p.{cls.identities} ' \
+            f'RETURN p.{cls.members} AS members'
+        
+        params = {
+            'playlist': int(playlist_identity),
+            'identities': cls.__unique( identities ),
+            'position': int(position),
+            }
+        
+        return query, params
+    
+    @classmethod
+    def convert_members_set( cls, playlist_identity, identities ):
+        
+        # Query that fully replaces playlist members,
+        # for arbitrary reordering.
+        
+        query = f'MATCH (p) WHERE ID(p) = $playlist ' \
+            f'SET p.{cls.members} = $identities ' \
+            f'REMOVE p.{cls.identities} ' \
+            f'RETURN p.{cls.members} AS members'
+        
+        params = {
+            'playlist': int(playlist_identity),
+            'identities': cls.__unique( identities ),
+            }
+        
+        return query, params
+    
+    @classmethod
+    def add_members( cls, conn, playlist_identity, identities, position=None ):
+        # Returns new members or `None`.
+        return cls.__update_members( conn, *cls.convert_members_add( playlist_identity, identities, position=position ) )
+    
+    @classmethod
+    def remove_members( cls, conn, playlist_identity, identities ):
+        return cls.__update_members( conn, *cls.convert_members_remove( playlist_identity, identities ) )
+    
+    @classmethod
+    def move_members( cls, conn, playlist_identity, identities, position ):
+        return cls.__update_members( conn, *cls.convert_members_move( playlist_identity, identities, position ) )
+    
+    @classmethod
+    def set_members( cls, conn, playlist_identity, identities ):
+        return cls.__update_members( conn, *cls.convert_members_set( playlist_identity, identities ) )
+    
+    @classmethod
+    def dl_members( cls, conn, playlist_identity ):
+        
+        # Downloads members of a single playlist.
+        # Returns list or `None`.
+        
+        query = f'MATCH (p) WHERE ID(p) = $playlist ' \
+            f'RETURN {cls.__old_members()} AS members'
+        response = conn.query( query, db_name=DB_DEFAULT, params={ 'playlist': int(playlist_identity) } )
+        if response is None or len( response )==0:
+            return
+        
+        return list( response[0]['members'] )
+    
+    @classmethod
+    def migrate_identities_to_members( cls, conn ):
+        
+        # Converts legacy `identities` str of all playlists
+        # into `members` int list. Safe to run any number of times.
+        # Returns the number of migrated playlists or `None`.
+        
+        query = f'MATCH (p) WHERE p.{cls.identities} IS NOT NULL ' \
+            f'SET p.{cls.members} = {cls.__old_members()} ' \
+            f'REMOVE p.{cls.identities} ' \
+            f'RETURN count(p) AS n'
+        response = conn.query( query, db_name=DB_DEFAULT )
+        if response is None:
+            log.error( 'failed to migrate playlist identities' )
+            return
+        
+        n = response[0]['n']
+        if n > 0:
+            log.info( f'migrated identities of {n} playlists' )
+        return n
+    
+    @classmethod
+    def clean_node_parameters( cls, param_dict ):
+        
+        # `members` are never sent as ordinary property,
+        # see `add_members` and others.
+        
+        props = super( ColumnsPlaylist, cls ).clean_node_parameters( param_dict )
+        props.pop( cls.members, None )
+        return props
+    
+    @classmethod
+    def convert_bulk_replace( cls ):
+        
+        # Same as parent, but `members` survive the replacement,
+        # unless `auto query` was changed: they were ordering
+        # of the old query's results.
+        
+        command = f'UNWIND $rows AS row ' \
+            f'MATCH ({NODE}) WHERE ID({NODE}) = row.identity ' \
+            f'WITH {NODE}, row, {NODE}.{cls.members} AS members, ' \
+            f'coalesce( {NODE}.{cls.auto_query}, \'\' ) = coalesce( row.props.{cls.auto_query}, \'\' ) AS same_query ' \
+            f'SET {NODE} = row.props ' \
+            f'SET {NODE}.{cls.members} = CASE WHEN same_query THEN members ELSE null END ' \
+            f'RETURN ID({NODE}) AS identity, labels({NODE}) AS {LABELS_LIST}'
+        
+        return command
+    
+    @classmethod
+    def __old_members( cls ):
+        
+        # Cypher expression for current members of playlist `p`,
+        # including not yet migrated legacy ones.
+        
+        return f'coalesce( p.{cls.members}, ' \
+            f'[ x IN split( coalesce( p.{cls.identities}, \'\' ), \' \' ) WHERE x <> \'\' | toInteger(x) ] )'
+    
+    @classmethod
+    def __unique( cls, identities ):
+        
+        # Int list without duplicates, order is kept.
+        
+        return list( dict.fromkeys([ int(loc) for loc in identities ]) )
+    
+    @classmethod
+    def __update_members( cls, conn, query, params ):
+        
+        # Playlists live in default db.
+        
+        response = conn.query( query, db_name=DB_DEFAULT, params=params )
+        if response is None or len( response )==0:
+            log.error( f'failed to update members of playlist {params["playlist"]}' )
+            return
+        
+        return list( response[0]['members'] )
                 
     @classmethod
     def get_plugin_changes( cls, old_settings, new_settings ):
@@ -234,10 +505,10 @@ class ColumnsPlaylist( Columns ):
             cls.db_name: DB_DEFAULT, # `nodes` from which `db` this playlist holds
             cls.forbid_deep_deletions: EConsent.CONSENT,
             }
-        node = cls.convert_node( NODE, NEO4J_LABEL_PLAYLIST, param_dict=param_dict )
+        node, params = cls.convert_node( NODE, NEO4J_LABEL_PLAYLIST, param_dict=param_dict )
     
         # send this playlist definition specifically to default db
-        response = conn.query( f'CREATE {node} RETURN {NODE}', db_name=DB_DEFAULT )
+        response = conn.query( f'CREATE {node} RETURN {NODE}', db_name=DB_DEFAULT, params=params )
         df = cls.response2df( response, identity=True ) # i already have `identity` in `index`, but having it in column as well proved to be useful
         df[ cls.neo4j_labels ] = NEO4J_LABEL_PLAYLIST
                 
@@ -250,10 +521,10 @@ class ColumnsPlaylist( Columns ):
         # I assume that I know what I am doing and don't
         # need any additional verifications.
     
-        node = cls.convert_node( NODE, NEO4J_LABEL_PLAYLIST, param_dict=settings )
+        node, params = cls.convert_node( NODE, NEO4J_LABEL_PLAYLIST, param_dict=settings )
     
         # send this playlist definition specifically to default db
-        response = conn.query( f'CREATE {node} RETURN {NODE}', db_name=DB_DEFAULT )
+        response = conn.query( f'CREATE {node} RETURN {NODE}', db_name=DB_DEFAULT, params=params )
         df = cls.response2df( response, identity=False ) # i already have `identity` in `index`
                 
         return df
@@ -271,7 +542,7 @@ class ColumnsPlaylist( Columns ):
         # do all this safer
         
         # attempt to get existing
-        node = cls.convert_node( NODE, NEO4J_LABEL_PLAYLIST_SELECTOR )
+        node, _ = cls.convert_node( NODE, NEO4J_LABEL_PLAYLIST_SELECTOR )
         response = conn.query( f'MATCH {node} RETURN {NODE}', db_name=DB_DEFAULT )
         
         if len(response) == 0:
@@ -281,17 +552,16 @@ class ColumnsPlaylist( Columns ):
                 cls.db_name: DB_DEFAULT,
                 cls.auto_query: f'MATCH ({NODE}:{NEO4J_LABEL_PLAYLIST}) RETURN {NODE} ORDER BY {NODE}.{cls.track_number}',
                 }
-            node = cls.convert_node( NODE, NEO4J_LABEL_PLAYLIST_SELECTOR, param_dict=settings )
-            response = conn.query( f'CREATE {node} RETURN {NODE}', db_name=DB_DEFAULT )
-        else:
-            response = conn.query( f'MATCH {node} RETURN {NODE}', db_name=DB_DEFAULT )
+            new_node, params = cls.convert_node( NODE, NEO4J_LABEL_PLAYLIST_SELECTOR, param_dict=settings )
+            response = conn.query( f'CREATE {new_node} RETURN {NODE}', db_name=DB_DEFAULT, params=params )
         
-        # download, parse into `settings`
-        settings = response[0]['n']._properties
+        # download, parse into `settings`,
+        # cached responses must not be modified
+        settings = dict( response[0]['n']._properties )
         settings[ cls.identity ] = response[0]['n'].id
         
         return settings
         
 #---------------------------------------------------------------------------+++
-# end 2023.10.21
-# added NEO4J_LABEL_PLAYLIST_SELECTOR, _playlist_of_playlists
+# end 2026.10.18
+# cached playlist of playlists is not modified
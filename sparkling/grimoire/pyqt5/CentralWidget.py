@@ -23,12 +23,13 @@ log = logging.getLogger(__name__)
 # embedded in python
 # pip install
 import pandas as pd
-from PyQt5.QtCore import pyqtSignal, Qt
+from PyQt5.QtCore import pyqtSignal, Qt, QTimer
 from PyQt5.QtWidgets import ( QWidget, QFileDialog,
     QHBoxLayout, QSplitter, QTabWidget, QVBoxLayout,
     QDialog, QComboBox, QDialogButtonBox )
 # same project
 from sparkling.grimoire.GrimoireNeo4jConnection import Connection
+from sparkling.neo4j.AsyncConnection import AsyncConnection
 # playlist selector
 from sparkling.grimoire.pyqt5.PlaylistSelector import (
     ColumnsPlaylist, PlaylistSelector,
@@ -44,6 +45,10 @@ from sparkling.grimoire.pyqt5.FileRenamer import FileRenamer
 from sparkling.grimoire.pyqt5.DatabaseFilter import DatabaseFilter
 #from sparkling.grimoire.pyqt5.TreeFilter import TreeFilter
 
+# playlist settings are written to db after
+# they stop changing for this long, milliseconds
+SETTINGS_WRITE_DELAY_MS_DEFAULT = 1000
+
 class CentralWidget( QWidget ):
     
     CONNECTION_CHANGED = pyqtSignal( Connection )
@@ -64,9 +69,19 @@ class CentralWidget( QWidget ):
         split_hmid = None
     
     _own_doer = None
-
+    
+    # playlist settings that were not written to db yet,
+    # key = playlist identity, value = the newest settings
+    __pending_settings = None # future dictionary
+    __pending_settings_timer = None
+    
+    # members that were removed from playlists but not from db yet,
+    # key = playlist identity, value = member identities
+    __pending_removed_members = None # future dictionary
+    
     def __init__( self,
                   own_doer,
+                  settings_write_delay_ms=SETTINGS_WRITE_DELAY_MS_DEFAULT,
                   parent=None,
                   *args, **kwargs ):
         super( CentralWidget, self ).__init__(
@@ -74,6 +89,15 @@ class CentralWidget( QWidget ):
         
         self._own_doer = own_doer
         
+        # rapid settings changes of the same playlist
+        # end up as a single write
+        self.__pending_settings = {}
+        self.__pending_removed_members = {}
+        self.__pending_settings_timer = QTimer( self )
+        self.__pending_settings_timer.setSingleShot( True )
+        self.__pending_settings_timer.setInterval( settings_write_delay_ms )
+        self.__pending_settings_timer.timeout.connect( self.flush_playlist_settings )
+        
         # gui
         
         # help:
@@ -173,7 +197,8 @@ class CentralWidget( QWidget ):
         
         for loc, row in df.iterrows():
             
-            settings = dict(row)
+            # settings that were not written yet are newer
+            settings = dict( self.__pending_settings.get( loc, row ) )
             settings[ColumnsPlaylist.identity] = loc
             
             # attempt to get existing dedicated viewer
@@ -190,6 +215,8 @@ class CentralWidget( QWidget ):
             
             w.SEND_CONTENTS.connect( self._sent_contents_receive_event )
             w.OVERRIDE_SETTINGS.connect( self._request_playlist_settings_override_event )
+            w.REMOVE_MEMBERS.connect( self._request_remove_members_event )
+            w.KEEP_MEMBERS.connect( self._request_keep_members_event )
             w.REQUEST_PLUGINS_DISABLE.connect( self._request_plugins_disable_event )
             w.REQUEST_PLUGINS_ENABLE.connect( self._request_plugins_enable_event )
             
@@ -327,9 +354,16 @@ class CentralWidget( QWidget ):
             chosen_playlist = playlists.iloc[cbxiloc]
             identity = chosen_playlist.name
             settings = dict( chosen_playlist.dropna() )
-            c.add_identities( settings, identities )
                 
-            # write it to db
+            # only new identities are written to db,
+            # the rest of members stay where they are
+            self._request_keep_members_event( identity, identities )
+            members = c.add_members( self._own_doer.conn, identity, identities )
+            if members is None:
+                return
+            settings[c.members] = members
+            
+            # tell everyone
             df = pd.DataFrame( [settings], index=[identity] )
             self.Gui.playlist_selector._accept_programmatic_edits( df )
             
@@ -352,13 +386,70 @@ class CentralWidget( QWidget ):
             log.debug( 'this playlist has no identity, no need to notify playlist selector' )
             return
         
+        # write it to db a bit later, newer settings
+        # of the same playlist replace these ones
+        self.__pending_settings[ settings[c.identity] ] = dict( settings )
+        self.__pending_settings_timer.start()
+        
+    def _request_remove_members_event( self, playlist_identity, identities ):
+        
+        # Some `PlaylistViewer` has removed rows,
+        # they are removed from db a bit later
+        # together with the next ones.
+        
+        removed = self.__pending_removed_members.setdefault( playlist_identity, [] )
+        removed.extend( identities )
+        self.__pending_settings_timer.start()
+    
+    def _request_keep_members_event( self, playlist_identity, identities ):
+        
+        # These members are being added back,
+        # removals that were not written yet forget them.
+        
+        if not playlist_identity in self.__pending_removed_members:
+            return
+        
+        kept = set([ int(loc) for loc in identities ])
+        removed = [ loc for loc in self.__pending_removed_members[playlist_identity] if not loc in kept ]
+        if len( removed )==0:
+            self.__pending_removed_members.pop( playlist_identity )
+        else:
+            self.__pending_removed_members[playlist_identity] = removed
+    
+    def flush_playlist_settings( self ):
+        
+        # Writes all pending playlist settings
+        # and removed members to db at once,
+        # a single query per playlist.
+        
+        self.__pending_settings_timer.stop()
+        
+        pending_removed = self.__pending_removed_members
+        self.__pending_removed_members = {}
+        for playlist_identity, identities in pending_removed.items():
+            members = ColumnsPlaylist.remove_members( self._own_doer.conn, playlist_identity, identities )
+            if members is None:
+                log.error( f'failed to remove {len(identities)} members from playlist {playlist_identity}' )
+        
+        if len( self.__pending_settings )==0:
+            return
+        
+        pending = self.__pending_settings
+        self.__pending_settings = {}
+        
+        if self.Gui.playlist_selector is None:
+            log.error( f'missing playlist_selector, {len(pending)} playlist settings were not saved' )
+            return
+        
         playlists = self.Gui.playlist_selector.get_df()
-        if not settings[c.identity] in playlists.index:
-            log.error( 'this playlist is not managed by current playlist selector, not doing anything' )
+        identities = [ identity for identity in pending if identity in playlists.index ]
+        if len( identities ) < len( pending ):
+            log.error( 'some playlists are not managed by current playlist selector, not saving them' )
+        if len( identities )==0:
             return
         
         # write it to db
-        df = pd.DataFrame( [settings], index=[ settings[c.identity] ] )
+        df = pd.DataFrame( [ pending[identity] for identity in identities ], index=identities )
         self.Gui.playlist_selector._accept_programmatic_edits( df, tell_everyone=False )
         
     def _request_plugins_disable_event( self, plugin_names, requester ):
@@ -385,9 +476,17 @@ class CentralWidget( QWidget ):
             ws.pop( 0 )
         del ws
         
+        # dying playlists have just sent their settings,
+        # nothing may stay unsaved
+        self.flush_playlist_settings()
+        
         # same with playlist selector
         self.Gui.playlist_selector.deleteLater()
         
+        # nobody is waiting for background
+        # downloads anymore
+        AsyncConnection.shutdown_all()
+    
     def _import_csv_to_playlist_event( self, p ):
         
         # Allows to select a .csv and import it to
@@ -481,5 +580,5 @@ class CentralWidget( QWidget ):
         renamer.show()
         
 #---------------------------------------------------------------------------+++
-# end 2023.10.12
-# simplified
+# end 2026.10.18
+# removed members are written together
@@ -35,10 +35,13 @@ from sparkling.grimoire.PlaylistColumns import (
     SEARCH_INDEX_DEFAULT
     )
 from sparkling.grimoire.pyqt5.PlaylistViewer import PlaylistViewer
+from sparkling.neo4j.QueryPager import PAGE_SIZE_DEFAULT
 # common
 from sparkling.common.pyqt5.ActionDefinitionsColumns import ColumnsActionDefinitions
 
-QUERY_PLACEHOLDER = f'MATCH ({NODE}) RETURN {NODE} LIMIT 50'
+# results are downloaded page by page while scrolling,
+# so there is no need to limit them
+QUERY_PLACEHOLDER = f'MATCH ({NODE}) RETURN {NODE}'
 
 class DatabaseFilter( QWidget ):
     
@@ -114,7 +117,8 @@ class DatabaseFilter( QWidget ):
             parent=self,
             selection_changed_event=False,
             accept_drops=False, # don't want to add data in db through it
-            manually_reorder_rows=True
+            manually_reorder_rows=True,
+            page_size=PAGE_SIZE_DEFAULT
             )
         
         # assemble
@@ -177,6 +181,9 @@ class DatabaseFilter( QWidget ):
         settings = self.Gui.result_view.settings()
         settings[ c.db_name ] = db_name
         
+        # identities of another db
+        settings.pop( c.members, None )
+        
         # completely refresh the view
         self.Gui.result_view.set_settings( settings )
         
@@ -219,10 +226,10 @@ class DatabaseFilter( QWidget ):
         # to trigger download
         
         settings = self.Gui.result_view.settings()
-        settings[ c.auto_query ] = query
+        c.set_auto_query( settings, query )
         
         self.Gui.result_view.set_settings( settings )
         
 #---------------------------------------------------------------------------+++
-# end 2023.10.07
-# simplified
+# end 2026.10.18
+# members of previous results are forgotten
@@ -33,6 +33,7 @@ from sparkling.grimoire.PlaylistColumns import (
     NODE, DB_DEFAULT,
     LABEL_SEPARATOR, MULTIVALUE_SEPARATOR
     )
+from sparkling.neo4j.AsyncConnection import AsyncConnection
 # gui
 from sparkling.common.pyqt5.PandasTableView import PandasTableView
 from sparkling.common.pyqt5.parentless.DfEditor import DfEditor
@@ -114,6 +115,9 @@ class NodeViewer( PandasTableView ):
     # should be provided/updated by host
     _conn = None
     
+    # same connection for background requests
+    _async_conn = None
+    
     # which tool to use to edit nodes
     _node_editor_class = None
     
@@ -164,6 +168,30 @@ class NodeViewer( PandasTableView ):
                  c.method: self.launch_selection_editor,
                  c.shortcut: 'Alt+Return',
                  },
+            {
+                c.identity: 'grimoire/node_viewer/row/quick_filter',
+                c.text: 'Filter',
+                c.method: self.show_quick_filter,
+                c.shortcut: 'Ctrl+F',
+                },
+            {
+                c.identity: 'grimoire/node_viewer/row/move_up',
+                c.text: 'Move up',
+                c.method: self.move_selection_up,
+                c.shortcut: 'Ctrl+Up',
+                },
+            {
+                c.identity: 'grimoire/node_viewer/row/move_down',
+                c.text: 'Move down',
+                c.method: self.move_selection_down,
+                c.shortcut: 'Ctrl+Down',
+                },
+            {
+                c.identity: 'grimoire/node_viewer/row/move_to_top',
+                c.text: 'Move to top',
+                c.method: self.move_selection_to_top,
+                c.shortcut: 'Ctrl+Home',
+                },
             {
                 c.identity: 'grimoire/node_viewer/row/del_from_view',
                 c.text: 'Remove',
@@ -210,6 +238,7 @@ class NodeViewer( PandasTableView ):
         
     def set_connection( self, conn ):
         self._conn = conn
+        self._async_conn = AsyncConnection.wrap( conn )
         
     def the_dying_message( self ):
         # Whenever this widget/subclass is no longer needed,
@@ -414,9 +443,9 @@ class NodeViewer( PandasTableView ):
         
         # del from db
         subdf = self._MODEL.df.iloc[rowilocs]
-        identities = list( subdf.index )
-        query = f'MATCH ({NODE}) WHERE ID({NODE}) IN {identities} DETACH DELETE {NODE}'
-        response = self._conn.query( query, db_name=self._settings[c.db_name] )
+        identities = [ int(loc) for loc in subdf.index ]
+        query = f'MATCH ({NODE}) WHERE ID({NODE}) IN $identities DETACH DELETE {NODE}'
+        response = self._conn.query( query, db_name=self._settings[c.db_name], params={ 'identities': identities } )
         if response is None:
             log.error( 'failed to delete from server' )
             return
@@ -463,9 +492,9 @@ class NodeViewer( PandasTableView ):
         rowilocs = rowilocs[ ~rowilocs.isin(fail_rowilocs.index) ]
         
         # del from db
-        identities = list( subdf.index )
-        query = f'MATCH ({NODE}) WHERE ID({NODE}) IN {identities} DETACH DELETE {NODE}'
-        response = self._conn.query( query, db_name=self._settings[c.db_name] )
+        identities = [ int(loc) for loc in subdf.index ]
+        query = f'MATCH ({NODE}) WHERE ID({NODE}) IN $identities DETACH DELETE {NODE}'
+        response = self._conn.query( query, db_name=self._settings[c.db_name], params={ 'identities': identities } )
         if response is None:
             log.error( 'failed to delete from server' )
             return
@@ -589,7 +618,7 @@ class NodeViewer( PandasTableView ):
             return
         
         db_name = self._settings[c.db_name]
-        identities = []
+        rows = []
         for item in items:
             
             # auto parse according to user preferences
@@ -601,19 +630,24 @@ class NodeViewer( PandasTableView ):
                 else:
                     param_dict = parsing_function( item )
             
-            # send to db
-            node = ColumnsPlaylist.convert_node( NODE, '', param_dict=param_dict )
-            response = self._conn.query(
-                f'CREATE {node} RETURN toString(ID({NODE})) AS identity',
-                db_name=db_name
-                )
-            
-            if response is None:
-                log.error( f'failed to connect to server to create node {node} in db {db_name}' )
-            else:
-                for record in response:
-                    identities.append( record['identity'] )
+            rows.append( param_dict )
+        
+        # send to db within a single transaction
+        identities = self._conn.create_nodes( pd.DataFrame( rows ), db_name=db_name )
+        if identities is None:
+            log.error( f'failed to create {len(rows)} nodes in db {db_name}' )
+            return
+        identities = [ str(identity) for identity in identities ]
                     
+        self._accept_new_identities( identities )
+    
+    def _accept_new_identities( self, identities ):
+        
+        # New nodes were created in current db,
+        # now they need to be shown.
+        
+        c = ColumnsPlaylist
+        
         # update settings
         c.add_identities( self._settings, identities )
         
@@ -637,5 +671,5 @@ class NodeViewer( PandasTableView ):
         raise NotImplementedError
             
 #---------------------------------------------------------------------------+++
-# end 2023.10.19
-# fix del from disk
+# end 2026.10.18
+# keyboard row moves
@@ -33,6 +33,7 @@ from sparkling.grimoire.PlaylistColumns import (
     NEO4J_LABEL_PLAYLIST,
     NEO4J_LABEL_PLAYLIST_SELECTOR
     )
+from sparkling.grimoire.GrimoireNeo4jConnection import ColumnsReplaceSummary
 # common
 from sparkling.common.pyqt5.ActionDefinitionsColumns import ColumnsActionDefinitions
 from sparkling.grimoire.pyqt5.PlaylistViewer import PlaylistViewer
@@ -61,6 +62,7 @@ class PlaylistSelector( PlaylistViewer ):
             selection_changed_event=False,
             accept_drops=False,
             manually_reorder_rows=True,
+            project_columns=False, # playlist settings must be complete
             *args, **kwargs )
         
         self.__init_context_menu()
@@ -90,7 +92,13 @@ class PlaylistSelector( PlaylistViewer ):
         # it might be possible that i don't need
         # all metadata
         
-        settings = ColumnsPlaylist._playlist_of_playlists( self._conn )
+        # playlists are downloaded in background
+        self._async_conn.submit(
+            ColumnsPlaylist._playlist_of_playlists, self._conn,
+            tag=id(self), callback=self.__playlist_of_playlists_received_event )
+        
+    def __playlist_of_playlists_received_event( self, settings ):
+        
         settings[ ColumnsPlaylist.columns_to_show ] = MULTIVALUE_SEPARATOR.join(PLAYLIST_COLUMNS_TO_SHOW)
         self.set_settings( settings )
         
@@ -151,11 +159,30 @@ class PlaylistSelector( PlaylistViewer ):
         
         c = ColumnsPlaylist
         
-        # assign track numbers based on current ordering
-        self._MODEL.df[c.track_number] = [ str(iloc+1) for iloc in range(self.rowCount()) ]
+        if not c.db_name in self._settings or self.is_loading():
+            # playlists were not downloaded yet,
+            # nothing to write
+            return
+        
+        # assign track numbers based on current ordering,
+        # only playlists whose number changed need to be saved
+        df = self._MODEL.df
+        track_numbers = pd.Series( [ str(iloc+1) for iloc in range(len(df.index)) ], index=df.index, dtype=object )
+        if c.track_number in df.columns:
+            is_renumbered = df[c.track_number].astype(str) != track_numbers
+        else:
+            is_renumbered = pd.Series( True, index=df.index )
+        
+        # model df is not touched directly, new numbers
+        # go through `replace_subdf` together with other changes
+        subdf = df[ is_renumbered | df.index.isin( self._MODEL.dirty_locs ) ].copy()
+        if len( subdf.index )==0:
+            log.debug( 'no playlists were changed, nothing to write' )
+            return
+        subdf[c.track_number] = track_numbers[ subdf.index ]
         
         # write to db
-        self._accept_programmatic_edits( self._MODEL.df, tell_everyone=False )
+        self._accept_programmatic_edits( subdf, tell_everyone=False )
         
     def mouseDoubleClickEvent( self, ev ):
     
@@ -175,6 +202,10 @@ class PlaylistSelector( PlaylistViewer ):
         # in current self._MODEL.df.index
         self.add_df( df )
         
+        # saved already, only it's track number is missing
+        # (see `the_dying_message`)
+        self.mark_clean( df.index )
+        
     def open_selected_playlists( self ):
         
         # Opens specific playlists chosen from gui.
@@ -216,8 +247,19 @@ class PlaylistSelector( PlaylistViewer ):
         
         # i assume everything is clean and valid
         
-        self._conn.replace_nodes( df, self._settings[c.db_name] )
+        cs = ColumnsReplaceSummary
+        
+        summary = self._conn.replace_nodes( df, self._settings[c.db_name] )
         self.replace_subdf( df )
+        
+        # only replaced playlists are saved,
+        # the rest stay dirty till the next attempt
+        unsaved = set( summary[cs.missing] + summary[cs.failed] )
+        if len( summary[cs.missing] ) > 0:
+            log.error( f'playlists {summary[cs.missing]} were not found in db, not saved' )
+        if len( summary[cs.failed] ) > 0:
+            log.error( f'failed to save playlists {summary[cs.failed]}' )
+        self.mark_clean([ loc for loc in df.index if not int(loc) in unsaved ])
         self.reapply_columns_to_hide( columns_to_hide=PLAYLIST_COLUMNS_TO_SHOW, appropriate_reverse=True )
         
         # tell everyone to update
@@ -231,6 +273,9 @@ class PlaylistSelector( PlaylistViewer ):
             # no change happened
             return
         
+        # already saved
+        self.mark_clean( new_df.index )
+        
         self.reapply_columns_to_hide( columns_to_hide=PLAYLIST_COLUMNS_TO_SHOW, appropriate_reverse=True )
         
         # tell everyone that some playlists
@@ -239,5 +284,5 @@ class PlaylistSelector( PlaylistViewer ):
         self.PLAYLIST_EDITED.emit( new_df )
         
 #---------------------------------------------------------------------------+++
-# end 2023.10.21
-# wip save data to db
+# end 2026.10.18
+# track numbers are replaced, not written
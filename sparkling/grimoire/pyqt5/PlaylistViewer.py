@@ -34,6 +34,7 @@ from sparkling.grimoire.GrimoireNeo4jColumns import (
     NODE, DB_DEFAULT,
     MULTIVALUE_SEPARATOR
     )
+from sparkling.neo4j.QueryPager import QueryPager, UNPAGED_LIMIT_DEFAULT
 # gui
 from sparkling.grimoire.pyqt5.NodeViewer import NodeViewer, ColumnsActionDefinitions, _open_path, DfEditor
 from sparkling.common.pyqt5 import ( get_QItemSelection_rowilocs )
@@ -44,22 +45,55 @@ PLAYLIST_COLUMNS_TO_HIDE_IN_EDITOR = [
     ColumnsPlaylist.db_name
     ]
 
+# these properties are always downloaded, even if hidden,
+# because context menus need them
+PLAYLIST_COLUMNS_ALWAYS_DOWNLOADED = [
+    ColumnsPlaylist.path,
+    ]
+
 class PlaylistViewer( NodeViewer ):
 
     SEND_CONTENTS = pyqtSignal( list, dict )
     OVERRIDE_SETTINGS = pyqtSignal( dict )
+    # playlist identity, member identities
+    REMOVE_MEMBERS = pyqtSignal( int, list )
+    KEEP_MEMBERS = pyqtSignal( int, list )
     REQUEST_PLUGINS_ENABLE = pyqtSignal( str, NodeViewer )
     REQUEST_PLUGINS_DISABLE = pyqtSignal( str, NodeViewer )
     
     # which tool to use to rename nodes
     _file_renamer_class = None
     
+    # whether i'm allowed to download only shown properties
+    _project_columns = None
+    
+    # which properties were downloaded,
+    # `None` = whole nodes
+    _projected_columns = None
+    
+    # rows that were downloaded as whole nodes anyway
+    _complete_identities = None # future set
+    
+    # if not `None`, results of auto queries of playlists that
+    # are not saved to db are downloaded page by page
+    # while scrolling
+    _page_size = None
+    
+    # contents requested in `set_settings` are not here yet
+    __contents_pending = False
+    
+    # row order that db already knows about,
+    # `None` = nothing was downloaded yet
+    __saved_members = None # future list
+    
     def __init__( self,
                   selection_changed_event=True,
                   node_editor_class=DfEditor,
                   file_renamer_class=None,
                   accept_drops=True,
                   manually_reorder_rows=True,
+                  project_columns=True,
+                  page_size=None,
                   parent=None,
                   *args, **kwargs ):
         super( PlaylistViewer, self ).__init__(
@@ -70,6 +104,9 @@ class PlaylistViewer( NodeViewer ):
         
         # remember
         self._file_renamer_class = file_renamer_class
+        self._project_columns = project_columns
+        self._page_size = page_size
+        self._complete_identities = set()
         
         # appearance
         self.setWordWrap( False )
@@ -118,6 +155,30 @@ class PlaylistViewer( NodeViewer ):
                  c.method: self.launch_selection_editor,
                  c.shortcut: 'Alt+Return',
                  },
+            {
+                c.identity: 'grimoire/playlist_viewer/row/quick_filter',
+                c.text: 'Filter',
+                c.method: self.show_quick_filter,
+                c.shortcut: 'Ctrl+F',
+                },
+            {
+                c.identity: 'grimoire/playlist_viewer/row/move_up',
+                c.text: 'Move up',
+                c.method: self.move_selection_up,
+                c.shortcut: 'Ctrl+Up',
+                },
+            {
+                c.identity: 'grimoire/playlist_viewer/row/move_down',
+                c.text: 'Move down',
+                c.method: self.move_selection_down,
+                c.shortcut: 'Ctrl+Down',
+                },
+            {
+                c.identity: 'grimoire/playlist_viewer/row/move_to_top',
+                c.text: 'Move to top',
+                c.method: self.move_selection_to_top,
+                c.shortcut: 'Ctrl+Home',
+                },
             {
                 c.identity: 'grimoire/playlist_viewer/row/send_somewhere',
                 c.text: 'Send...',
@@ -168,8 +229,11 @@ class PlaylistViewer( NodeViewer ):
         
         # download contents from db and add them to view
         
-        query = c.get_contents_query( self._settings )
-        if query is None:
+        self._projected_columns = None
+        self._complete_identities = set()
+        
+        contents_query = c.get_contents_query( self._settings )
+        if contents_query is None:
             # this playlist is empty at this moment
             # and i can manually set auto query / add items
             # from search
@@ -178,6 +242,12 @@ class PlaylistViewer( NodeViewer ):
             if ColumnsPlaylist.columns_to_show in self._settings:
                 columns_to_hide = self._settings[ColumnsPlaylist.columns_to_show].split(MULTIVALUE_SEPARATOR)
                 appropriate_reverse = True
+            
+            # whatever i was downloading is not needed anymore
+            self.__cancel_downloads()
+            self.__contents_pending = False
+            self.__saved_members = []
+            
             self.switch_df( pd.DataFrame(), columns_to_hide=columns_to_hide, appropriate_reverse=appropriate_reverse )
             
             # request plugins
@@ -186,27 +256,159 @@ class PlaylistViewer( NodeViewer ):
             
             return
             
-        response = self._conn.query( query, db_name=self._settings[c.db_name] )
+        # nodes and their labels are downloaded together
+        query, _ = contents_query
+        
+        # if i know which columns are shown, i don't need
+        # to download the rest of them now
+        if self._project_columns and ColumnsPlaylist.columns_to_show in self._settings:
+            columns = self._settings[ColumnsPlaylist.columns_to_show].split(MULTIVALUE_SEPARATOR)
+            for col in PLAYLIST_COLUMNS_ALWAYS_DOWNLOADED:
+                if not col in columns:
+                    columns.append( col )
+            if not c.convert_return_projected( query, columns ) is None:
+                self._projected_columns = columns
+        
+        # download in background, the newest download
+        # of this viewer replaces older ones
+        
+        def contents_received( df ):
+            self.__contents_received_event( df, to_add )
         
-        if response is None:
+        self.__contents_pending = True
+        
+        # pages of previous contents are not needed anymore
+        if not self._async_conn is None:
+            self._async_conn.cancel( self.__page_tag() )
+        
+        pager = self.__get_pager()
+        if not pager is None:
+            
+            # only the first page now, the rest
+            # of them while scrolling, in background as well
+            
+            def fetch_page( page_size, page_received ):
+                if self._async_conn is None:
+                    page_received( pager.fetch( page_size ) )
+                    return
+                self._async_conn.submit(
+                    pager.fetch, page_size,
+                    tag=self.__page_tag(), callback=page_received,
+                    errback=lambda ex: page_received( None ) )
+            
+            def first_page_received( df ):
+                self.__contents_received_event( df, to_add )
+                if not df is None and not pager.is_exhausted():
+                    self.set_page_source( fetch_page, self._page_size )
+            
+            if self._async_conn is None:
+                first_page_received( pager.fetch( self._page_size ) )
+                return
+            
+            self._async_conn.submit(
+                pager.fetch, self._page_size,
+                tag=id(self), callback=first_page_received )
+            return
+        
+        settings = self._settings
+        if self.__is_paged():
+            # can't download it page by page, but at least
+            # i don't want to download the whole db at once
+            settings = dict( self._settings )
+            limited_query = c.convert_limited( settings[c.auto_query], UNPAGED_LIMIT_DEFAULT )
+            if limited_query is None:
+                log.warning( f'can\'t limit this query, will download all of it: {query}' )
+            else:
+                settings[c.auto_query] = limited_query
+        
+        if self._async_conn is None:
+            df = c.load_contents( self._conn, settings, columns=self._projected_columns )
+            contents_received( df )
+            return
+        
+        self._async_conn.submit(
+            c.load_contents, self._conn, dict( settings ), columns=self._projected_columns,
+            tag=id(self), callback=contents_received )
+    
+    def __is_paged( self ):
+        
+        # Whether current contents are supposed
+        # to be downloaded page by page.
+        
+        c = ColumnsPlaylist
+        
+        if self._page_size is None or not c.auto_query in self._settings:
+            return False
+        if c.identity in self._settings or len( c.get_members( self._settings ) ) > 0:
+            # row ordering of saved playlists
+            # is known only for complete contents
+            return False
+        return True
+    
+    def __page_tag( self ):
+        
+        # Pages are downloaded separately from contents,
+        # so that they don't supersede each other.
+        
+        return ( id(self), 'page' )
+    
+    def __cancel_downloads( self ):
+        
+        # Whatever I was downloading is not needed anymore.
+        
+        if not self._async_conn is None:
+            self._async_conn.cancel( id(self) )
+            self._async_conn.cancel( self.__page_tag() )
+        
+    def __get_pager( self ):
+        
+        # Returns `QueryPager` or `None` if current
+        # contents must be downloaded at once.
+        
+        c = ColumnsPlaylist
+        
+        if not self.__is_paged():
+            return
+        
+        query, params = c.get_contents_query( self._settings )
+        
+        # `download_columns` extends `_projected_columns`,
+        # so the next pages will have these columns too
+        pager = QueryPager( self._conn, query, db_name=self._settings[c.db_name], params=params, columns=self._projected_columns )
+        if not pager.is_pageable():
+            log.debug( f'can\'t download this query page by page: {query}' )
+            return
+        
+        return pager
+        
+    def is_loading( self ):
+        
+        # For external use only.
+        # Whether contents are still being downloaded.
+        
+        return self.__contents_pending
+        
+    def __contents_received_event( self, df, to_add ):
+        
+        # I end up here when contents requested
+        # in `set_settings` were downloaded.
+        
+        c = ColumnsPlaylist
+        
+        self.__contents_pending = False
+        
+        if df is None:
             # TODO
             # pop-up with log messages
             log.error( 'query most likely failed, please review db settings manually' )
+            # shown rows are not this playlist's contents
+            self.__saved_members = None
             return
-                
-        df = pd.DataFrame([ r[NODE] for r in response ])
-        df.index = [ r[NODE].id for r in response ]
-        df.fillna( '', inplace=True )
-        ColumnsPlaylist.fill_reserved_columns( self._conn, df, db_name=self._settings[c.db_name] )
         
-        if c.identities in self._settings:
-            # enforce specific row ordering
-            # TODO
-            # do so in Columns
-            # help:
-            # https://stackoverflow.com/questions/30009948/how-to-reorder-indexed-rows-based-on-a-list-in-pandas-data-frame
-            if not self._settings[c.identities].strip() == '':
-                df = df.reindex([ int(loc) for loc in self._settings[c.identities].split(' ') ])
+        # rows are already ordered by `load_contents`
+        self.__saved_members = [ int(loc) for loc in df.index ]
+        if c.keeps_members( self._settings ):
+            self._settings[c.members] = list( self.__saved_members )
         
         columns_to_hide = self._settings[ColumnsPlaylist.columns_to_hide].split(MULTIVALUE_SEPARATOR) if ColumnsPlaylist.columns_to_hide in self._settings else PLAYLIST_COLUMNS_TO_HIDE_IN_EDITOR
         appropriate_reverse = False
@@ -247,15 +449,111 @@ class PlaylistViewer( NodeViewer ):
         
         c = ColumnsPlaylist
         
-        # remember item ordering
-        self._settings[c.identities] = ' '.join(list( self._MODEL.df.index.astype(str) ))
+        # whatever i was downloading is not needed anymore
+        self.__cancel_downloads()
+        
+        if self.is_loading() or self.__saved_members is None:
+            # contents are not here (yet), ordering
+            # from settings is still valid
+            self.OVERRIDE_SETTINGS.emit( self._settings )
+            super( PlaylistViewer, self ).the_dying_message()
+            return
+        
+        # remember item ordering,
+        # db is touched only if it changed
+        members = [ int(loc) for loc in self._MODEL.df.index ]
+        if c.identity in self._settings and not members == self.__saved_members:
+            c.set_members( self._conn, self._settings[c.identity], members )
+        self.__remember_members()
         
         # notify playlist selector
         self.OVERRIDE_SETTINGS.emit( self._settings )
         
         super( PlaylistViewer, self ).the_dying_message()
         
+    def reapply_columns_to_hide( self, columns_to_hide=None, appropriate_reverse=False ):
+        
+        # Columns that I'm about to show may have
+        # not been downloaded yet.
+        
+        if appropriate_reverse and not columns_to_hide is None:
+            self.download_columns( columns_to_hide )
+        
+        super( PlaylistViewer, self ).reapply_columns_to_hide( columns_to_hide=columns_to_hide, appropriate_reverse=appropriate_reverse )
+    
+    def download_columns( self, columns ):
+        
+        # Makes sure that given properties of all shown
+        # nodes are downloaded.
+        
+        if self._projected_columns is None:
+            # whole nodes were downloaded
+            return
+        
+        missing = [ col for col in columns if not col in self._projected_columns ]
+        if len( missing )==0:
+            return
+        
+        df = self._MODEL.df
+        if len( df.index ) > 0:
+            
+            c = ColumnsPlaylist
+            query = f'MATCH ({NODE}) WHERE ID({NODE}) IN $identities RETURN {NODE}'
+            params = { 'identities': [ int(loc) for loc in df.index ] }
+            subdf = c.load_df( self._conn, query, db_name=self._settings[c.db_name], params=params, columns=missing )
+            if subdf is None:
+                log.error( f'failed to download columns {missing}' )
+                return
+            
+            subdf = subdf.reindex( df.index ).fillna( '' )
+            for col in missing:
+                if col in subdf.columns:
+                    self.add_column( col, list( subdf[col] ) )
+        
+        self._projected_columns.extend( missing )
+    
+    def download_complete_rows( self, identities ):
+        
+        # Makes sure that given nodes are downloaded
+        # with all their properties. I need this before
+        # editing nodes, because edited nodes are
+        # written to db as a whole.
+        
+        if self._projected_columns is None:
+            # whole nodes were downloaded
+            return
+        
+        identities = [ loc for loc in identities if not loc in self._complete_identities ]
+        if len( identities )==0:
+            return
+        
+        c = ColumnsPlaylist
+        query = f'MATCH ({NODE}) WHERE ID({NODE}) IN $identities RETURN {NODE}'
+        params = { 'identities': [ int(loc) for loc in identities ] }
+        subdf = c.load_df( self._conn, query, db_name=self._settings[c.db_name], params=params )
+        if subdf is None:
+            log.error( 'failed to download complete nodes' )
+            return
+        
+        # columns that these nodes don't have
+        # must not become NA
+        for col in self._MODEL.df.columns:
+            if not col in subdf.columns:
+                subdf[col] = ''
+        
+        # new columns must not become visible
+        columns_to_hide = [] if self._MODEL.columns_to_hide is None else self._MODEL.columns_to_hide
+        columns_to_show = [ col for col in self._MODEL.df.columns if not col in columns_to_hide ]
+        
+        self.replace_subdf( subdf )
+        self._complete_identities.update( subdf.index )
+        
+        super( PlaylistViewer, self ).reapply_columns_to_hide( columns_to_hide=columns_to_show, appropriate_reverse=True )
+        
     def launch_selection_editor( self ):
+        
+        # editor needs whole nodes
+        self.download_complete_rows( list( self.selected_subdf().index ) )
     
         constructor_parameters = {
             'master_column': ColumnsPlaylist.path,
@@ -265,6 +563,12 @@ class PlaylistViewer( NodeViewer ):
         
     def _accept_selection_edits_event( self, changes, db_name ):
         
+        # some editors send only edited columns, in which case
+        # the rest of the node is taken from view
+        _, new_value = changes
+        if type( new_value ) == pd.Series:
+            self.download_complete_rows( list( new_value.index ) )
+        
         super( PlaylistViewer, self )._accept_selection_edits_event( changes, db_name )
         
     def __selection_changed_event( self, selected, deselected  ):
@@ -287,8 +591,8 @@ class PlaylistViewer( NodeViewer ):
             return
         
         # get rowilocs
-        selected_rowilocs = get_QItemSelection_rowilocs( selected )
-        deselected_rowilocs = get_QItemSelection_rowilocs( deselected )
+        selected_rowilocs = self._MODEL.df_rowilocs( get_QItemSelection_rowilocs( selected ) )
+        deselected_rowilocs = self._MODEL.df_rowilocs( get_QItemSelection_rowilocs( deselected ) )
         
         # when i add selection, i need whole subdf
         new_subdf = self._MODEL.df.iloc[ selected_rowilocs ]
@@ -361,11 +665,12 @@ class PlaylistViewer( NodeViewer ):
         if not c.identity in self._settings:
             # i don't need to nofity playlist selector -
             # this playlist is not tracked
+            self.__remember_members()
             return
         
         # i need to notify playlist selector
         
-        self._settings[c.identities] = ' '.join(list( self._MODEL.df.index.astype(str) ))
+        self.__save_removed_members()
         
         self.OVERRIDE_SETTINGS.emit( self._settings )
         
@@ -380,10 +685,11 @@ class PlaylistViewer( NodeViewer ):
             # i don't need to nofity playlist selector -
             # this playlist is not tracked (is not a `node` in `db` -
             # just a random `dict`)
+            self.__remember_members()
             return
         
         # i need to notify playlist selector
-        self._settings[c.identities] = ' '.join(list( self._MODEL.df.index.astype(str) ))
+        self.__save_removed_members()
         self.OVERRIDE_SETTINGS.emit( self._settings )
         
     def del_from_view_db_disk( self ):
@@ -396,10 +702,11 @@ class PlaylistViewer( NodeViewer ):
         if not c.identity in self._settings:
             # i don't need to nofity playlist selector -
             # this playlist is not tracked
+            self.__remember_members()
             return
         
         # i need to notify playlist selector
-        self._settings[c.identities] = ' '.join(list( self._MODEL.df.index.astype(str) ))
+        self.__save_removed_members()
         self.OVERRIDE_SETTINGS.emit( self._settings )
     
     def _add_to_view_db( self, items, already_parsed,
@@ -408,6 +715,102 @@ class PlaylistViewer( NodeViewer ):
         super( PlaylistViewer, self )._add_to_view_db( items, already_parsed, parsing_function=parsing_function )
         
         self.OVERRIDE_SETTINGS.emit( self._settings )
+    
+    def _accept_new_identities( self, identities ):
+        
+        # New nodes are appended to db playlist
+        # with a single small query, only they
+        # are downloaded and appended to view.
+        
+        c = ColumnsPlaylist
+        
+        if not c.identity in self._settings:
+            super( PlaylistViewer, self )._accept_new_identities( identities )
+            return
+        
+        playlist_identity = self._settings[c.identity]
+        # removals that were not written yet
+        # must not remove these ones
+        self.KEEP_MEMBERS.emit( int(playlist_identity), [ int(loc) for loc in identities ] )
+        members = c.add_members( self._conn, playlist_identity, identities )
+        if members is None:
+            return
+        
+        self._settings[c.members] = members
+        
+        if self.is_loading() or self.__saved_members is None:
+            # current contents are not here,
+            # the new ones may be missing from them
+            self.set_settings( self._settings )
+            return
+        
+        shown = set([ int(loc) for loc in self._MODEL.df.index ])
+        new_identities = [ loc for loc in dict.fromkeys([ int(loc) for loc in identities ]) if not loc in shown ]
+        if len( new_identities )==0:
+            return
+        
+        def rows_received( df ):
+            
+            if not self._settings.get( c.identity )==playlist_identity \
+                or self.is_loading() or self.__saved_members is None:
+                # other contents meanwhile
+                return
+            if df is None:
+                log.error( 'failed to download new rows, will download the whole playlist' )
+                self.set_settings( self._settings )
+                return
+            
+            # might have been downloaded meanwhile
+            df = df[ ~df.index.isin( self._MODEL.df.index ) ]
+            if len( df.index )==0:
+                return
+            
+            # rows are exactly as in db,
+            # appended to db playlist as well
+            self.add_df( df )
+            self.mark_clean( df.index )
+            self.__saved_members.extend([ int(loc) for loc in df.index ])
+        
+        load_args = ( self._conn, new_identities )
+        load_kwargs = { 'db_name': self._settings[c.db_name], 'columns': self._projected_columns }
+        
+        if self._async_conn is None:
+            rows_received( c.load_df_by_identities( *load_args, **load_kwargs ) )
+            return
+        
+        self._async_conn.submit(
+            c.load_df_by_identities, *load_args, **load_kwargs,
+            callback=rows_received, errback=lambda ex: rows_received( None ) )
+    
+    def __save_removed_members( self ):
+        
+        # Some rows were removed from view,
+        # db playlist forgets only them.
+        # Whoever listens writes them to db a bit later,
+        # together with other removals from this playlist.
+        
+        c = ColumnsPlaylist
+        
+        if self.__saved_members is None:
+            return
+        
+        shown = set([ int(loc) for loc in self._MODEL.df.index ])
+        removed = [ loc for loc in self.__saved_members if not loc in shown ]
+        if len( removed ) > 0:
+            self.REMOVE_MEMBERS.emit( int(self._settings[c.identity]), removed )
+        
+        self.__saved_members = [ loc for loc in self.__saved_members if loc in shown ]
+        self.__remember_members()
+    
+    def __remember_members( self ):
+        
+        # Current row ordering goes to settings,
+        # see `ColumnsPlaylist.keeps_members`.
+        
+        c = ColumnsPlaylist
+        
+        if c.keeps_members( self._settings ):
+            self._settings[c.members] = [ int(loc) for loc in self._MODEL.df.index ]
         
     def _cm_open_file( self ):
         _open_path( self.selected_subdf(), dirname=False )
@@ -434,5 +837,5 @@ class PlaylistViewer( NodeViewer ):
             log.debug( 'no selection, nothing to send' )
             
 #---------------------------------------------------------------------------+++
-# end 2023.10.12
-# update drag/drop
+# end 2026.10.18
+# removed members are sent to central widget
@@ -29,6 +29,7 @@ from PyQt5.QtWidgets import ( QWidget, QComboBox,
     QVBoxLayout, )
 # same project
 from sparkling.common import readf_yaml
+from sparkling.neo4j.AsyncConnection import AsyncConnection
 from sparkling.neo4j.NeoTreeView import (
     NeoTreeView, TreeModel, c, NODE, TreeNode )
 
@@ -85,12 +86,21 @@ class TreeFilter( QWidget ):
         
         self.Gui.tree_view.clear()
         
-        root_node = TreeNode()
-        
-        response = self.conn.query(
-            self.rule, db_name=self.db_name
+        # download in background, the newest
+        # request replaces older ones
+        AsyncConnection.wrap( self.conn ).query(
+            self.rule, db_name=self.db_name,
+            tag=id(self), callback=self.__response_received_event
             )
         
+    def __response_received_event( self, response ):
+        
+        if response is None:
+            log.error( f'failed to populate tree: {self.rule}' )
+            return
+        
+        root_node = TreeNode()
+        
         for r in response:
             root_node.add_subnode(
                 list( r.data().values() )
@@ -105,5 +115,5 @@ class TreeFilter( QWidget ):
         self.db_name = db_name
         
 #---------------------------------------------------------------------------+++
-# end 2022.05.11
-# wip
\ No newline at end of file
+# end 2026.10.18
+# tree is populated in background
\ No newline at end of file
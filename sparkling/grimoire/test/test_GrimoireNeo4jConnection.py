@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+#Python utility "Test for Grimoire Neo4J Connection". Checks how nodes are created, replaced and imported in bulk. Copyright (C) 2023 Anna Anikina
+#
+#This program is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#This program is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+#---------------------------------------------------------------------------+++
+# Run with `pytest`.
+
+# embedded in python
+from copy import deepcopy
+from importlib import import_module
+from re import findall, match
+# pip install
+import pytest
+pd = pytest.importorskip( 'pandas' )
+pytest.importorskip( 'neo4j' )
+# same project
+from sparkling.grimoire.GrimoireNeo4jConnection import ( Connection, ColumnsReplaceSummary )
+from sparkling.neo4j.Neo4jColumns import LABELS_LIST
+
+# `sparkling.neo4j` exports a class with the same name
+connection_module = import_module( 'sparkling.neo4j.Connection' )
+
+c = Connection.Columns
+cs = ColumnsReplaceSummary
+
+class FakeResult( list ):
+    
+    def consume( self ):
+        pass
+
+class FakeSession:
+    
+    # Runs bulk queries of `Connection` against `nodes`:
+    # { identity: [ labels set, props ] }.
+    # Every `execute_write` is a transaction:
+    # nothing changes if `work` fails.
+    # Rows with `title` = `fail` fail.
+    
+    def __init__( self ):
+        self.nodes = {}
+        self.queries = []
+        self.n_transactions = 0
+    
+    def closed( self ):
+        return False
+    
+    def close( self ):
+        pass
+    
+    def execute_write( self, work, *args, **kwargs ):
+        
+        nodes = deepcopy( self.nodes )
+        result = work( self, *args, **kwargs )
+        if self.nodes is None:
+            self.nodes = nodes
+            raise RuntimeError( 'transaction failed' )
+        self.n_transactions += 1
+        return result
+    
+    def run( self, query, params ):
+        
+        self.queries.append( ( query, params ) )
+        
+        for row in params.get( 'rows', [] ):
+            if row['props'].get( 'title' )=='fail':
+                # rolled back by `execute_write`
+                self.nodes = None
+                return FakeResult()
+        
+        if query.startswith( 'UNWIND $rows AS row CREATE' ):
+            labels = match( r'UNWIND \$rows AS row CREATE \(n:?([\w:]*)\)', query ).group(1)
+            response = FakeResult()
+            for row in params['rows']:
+                identity = len( self.nodes )
+                self.nodes[identity] = [ set( labels.split( ':' ) ) - { '' }, dict( row['props'] ) ]
+                response.append( { 'pos': row['pos'], 'identity': identity } )
+            return response
+        
+        if query.startswith( 'UNWIND $rows AS row MATCH' ):
+            response = FakeResult()
+            for row in params['rows']:
+                if not row['identity'] in self.nodes:
+                    continue
+                node = self.nodes[ row['identity'] ]
+                node[1] = dict( row['props'] )
+                response.append( { 'identity': row['identity'], LABELS_LIST: sorted( node[0] ) } )
+            return response
+        
+        if query.startswith( 'MATCH (n) WHERE ID(n) IN $identities' ):
+            to_remove = findall( r'REMOVE n:([\w:]+)', query )
+            to_add = findall( r'SET n:([\w:]+)', query )
+            for identity in params['identities']:
+                labels = self.nodes[identity][0]
+                for text in to_remove:
+                    labels.difference_update( text.split( ':' ) )
+                for text in to_add:
+                    labels.update( text.split( ':' ) )
+            return FakeResult()
+        
+        raise ValueError( f'unexpected query {query}' )
+
+@pytest.fixture
+def session( monkeypatch ):
+    
+    session = FakeSession()
+    
+    class FakeDriver:
+        def session( self, database=None ):
+            return session
+        def close( self ):
+            pass
+    
+    class FakeGraphDatabase:
+        @staticmethod
+        def driver( socket, auth=None ):
+            return FakeDriver()
+    
+    monkeypatch.setattr( connection_module, 'GraphDatabase', FakeGraphDatabase )
+    return session
+
+@pytest.fixture
+def conn( session ):
+    return Connection( 'bolt://localhost:7687', 'user', 'password' )
+
+def labels( session ):
+    return { identity: ':'.join( sorted( node[0] ) ) for identity, node in session.nodes.items() }
+
+def test_create_nodes( conn, session ):
+    
+    df = pd.DataFrame({
+        'title': [ 'a', 'b', 'c', 'd' ],
+        c.neo4j_labels: [ 'A', 'B', 'A; C', 'A' ],
+        })
+    
+    # nodes are created label set by label set,
+    # identities follow rows of df anyway
+    assert conn.create_nodes( df, db_name='db' ) == [ 0, 2, 3, 1 ]
+    assert session.n_transactions == 1
+    assert [ query for query, _ in session.queries ] == [
+        c.convert_bulk_create( 'A' ),
+        c.convert_bulk_create( 'B' ),
+        c.convert_bulk_create( 'A:C' ),
+        ]
+    assert [ row['pos'] for row in session.queries[0][1]['rows'] ] == [ 0, 3 ]
+    
+    assert session.nodes[2] == [ { 'B' }, { 'title': 'b' } ]
+    assert session.nodes[3] == [ { 'A', 'C' }, { 'title': 'c' } ]
+    
+    assert conn.create_nodes( df.iloc[:0] ) == []
+
+def test_create_nodes_fails( conn, session ):
+    
+    df = pd.DataFrame({ 'title': [ 'a', 'fail' ], c.neo4j_labels: [ 'A', 'B' ] })
+    assert conn.create_nodes( df ) is None
+    assert session.nodes == {}
+
+def test_replace_nodes( conn, session ):
+    
+    session.nodes = {
+        0: [ { 'A' }, { 'title': 'a' } ],
+        1: [ { 'A', 'B' }, { 'title': 'b' } ],
+        2: [ { 'C' }, { 'title': 'c' } ],
+        3: [ { 'C' }, { 'title': 'd' } ],
+        }
+    
+    df = pd.DataFrame({
+        'title': [ 'A', 'B', 'C', 'D', 'X' ],
+        c.neo4j_labels: [ 'A; B', 'B:A', 'A', 'A', '' ],
+        }, index=[ 0, 1, 2, 3, 9 ] )
+    
+    summary = conn.replace_nodes( df, 'db' )
+    assert summary == { cs.replaced: 4, cs.relabeled: 3, cs.missing: [ 9 ], cs.failed: [] }
+    assert labels( session ) == { 0: 'A:B', 1: 'A:B', 2: 'A', 3: 'A' }
+    assert session.nodes[2][1] == { 'title': 'C' }
+    
+    # one query per distinct label change
+    relabels = [ ( query, params ) for query, params in session.queries if query.startswith( 'MATCH' ) ]
+    assert relabels == [
+        ( c.convert_bulk_relabel( *c.get_label_changes( [ 'A' ], 'A; B' ) ), { 'identities': [ 0 ] } ),
+        ( c.convert_bulk_relabel( 'C', 'A' ), { 'identities': [ 2, 3 ] } ),
+        ]
+
+def test_replace_nodes_keeps_labels( conn, session ):
+    
+    session.nodes = { 0: [ { 'A' }, { 'title': 'a' } ] }
+    
+    # no reserved column = labels were not changed
+    summary = conn.replace_nodes( pd.DataFrame( { 'title': [ 'b' ] }, index=[ 0 ] ), 'db' )
+    assert summary == { cs.replaced: 1, cs.relabeled: 0, cs.missing: [], cs.failed: [] }
+    assert session.nodes[0] == [ { 'A' }, { 'title': 'b' } ]
+
+def test_replace_nodes_partial_failure( conn, session ):
+    
+    session.nodes = { identity: [ { 'A' }, { 'title': str(identity) } ] for identity in range( 4 ) }
+    
+    df = pd.DataFrame({
+        'title': [ 'x', 'y', 'fail', 'z' ],
+        c.neo4j_labels: [ 'B', 'B', 'B', 'B' ],
+        }, index=[ 0, 1, 2, 3 ] )
+    
+    # every chunk is a transaction of its own
+    summary = conn.replace_nodes( df, 'db', batch_size=2 )
+    assert summary == { cs.replaced: 2, cs.relabeled: 2, cs.missing: [], cs.failed: [ 2, 3 ] }
+    assert labels( session ) == { 0: 'B', 1: 'B', 2: 'A', 3: 'A' }
+    assert session.nodes[3][1] == { 'title': '3' }
+
+def test_import_from_csv( conn, session, tmp_path ):
+    
+    src = tmp_path / 'import.csv'
+    pd.DataFrame({
+        'title': [ 'a', 'b', 'c', 'd', 'e' ],
+        'year': [ '1999', '', '2001', '2002', '2003' ],
+        c.neo4j_labels: [ 'A', 'B', 'A', 'B', 'A' ],
+        }).to_csv( src, index=False )
+    
+    # chunks of 2 rows, a transaction per chunk
+    assert conn.import_from_csv( str(src), 'db', batch_size=2 ) == [ '0', '1', '2', '3', '4' ]
+    assert session.n_transactions == 3
+    assert session.nodes[1] == [ { 'B' }, { 'title': 'b' } ]
+    assert session.nodes[4] == [ { 'A' }, { 'title': 'e', 'year': '2003' } ]
+
+def test_import_from_csv_stops( conn, session, tmp_path ):
+    
+    src = tmp_path / 'import.csv'
+    pd.DataFrame( { 'title': [ 'a', 'b', 'fail', 'd' ] } ).to_csv( src, index=False )
+    
+    # previous chunks stay imported
+    assert conn.import_from_csv( str(src), 'db', batch_size=2 ) == [ '0', '1' ]
+    assert len( session.nodes ) == 2
+
+#---------------------------------------------------------------------------+++
+# end 2026.10.18
+# created
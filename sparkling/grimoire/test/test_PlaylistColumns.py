@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+#Python utility "Test for Playlist Columns". Checks how playlist members are stored and updated in Neo4J. Copyright (C) 2023 Anna Anikina
+#
+#This program is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#This program is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+#---------------------------------------------------------------------------+++
+# Run with `pytest`.
+
+# embedded in python
+# pip install
+import pytest
+pytest.importorskip( 'pandas' )
+# same project
+from sparkling.grimoire.PlaylistColumns import ( ColumnsPlaylist, DB_DEFAULT )
+
+c = ColumnsPlaylist
+
+class FakeConnection:
+    
+    # Remembers queries, answers with given responses.
+    
+    def __init__( self, *responses ):
+        self.responses = list( responses )
+        self.queries = []
+    
+    def query( self, query, db_name=None, params=None ):
+        self.queries.append( ( query, db_name, params ) )
+        return self.responses.pop( 0 )
+
+def test_members_add():
+    
+    query, params = c.convert_members_add( '7', [ 3, '1', 3, 2 ] )
+    
+    # duplicates are sent once, order is kept
+    assert params == { 'playlist': 7, 'identities': [ 3, 1, 2 ], 'position': None }
+    # appended when there is no position
+    assert 'coalesce( $position, size(old) ) AS pos' in query
+    assert f'SET p.{c.members} = old[..pos] + new + old[pos..]' in query
+    # members that are there already stay where they are
+    assert '[ x IN $identities WHERE NOT x IN old ] AS new' in query
+    
+    query, params = c.convert_members_add( 7, [ 3 ], position=0 )
+    assert params['position']==0
+
+def test_members_remove():
+    
+    query, params = c.convert_members_remove( 7, [ 1, 1 ] )
+    assert params == { 'playlist': 7, 'identities': [ 1 ] }
+    assert 'WHERE NOT x IN $identities' in query
+
+def test_members_move():
+    
+    query, params = c.convert_members_move( 7, [ 5, 4, 5 ], '2' )
+    assert params == { 'playlist': 7, 'identities': [ 5, 4 ], 'position': 2 }
+    assert 'rest[..$position] + [ x IN $identities WHERE x IN' in query
+
+def test_members_set():
+    
+    query, params = c.convert_members_set( 7, [ 2, 1, 2 ] )
+    assert params == { 'playlist': 7, 'identities': [ 2, 1 ] }
+    assert f'SET p.{c.members} = $identities' in query
+
+def test_members_queries_migrate_legacy_identities():
+    
+    # legacy str is read when there are no members yet,
+    # and forgotten once members are written
+    for query, params in [
+        c.convert_members_add( 7, [ 1 ] ),
+        c.convert_members_remove( 7, [ 1 ] ),
+        c.convert_members_move( 7, [ 1 ], 0 ),
+        c.convert_members_set( 7, [ 1 ] ),
+        ]:
+        assert query.startswith( 'MATCH (p) WHERE ID(p) = $playlist ' )
+        assert f'REMOVE p.{c.identities}' in query
+        assert query.endswith( f'RETURN p.{c.members} AS members' )
+    
+    query, params = c.convert_members_remove( 7, [ 1 ] )
+    assert f'coalesce( p.{c.members}, [ x IN split( coalesce( p.{c.identities}, \'\' ), \' \' )' in query
+
+def test_add_members():
+    
+    conn = FakeConnection( [ { 'members': [ 3, 1 ] } ], [] )
+    assert c.add_members( conn, 7, [ 1 ] ) == [ 3, 1 ]
+    assert conn.queries[0][1]==DB_DEFAULT
+    
+    # playlist is gone
+    assert c.add_members( conn, 7, [ 1 ] ) is None
+
+def test_validate_identities():
+    
+    playlist = { c.identities: '3 1  2 ' }
+    c.validate_identities( playlist )
+    assert playlist == { c.members: [ 3, 1, 2 ] }
+    
+    # members win
+    playlist = { c.identities: '3 1', c.members: [ 1 ] }
+    assert c.get_members( playlist ) == [ 1 ]
+    assert not c.identities in playlist
+    
+    playlist = { c.identities: '' }
+    assert c.get_members( playlist ) == []
+    assert playlist == {}
+
+def test_migrate_identities_to_members():
+    
+    conn = FakeConnection( [ { 'n': 2 } ], None )
+    assert c.migrate_identities_to_members( conn )==2
+    
+    query, db_name, params = conn.queries[0]
+    assert db_name==DB_DEFAULT
+    assert query.startswith( f'MATCH (p) WHERE p.{c.identities} IS NOT NULL ' )
+    assert f'REMOVE p.{c.identities}' in query
+    
+    # failed
+    assert c.migrate_identities_to_members( conn ) is None
+
+#---------------------------------------------------------------------------+++
+# end 2026.10.18
+# created
@@ -26,7 +26,7 @@ import os
 from PyQt5.QtCore import ( QCoreApplication )
 from PyQt5.QtGui import ( QIcon )
 from PyQt5.QtWidgets import ( QApplication,
-    QMenu, QSystemTrayIcon )
+    QMenu, QMessageBox, QSystemTrayIcon )
 # same project
 # main
 from sparkling import MainPaths
@@ -37,6 +37,7 @@ from sparkling.host_app.pyqt5.ExceptionViewer import ExceptionViewer
 # other
 from sparkling.common import ( readf, unique_loc )
 from sparkling.common.pyqt5.ActionDefinitionsColumns import ColumnsActionDefinitions
+from sparkling.neo4j.QueryStats import QUERY_STATS
     
 class HostApp( QApplication ):
 
@@ -141,6 +142,17 @@ class HostApp( QApplication ):
 
     def open_folder( self ):
         os.startfile( MainPaths.application_root() )
+        
+    def show_slow_queries( self ):
+        
+        # Shows which database queries took the most time
+        # since the app was started.
+        
+        QMessageBox.information(
+            None,
+            'Slowest queries',
+            QUERY_STATS.report( n=10 )
+            )
 
     def _tray_icon_was_activated( self, ev ):
         if ev==1: pass # right click
@@ -185,6 +197,11 @@ class HostApp( QApplication ):
                 c.text: 'Show log',
                 c.method: self.launch_exception_dialog,
                 },
+            {
+                c.identity: 'dust/host/tray/show_slow_queries',
+                c.text: 'Show slowest queries',
+                c.method: self.show_slow_queries,
+                },
             {
                 c.identity: 'dust/host/tray/close_app',
                 c.text: 'Exit',
@@ -298,5 +315,5 @@ class HostApp( QApplication ):
         self.__register_doer( unique_name, CustomDoer )
 
 #---------------------------------------------------------------------------+++
-# end 2023.10.14
-# moved here
+# end 2026.10.18
+# slowest queries in tray menu
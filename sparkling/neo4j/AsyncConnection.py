@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+#Python utility "Neo4J Async Connection". Allows to talk to a Neo4J server without freezing PyQt5 GUI. Copyright (C) 2023 Anna Anikina
+#
+#This program is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#This program is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+#---------------------------------------------------------------------------+++
+
+# logging
+import logging
+log = logging.getLogger(__name__)
+
+# embedded in python
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count
+from threading import Lock
+from weakref import WeakKeyDictionary
+# pip install
+from PyQt5.QtCore import ( QObject, pyqtSignal )
+
+# how many requests may run at the same time
+MAX_WORKERS_DEFAULT = 4
+
+# one async wrapper per sync connection,
+# so that all widgets share the same threads
+_WRAPPERS = WeakKeyDictionary()
+
+class AsyncConnection( QObject ):
+    
+    # Runs requests of a synchronous `Connection` in
+    # a thread pool, so that GUI does not freeze while
+    # waiting for the server.
+    
+    # Every request returns a `concurrent.futures.Future`.
+    # If `callback` is given, it is called with the result
+    # in GUI thread (via Qt signal), never in worker thread.
+    
+    # Requests may have a `tag`. A new request with the
+    # same tag supersedes the previous one: it is cancelled
+    # if it did not start yet, otherwise it's result
+    # is silently dropped.
+    
+    # `Connection` keeps one session per thread, so
+    # workers never share sessions.
+    
+    # for external use, ( ticket, result )
+    FINISHED = pyqtSignal( int, object )
+    
+    # internal, delivers results to GUI thread
+    _DONE = pyqtSignal( int, object, object )
+    
+    conn = None
+    
+    __executor = None
+    __tickets = None # future itertools.count
+    __lock = None
+    
+    # key = ticket, value = ( tag, callback, errback )
+    __pending = None # future dictionary
+    
+    # key = tag, value = ( ticket, future )
+    __latest = None # future dictionary
+    
+    def __init__( self, conn, max_workers=MAX_WORKERS_DEFAULT, parent=None ):
+        
+        super( AsyncConnection, self ).__init__( parent )
+        
+        self.conn = conn
+        
+        self.__executor = ThreadPoolExecutor( max_workers=max_workers, thread_name_prefix='neo4j' )
+        self.__tickets = count( 1 )
+        self.__lock = Lock()
+        self.__pending = {}
+        self.__latest = {}
+        
+        self._DONE.connect( self.__done_event )
+    
+    @classmethod
+    def wrap( cls, conn ):
+        
+        # Returns the shared async wrapper of given connection.
+        # Must be called from GUI thread.
+        
+        if conn is None or isinstance( conn, AsyncConnection ):
+            return conn
+        
+        wrapper = _WRAPPERS.get( conn )
+        if wrapper is None:
+            wrapper = _WRAPPERS[conn] = cls( conn )
+        return wrapper
+    
+    def submit( self, function, *args, tag=None, callback=None, errback=None, **kwargs ):
+        
+        # Runs `function( *args, **kwargs )` in background.
+        # Returns future, it's ticket is `future.ticket`.
+        
+        with self.__lock:
+            
+            ticket = next( self.__tickets )
+            self.__pending[ticket] = ( tag, callback, errback )
+            
+            if tag is not None:
+                previous = self.__latest.get( tag )
+                if previous is not None:
+                    previous_ticket, previous_future = previous
+                    previous_future.cancel()
+                    self.__pending.pop( previous_ticket, None )
+            
+            future = self.__executor.submit( function, *args, **kwargs )
+            future.ticket = ticket
+            
+            if tag is not None:
+                self.__latest[tag] = ( ticket, future )
+        
+        future.add_done_callback( self.__worker_done )
+        
+        return future
+    
+    def query( self, query, db_name=None, params=None, **kwargs ):
+        
+        # Same as `Connection.query`, in background.
+        
+        return self.submit( self.conn.query, query, db_name=db_name, params=params, **kwargs )
+    
+    def load_df( self, query, db_name=None, params=None, columns=None, **kwargs ):
+        
+        # Same as `Columns.load_df`, in background.
+        
+        return self.submit(
+            self.conn.Columns.load_df, self.conn, query,
+            db_name=db_name, params=params, columns=columns,
+            **kwargs )
+    
+    def cancel( self, tag ):
+        
+        # Forgets the latest request with given tag.
+        
+        with self.__lock:
+            latest = self.__latest.pop( tag, None )
+            if latest is None:
+                return
+            ticket, future = latest
+            future.cancel()
+            self.__pending.pop( ticket, None )
+    
+    def is_busy( self, tag ):
+        with self.__lock:
+            return tag in self.__latest
+    
+    def shutdown( self, wait=False ):
+        
+        with self.__lock:
+            self.__pending.clear()
+            self.__latest.clear()
+        
+        self.__executor.shutdown( wait=wait, cancel_futures=True )
+    
+    @classmethod
+    def shutdown_all( cls, wait=False ):
+        
+        # Stops threads of all shared wrappers, see `wrap`.
+        # Must be called from GUI thread when the app closes.
+        
+        wrappers = list( _WRAPPERS.values() )
+        _WRAPPERS.clear()
+        
+        for wrapper in wrappers:
+            wrapper.shutdown( wait=wait )
+    
+    def __worker_done( self, future ):
+        
+        # Worker thread. Whatever happened, GUI thread
+        # decides what to do with it.
+        
+        if future.cancelled():
+            return
+        
+        ex = future.exception()
+        result = None if ex is not None else future.result()
+        self._DONE.emit( future.ticket, result, ex )
+    
+    def __done_event( self, ticket, result, ex ):
+        
+        # GUI thread.
+        
+        with self.__lock:
+            
+            pending = self.__pending.pop( ticket, None )
+            if pending is None:
+                # superseded or cancelled
+                return
+            
+            tag, callback, errback = pending
+            if tag is not None:
+                latest = self.__latest.get( tag )
+                if latest is not None and latest[0]==ticket:
+                    self.__latest.pop( tag )
+        
+        if ex is not None:
+            log.error( f'background request failed because {ex}' )
+            if errback is not None:
+                errback( ex )
+            return
+        
+        self.FINISHED.emit( ticket, result )
+        if callback is not None:
+            callback( result )
+
+#---------------------------------------------------------------------------+++
+# end 2026.10.18
+# shutdown_all
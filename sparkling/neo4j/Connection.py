@@ -21,6 +21,9 @@ import logging
 log = logging.getLogger(__name__)
 
 # embedded in python
+from contextlib import contextmanager
+from threading import Lock, Thread, get_ident
+from time import perf_counter
 # pip install
 from neo4j import GraphDatabase
 from neo4j.exceptions import ConfigurationError
@@ -32,6 +35,16 @@ from sparkling.neo4j.Neo4jColumns import (
     # that's why i don't delete them
     NODE, LABEL_SEPARATOR, DB_DEFAULT, MULTIVALUE_SEPARATOR
     )
+from sparkling.neo4j.QueryCache import is_write_query
+from sparkling.neo4j.QueryStats import QUERY_STATS, summarize_plan
+
+# how many rows are sent to server in a single transaction
+# during bulk operations
+BATCH_SIZE_DEFAULT = 5000
+
+# how many records the driver pulls from server at a time
+# while I iterate over a result
+FETCH_SIZE_DEFAULT = 1000
 
 class InvalidConnectionError( Exception ):
     
@@ -55,12 +68,25 @@ class Connection:
     # can and should be overridden
     Columns = ColumnsNeo4j
     
+    # timings of all queries,
+    # shared by all connections
+    stats = QUERY_STATS
+    
     __driver = None
     
+    # opened sessions are reused between queries,
+    # key = ( thread, db_name ), because sessions
+    # must not be shared between threads
+    __sessions = None # future dictionary
+    __sessions_lock = None
+    
     def __init__( self, socket, username, password, custom_columns=None ):
         
         super( Connection, self ).__init__()
         
+        self.__sessions = {}
+        self.__sessions_lock = Lock()
+        
         # override columns
         if not custom_columns is None:
             self.Columns = custom_columns
@@ -82,44 +108,299 @@ class Connection:
         
         # Closes current connection.
         
+        self.close_sessions()
+        
         if self.__driver is not None:
             self.__driver.close()
             
-    def is_valid( self ):
+    def close_sessions( self ):
         
-        # For external use only.
+        # Closes all cached sessions. The driver
+        # remains open, new sessions will be opened on demand.
         
-        return not self.__driver is None
+        with self.__sessions_lock:
+            sessions = list( self.__sessions.values() )
+            self.__sessions.clear()
         
-    def query( self, query, db_name=None ):
+        for session in sessions:
+            try:
+                session.close()
+            except Exception as ex:
+                log.debug( f'failed to close session because {ex}' )
+    
+    def _get_session( self, db_name=None ):
         
-        # Allows to send any `cipher` code query to server.
+        # Returns cached session for this thread and `db`,
+        # opens a new one if necessary.
         
         if self.__driver is None:
-            raise InvalidConnectionError
+            raise InvalidConnectionError( 'no driver', None )
         
-        session = None
-        response = None
+        key = ( get_ident(), db_name )
         
-        try: 
+        with self.__sessions_lock:
+            
+            session = self.__sessions.get( key )
+            if session is not None and not session.closed():
+                return session
             
             session = self.__driver.session(database=db_name) \
                 if db_name is not None \
                 else self.__driver.session()
+            self.__sessions[key] = session
+            
+        return session
+    
+    def _drop_session( self, db_name=None ):
+        
+        # Whenever something fails, I don't trust
+        # the cached session anymore.
+        
+        with self.__sessions_lock:
+            session = self.__sessions.pop( ( get_ident(), db_name ), None )
+        
+        if session is not None:
+            try:
+                session.close()
+            except Exception as ex:
+                log.debug( f'failed to close session because {ex}' )
+    
+    def close_thread_session( self, db_name=None ):
+        
+        # Closes the session of the calling thread.
+        # Short-lived threads call me before they end,
+        # otherwise their sessions stay open
+        # till `close_sessions`.
+        
+        self._drop_session( db_name )
+    
+    @contextmanager
+    def session( self, db_name=None ):
+        
+        # Allows to hold a single session across
+        # many statements:
+        # with conn.session( db_name ) as session:
+        #     session.run( ... )
+        #     session.run( ... )
+        
+        session = self._get_session( db_name )
+        
+        try:
+            yield session
+        except Exception:
+            self._drop_session( db_name )
+            raise
+    
+    def read( self, work, db_name=None, *args, **kwargs ):
+        
+        # Executes `work( tx, *args, **kwargs )` inside a single
+        # managed read transaction. The driver retries
+        # it on transient errors, so `work` should
+        # consume it's results and have no side effects.
+        
+        return self.__execute( 'execute_read', work, db_name, *args, **kwargs )
+    
+    def write( self, work, db_name=None, *args, **kwargs ):
+        
+        # Same as `read`, but inside a single managed
+        # write transaction. Any number of statements
+        # sent through `tx.run` cost only one commit.
+        
+        return self.__execute( 'execute_write', work, db_name, *args, **kwargs )
+    
+    def __execute( self, method_name, work, db_name, *args, **kwargs ):
+        
+        if self.__driver is None:
+            raise InvalidConnectionError( 'no driver', None )
+        
+        try:
+            
+            session = self._get_session( db_name )
+            start = perf_counter()
+            result = getattr( session, method_name )( work, *args, **kwargs )
+            seconds = perf_counter() - start
+            
+        except Exception as ex:
+            
+            log.error( f'transaction failed\n    work: {getattr(work,"__name__",work)}\n    db: {db_name}\n    because {ex}' )
+            self._drop_session( db_name )
+            return
+        
+        # statements of `work` are not known,
+        # so there is no plan to capture
+        shape = f'{method_name} {getattr(work,"__qualname__",work)}'
+        self.stats.record( shape, db_name, seconds, len( result ) if type(result) is list else 0 )
+        
+        return result
+            
+    def is_valid( self ):
+        
+        # For external use only.
+        
+        return not self.__driver is None
+        
+    def query_iter( self, query, db_name=None, params=None, batch_size=None, fetch_size=FETCH_SIZE_DEFAULT ):
+        
+        # Same as `query`, but does not download the whole response
+        # at once. Yields records one by one,
+        # or lists of `batch_size` records.
+        
+        # The driver pulls `fetch_size` records at a time, so
+        # memory usage depends on how many records I keep, not
+        # on the size of the response.
+        
+        # A dedicated session is kept open while I iterate,
+        # it is closed when the generator is exhausted or closed.
+        # Failures are logged and raised, so that a partial
+        # response is never mistaken for a complete one.
+        
+        if self.__driver is None:
+            raise InvalidConnectionError( 'no driver', None )
+        
+        session = self.__driver.session(database=db_name, fetch_size=fetch_size) \
+            if db_name is not None \
+            else self.__driver.session(fetch_size=fetch_size)
+        
+        # only the time spent waiting for the server is recorded,
+        # not the time spent by whoever iterates
+        timer = { 'seconds': 0.0, 'n_records': 0 }
+        
+        def timed( records ):
+            while True:
+                start = perf_counter()
+                record = next( records, None )
+                timer['seconds'] += perf_counter() - start
+                if record is None:
+                    return
+                timer['n_records'] += 1
+                yield record
+        
+        try:
+            
+            start = perf_counter()
+            result = timed( iter( session.run( query, params ) ) )
+            timer['seconds'] += perf_counter() - start
+            
+            if batch_size is None:
+                yield from result
+            else:
+                batch = []
+                for record in result:
+                    batch.append( record )
+                    if len( batch ) >= batch_size:
+                        yield batch
+                        batch = []
+                if len( batch ) > 0:
+                    yield batch
+            
+            # plans are not captured, running a whole
+            # export again would cost too much
+            self.stats.record( query, db_name, timer['seconds'], timer['n_records'] )
                 
-            response = list( session.run(query) )
+        except GeneratorExit:
+            
+            raise
             
         except Exception as ex:
             
             log.error( f'query failed\n    query: {query}\n    db: {db_name}\n    because {ex}' )
+            raise
             
-        finally: 
+        finally:
             
-            if session is not None:
-                session.close()
+            session.close()
+    
+    def create_nodes( self, df, db_name=None ):
+        
+        # Creates one node per `df` row within a single
+        # transaction, sending one `UNWIND` query per label set.
+        # Supports reserved column `labels`.
+        # Returns identities in `df` row order, or `None`.
+        
+        batches = self.Columns.df2batches( df )
+        if len( batches )==0:
+            return []
+        
+        def work( tx ):
+            identities = [ None ]*len( df.index )
+            for labels, rows in batches.items():
+                query = self.Columns.convert_bulk_create( labels )
+                for record in tx.run( query, { 'rows': rows } ):
+                    identities[ record['pos'] ] = record['identity']
+            return identities
+        
+        return self.write( work, db_name=db_name )
+    
+    def query( self, query, db_name=None, params=None, cache=True ):
+        
+        # Allows to send any `cipher` code query to server.
+        # Values should be sent via `params` and referenced
+        # in `query` as `$name`.
+        # `cache` = whether subclasses that cache responses
+        # may answer this query from cache, I don't cache anything.
+        
+        # The session is not closed afterwards - it is reused
+        # by all following queries to the same `db`.
+        
+        if self.__driver is None:
+            raise InvalidConnectionError( 'no driver', None )
+        
+        response = None
+        
+        try: 
+            
+            session = self._get_session( db_name )
+            start = perf_counter()
+            response = list( session.run(query, params) )
+            seconds = perf_counter() - start
+            
+        except Exception as ex:
+            
+            log.error( f'query failed\n    query: {query}\n    params: {params}\n    db: {db_name}\n    because {ex}' )
+            self._drop_session( db_name )
+            return response
+        
+        if self.stats.record( query, db_name, seconds, len( response ) ):
+            # a slow query is not waited for twice
+            Thread(
+                target=self.__capture_plan_event,
+                args=( query, db_name, None if params is None else dict( params ) ),
+                daemon=True ).start()
                 
         return response
     
+    def __capture_plan_event( self, query, db_name, params ):
+        
+        # I end up here in a thread of my own
+        # when `query` was slow, see `capture_plan`.
+        
+        try:
+            self.stats.set_plan( query, self.capture_plan( query, db_name=db_name, params=params ) )
+        finally:
+            self.close_thread_session( db_name )
+    
+    def capture_plan( self, query, db_name=None, params=None ):
+        
+        # Returns a short summary of the query plan (see `summarize_plan`).
+        # Read queries are run again with `PROFILE`,
+        # which gives actual db hits. Write queries are
+        # only `EXPLAIN`ed - they must not run twice.
+        # Takes as long as the query itself, `query` calls
+        # me in background.
+        
+        profile = not is_write_query( query )
+        
+        try:
+            
+            session = self._get_session( db_name )
+            summary = session.run( ( 'PROFILE ' if profile else 'EXPLAIN ' ) + query, params ).consume()
+            return summarize_plan( summary.profile if profile else summary.plan )
+            
+        except Exception as ex:
+            
+            log.debug( f'failed to capture plan because {ex}' )
+            self._drop_session( db_name )
+    
 #---------------------------------------------------------------------------+++
-# end 2023.10.14
-# simplified
+# end 2026.10.18
+# plans are captured in background
@@ -0,0 +1,330 @@
+# -*- coding: utf-8 -*-
+#Python utility "Neo4J Db Exporter". Allows to save all nodes of a Neo4J database to disk chunk by chunk. Copyright (C) 2023 Anna Anikina
+#
+#This program is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#This program is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+#---------------------------------------------------------------------------+++
+
+# logging
+import logging
+log = logging.getLogger(__name__)
+
+# embedded in python
+import gzip
+import os
+from importlib.util import find_spec
+# same project
+from sparkling.common import ( readf_yaml, savef_yaml )
+from sparkling.common.BaseColumns import BaseColumns
+from sparkling.neo4j.Connection import (
+    BATCH_SIZE_DEFAULT,
+    NODE
+    )
+from sparkling.neo4j.Neo4jColumns import LABELS_LIST
+
+class ColumnsExportFormats( BaseColumns ):
+    
+    # Supported output formats.
+    # Each one is also used as file extension.
+    
+    csv = 'csv'
+    csv_gz = 'csv.gz'
+    csv_zst = 'csv.zst' # requires `pip install zstandard`
+    jsonl = 'jsonl'
+    parquet = 'parquet' # requires `pip install pyarrow`, output is a folder
+
+class ColumnsExportProgress( BaseColumns ):
+    
+    # I remember export progress in a small .yaml file
+    # next to the output, so that interrupted exports
+    # can be resumed.
+    
+    fmt = 'fmt'
+    columns = 'columns'
+    last_identity = 'last_identity'
+    n_rows = 'n_rows'
+    n_chunks = 'n_chunks'
+    
+    # size of the output file after the last
+    # successfully written chunk
+    n_bytes = 'n_bytes'
+
+EXPORT_FORMATS = [
+    ColumnsExportFormats.csv,
+    ColumnsExportFormats.csv_gz,
+    ColumnsExportFormats.csv_zst,
+    ColumnsExportFormats.jsonl,
+    ColumnsExportFormats.parquet,
+    ]
+
+# key = format, value = package it requires,
+# these packages are optional
+EXPORT_FORMAT_PACKAGES = {
+    ColumnsExportFormats.csv_zst: 'zstandard',
+    ColumnsExportFormats.parquet: 'pyarrow',
+    }
+
+PROGRESS_FILE_SUFFIX = '.progress.yaml'
+
+def _open_for_append( dst, fmt ):
+    
+    # Every chunk is written with a separately opened handle,
+    # so each compressed chunk is a complete gzip member / zstd frame
+    # and the file stays valid after every chunk.
+    
+    c = ColumnsExportFormats
+    
+    if fmt == c.csv_gz:
+        return gzip.open( dst, 'at', encoding='utf-8', newline='' )
+    
+    if fmt == c.csv_zst:
+        import zstandard # optional
+        return zstandard.open( dst, 'at', encoding='utf-8', newline='' )
+    
+    return open( dst, 'a', encoding='utf-8', newline='' )
+
+class DbExporter:
+    
+    # Saves all nodes of a single `db` to disk.
+    
+    # Nodes are downloaded in pages of `batch_size`, ordered
+    # by ID(node), and every page is appended to disk right away,
+    # so memory usage does not depend on db size.
+    
+    # Reserved columns `identity` and `labels` are
+    # written as ordinary columns, which makes the
+    # output compatible with `import_from_csv`.
+    
+    _conn = None
+    _db_name = None
+    _dst = None
+    _fmt = None
+    _batch_size = None
+    
+    # for external use, `progress_callback( n_rows, n_total )`
+    _progress_callback = None
+    
+    def __init__( self, conn, db_name, dst,
+                  fmt=ColumnsExportFormats.csv,
+                  batch_size=BATCH_SIZE_DEFAULT,
+                  progress_callback=None ):
+        
+        if not fmt in EXPORT_FORMATS:
+            raise ValueError( f'unknown export format {fmt}' )
+        
+        # better now than after the first page
+        package = EXPORT_FORMAT_PACKAGES.get( fmt )
+        if not package is None and find_spec( package ) is None:
+            raise ImportError( f'export to {fmt} requires `pip install {package}`' )
+        
+        self._conn = conn
+        self._db_name = db_name
+        self._dst = dst
+        self._fmt = fmt
+        self._batch_size = batch_size
+        self._progress_callback = progress_callback
+    
+    def progress_file( self ):
+        return self._dst + PROGRESS_FILE_SUFFIX
+    
+    def run( self, resume=True ):
+        
+        # Exports the whole db. Returns the number of exported rows.
+        # If `resume`, continues the previously interrupted export.
+        
+        # short name for convenience
+        cp = ColumnsExportProgress
+        
+        progress = self.__load_progress() if resume else None
+        if progress is None:
+            progress = self.__start_from_scratch()
+        else:
+            log.info( f'resuming export of db {self._db_name} after {progress[cp.n_rows]} rows: {self._dst}' )
+            self.__discard_unconfirmed_output( progress )
+        
+        n_total = self.__count_nodes()
+        
+        query = f'MATCH ({NODE}) WHERE ID({NODE}) > $last_identity ' \
+            f'RETURN {NODE}, labels({NODE}) AS {LABELS_LIST} ' \
+            f'ORDER BY ID({NODE}) LIMIT $limit'
+        
+        while True:
+            
+            params = {
+                'last_identity': progress[cp.last_identity],
+                'limit': self._batch_size,
+                }
+            # pages are read once, they would only
+            # push useful responses out of cache
+            response = self._conn.query( query, db_name=self._db_name, params=params, cache=False )
+            if response is None:
+                log.error( f'failed to export db {self._db_name}, {progress[cp.n_rows]} rows were exported, run again to resume' )
+                return progress[cp.n_rows]
+            if len( response )==0:
+                break
+            
+            df = self.__response2df( response, progress[cp.columns] )
+            self.__write_chunk( df, progress )
+            
+            progress[cp.last_identity] = response[-1][NODE].id
+            progress[cp.n_rows] += len( df.index )
+            progress[cp.n_chunks] += 1
+            if os.path.isfile( self._dst ):
+                progress[cp.n_bytes] = os.path.getsize( self._dst )
+            savef_yaml( self.progress_file(), progress )
+            
+            log.debug( f'exported {progress[cp.n_rows]}/{n_total} rows from db {self._db_name}' )
+            if self._progress_callback is not None:
+                self._progress_callback( progress[cp.n_rows], n_total )
+        
+        # finished, nothing to resume
+        os.remove( self.progress_file() )
+        
+        return progress[cp.n_rows]
+    
+    def __count_nodes( self ):
+        
+        # Node count is read from db statistics,
+        # it's cheap.
+        
+        response = self._conn.query( f'MATCH ({NODE}) RETURN count({NODE}) AS n', db_name=self._db_name, cache=False )
+        if response is None:
+            return None
+        return response[0]['n']
+    
+    def __collect_columns( self ):
+        
+        # Csv and parquet need the same columns in every chunk,
+        # but nodes may have any properties. I ask the server
+        # for the full list once, before downloading anything.
+        
+        c = self._conn.Columns
+        
+        response = self._conn.query(
+            f'MATCH ({NODE}) UNWIND keys({NODE}) AS key RETURN DISTINCT key',
+            db_name=self._db_name, cache=False
+            )
+        if response is None:
+            raise ConnectionError( 'can\'t get a response' )
+        
+        keys = sorted([ r['key'] for r in response ])
+        return [ c.identity, c.neo4j_labels ] + keys
+    
+    def __start_from_scratch( self ):
+        
+        cp = ColumnsExportProgress
+        
+        # remove previous output
+        if os.path.isdir( self._dst ):
+            for f in os.listdir( self._dst ):
+                os.remove( os.path.join( self._dst, f ) )
+        elif os.path.isfile( self._dst ):
+            os.remove( self._dst )
+        
+        progress = {
+            cp.fmt: self._fmt,
+            cp.columns: self.__collect_columns(),
+            cp.last_identity: -1,
+            cp.n_rows: 0,
+            cp.n_chunks: 0,
+            cp.n_bytes: 0,
+            }
+        savef_yaml( self.progress_file(), progress )
+        
+        return progress
+    
+    def __load_progress( self ):
+        
+        cp = ColumnsExportProgress
+        
+        src = self.progress_file()
+        if not os.path.isfile( src ):
+            return None
+        
+        progress = readf_yaml( src )
+        if not type(progress) is dict or not progress.get( cp.fmt ) == self._fmt:
+            log.info( f'can\'t resume export with a different format, starting from scratch: {self._dst}' )
+            return None
+        
+        return progress
+    
+    def __discard_unconfirmed_output( self, progress ):
+        
+        # I may have been interrupted after writing a chunk,
+        # but before saving the progress. Such chunk
+        # will be written again, so it needs to go.
+        
+        cp = ColumnsExportProgress
+        
+        if self._fmt == ColumnsExportFormats.parquet:
+            if not os.path.isdir( self._dst ):
+                return
+            for f in os.listdir( self._dst ):
+                name, _ = os.path.splitext( f )
+                if int( name.split('-')[-1] ) >= progress[cp.n_chunks]:
+                    os.remove( os.path.join( self._dst, f ) )
+            return
+        
+        if os.path.isfile( self._dst ):
+            with open( self._dst, 'r+b' ) as f:
+                f.truncate( progress[cp.n_bytes] )
+    
+    def __response2df( self, response, columns ):
+        
+        # One page of records -> df with all expected columns.
+        # I want only str.
+        
+        c = self._conn.Columns
+        
+        # columns were collected when export started,
+        # properties that appeared later can't be written
+        new_keys = set()
+        for r in response:
+            new_keys.update( r[NODE].keys() )
+        new_keys = new_keys.difference( columns )
+        if len( new_keys ) > 0:
+            log.warning( f'properties {sorted( new_keys )} appeared after export of db {self._db_name} started and are not exported, export from scratch to include them: {self._dst}' )
+        
+        df = c.records2df( response, columns=columns )
+        df[c.identity] = df.index
+        
+        return df[columns].astype( str )
+    
+    def __write_chunk( self, df, progress ):
+        
+        c = ColumnsExportFormats
+        cp = ColumnsExportProgress
+        
+        if self._fmt == c.parquet:
+            # parquet files can't be appended,
+            # so each chunk is a separate file in a folder
+            if not os.path.isdir( self._dst ):
+                os.makedirs( self._dst )
+            src = os.path.join( self._dst, 'part-%05d.parquet' % progress[cp.n_chunks] )
+            df.to_parquet( src, index=False )
+            return
+        
+        with _open_for_append( self._dst, self._fmt ) as f:
+            
+            if self._fmt == c.jsonl:
+                text = df.to_json( orient='records', lines=True, force_ascii=False )
+                if not text.endswith( '\n' ): text += '\n'
+                f.write( text )
+                return
+            
+            df.to_csv( f, index=False, header=progress[cp.n_chunks]==0 )
+
+#---------------------------------------------------------------------------+++
+# end 2026.10.18
+# optional packages are checked upfront
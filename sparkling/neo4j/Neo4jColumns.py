@@ -21,17 +21,33 @@ import logging
 log = logging.getLogger(__name__)
 
 # embedded in python
-from re import sub as resubstitute
+from concurrent.futures import ThreadPoolExecutor
+from re import ( sub as resubstitute, finditer, search, IGNORECASE )
 # pip install
+import numpy as np
 import pandas as pd
 # same project
 from sparkling.common.BaseColumns import BaseColumns
+from sparkling.neo4j.QueryCache import strip_literals
 
 NODE = 'n'
 LABEL_SEPARATOR = ':'
 DB_DEFAULT = 'neo4j'
 MULTIVALUE_SEPARATOR = '; '
 
+# name of the labels list that I return together with each node
+LABELS_LIST = 'labels_list'
+
+# names of ID(node) and node properties map that I return
+# instead of the node when only some properties are needed
+NODE_IDENTITY = 'node_identity'
+NODE_PROJECTION = 'node_projection'
+
+# how many identities are sent in a single lookup query,
+# and how many such queries may run at the same time
+IDENTITIES_CHUNK_SIZE = 5000
+IDENTITIES_MAX_WORKERS = 4
+
 QUERY_KEYWORDS = [
     # help:
     # https://neo4j.com/docs/cypher-cheat-sheet/5/auradb-enterprise/
@@ -50,6 +66,22 @@ def _convert_to_safe_string( some_string ):
     safe_new = resubstitute( r'([\\\"\'])', r'\\\1', some_string )
     return f'\'{safe_new}\''
 
+def _has_top_level_union( query ):
+    
+    # Whether parts of given query are joined by `UNION`.
+    # `UNION` inside subqueries (`CALL { ... }`), strings
+    # and comments doesn't count.
+    
+    query = strip_literals( query )
+    while True:
+        # innermost braces first
+        stripped = resubstitute( r'\{[^{}]*\}', '{}', query )
+        if stripped==query:
+            break
+        query = stripped
+    
+    return not search( r'\bUNION\b', query, flags=IGNORECASE ) is None
+
 class ColumnsNeo4j( BaseColumns ):
     
     # Reserved node field names.
@@ -66,46 +98,394 @@ class ColumnsNeo4j( BaseColumns ):
     neo4j_labels = 'neo4j Label'
     
     @classmethod
-    def response2df( cls, response, columns=None, identity=False, node_variable_name=None ):
+    def records2df( cls, records, columns=None, node_variable_name=None ):
+        
+        # Converts a list of records with nodes to dataframe.
+        # Labels are supported if they were returned together
+        # with nodes (see `convert_return_with_labels`).
+        # Always returns df.
+        
+        # Values are collected into one list per property
+        # in a single pass over records, so pandas doesn't need
+        # to infer columns row by row. Missing values are ''.
+        # `df.index` = ID(node), int64.
+        # If `columns` are given, only these properties
+        # are kept, in this order.
+        # Projected records (see `convert_return_projected`)
+        # are supported as well.
+        
+        # short name
+        n = NODE if node_variable_name is None else node_variable_name
+        
+        n_rows = len( records )
+        identities = np.empty( n_rows, dtype=np.int64 )
+        keep = None if columns is None else set( columns )
+        
+        data = {} if columns is None else { col: ['']*n_rows for col in columns }
+        labels = None
+        projected = False
+        if n_rows > 0:
+            keys = records[0].keys()
+            labels = ['']*n_rows if LABELS_LIST in keys else None
+            projected = NODE_IDENTITY in keys
+        
+        for iloc, r in enumerate( records ):
+            
+            if projected:
+                node = r[NODE_PROJECTION]
+                identities[iloc] = r[NODE_IDENTITY]
+            else:
+                node = r[n]
+                identities[iloc] = node.id
+            
+            for k, v in node.items():
+                if keep is not None and not k in keep:
+                    continue
+                if v is None:
+                    # projected node doesn't have this property
+                    continue
+                values = data.get( k )
+                if values is None:
+                    # this property appeared for the first time
+                    values = data[k] = ['']*n_rows
+                values[iloc] = v
+                
+            if labels is not None:
+                labels[iloc] = MULTIVALUE_SEPARATOR.join( r[LABELS_LIST] )
+        
+        df = pd.DataFrame( data, index=pd.Index( identities, dtype=np.int64 ) )
+        if labels is not None:
+            df[cls.neo4j_labels] = labels
+            
+        return df
+    
+    @classmethod
+    def response2df( cls, response, columns=None, identity=False, properties=None, node_variable_name=None ):
         
         # Converts conn response to dataframe.
+        # If `columns` are given, records are not nodes:
+        # each record field becomes a column.
+        # `properties` = which node properties to keep.
         
         if response is None:
             return
         if len( response )==0:
             return
         
+        # this response can be converted to df
+        
+        if not columns is None:
+            return pd.DataFrame([ dict(record) for record in response ])
+        
+        df = cls.records2df( response, columns=properties, node_variable_name=node_variable_name )
+        if identity:
+            df[cls.identity] = df.index
+        return df
+    
+    @classmethod
+    def response2df_with_labels( cls, response, columns=None, node_variable_name=None ):
+        
+        # Converts conn response with nodes and their labels
+        # (see `convert_return_with_labels`) to dataframe
+        # with reserved column `labels`.
+        # Always returns df.
+        
+        df = cls.records2df( response, columns=columns, node_variable_name=node_variable_name )
+        if not cls.neo4j_labels in df.columns:
+            df[cls.neo4j_labels] = ''
+            
+        return df
+    
+    @classmethod
+    def convert_return_with_labels( cls, query, node_variable_name=None ):
+        
+        # Rewrites the last `RETURN n` of given query
+        # into `RETURN n, labels(n) AS labels_list`, so that
+        # I don't need a second query to get labels.
+        # Returns `None` if I don't understand this query.
+        
         # short name
         n = NODE if node_variable_name is None else node_variable_name
-            
-        # this response can be converted to df
         
-        identities = [ r[n].id for r in response ]
+        if LABELS_LIST in query:
+            # already there
+            return query
+        
+        # `RETURN n`, `RETURN DISTINCT n`, `RETURN node AS n`
+        # followed by nothing / `ORDER BY` / `SKIP` / `LIMIT`
+        pattern = r'\bRETURN\s+(?:DISTINCT\s+)?(\w+)(?:\s+AS\s+(\w+))?' \
+            r'(?=\s*(?:$|;|\bORDER\s+BY\b|\bSKIP\b|\bLIMIT\b))'
+        matches = list( finditer( pattern, query, flags=IGNORECASE ) )
+        if len( matches )==0:
+            return None
+        
+        last = matches[-1]
+        expression, alias = last.group(1), last.group(2)
+        if not ( alias if alias else expression ) == n:
+            return None
+        
+        if _has_top_level_union( query ):
+            # labels would be added to the last part only,
+            # all parts return the same columns though
+            wrapped = 'CALL { %s } RETURN %s' % ( query.strip().rstrip( ';' ).rstrip(), n )
+            return cls.convert_return_with_labels( wrapped, node_variable_name=node_variable_name )
+        
+        return query[:last.end()] \
+            + f', labels({expression}) AS {LABELS_LIST}' \
+            + query[last.end():]
+    
+    @classmethod
+    def convert_return_projected( cls, query, columns, node_variable_name=None ):
+        
+        # Rewrites the last `RETURN n` of given query into
+        # `RETURN ID(n) AS node_identity, n{.col1, .col2} AS node_projection,
+        # labels(n) AS labels_list`, so that the server
+        # sends only the properties I'm going to show.
+        # Returns `None` if I don't understand this query.
+        
+        # short name
+        n = NODE if node_variable_name is None else node_variable_name
+        
+        if LABELS_LIST in query or NODE_PROJECTION in query:
+            # already customized, better not touch it
+            return None
+        
+        # same as in `convert_return_with_labels`, but without
+        # `DISTINCT`: projected maps of different nodes may be equal,
+        # and `ORDER BY` can't see the node after `RETURN DISTINCT`
+        pattern = r'\bRETURN\s+(\w+)(?:\s+AS\s+(\w+))?' \
+            r'(?=\s*(?:$|;|\bORDER\s+BY\b|\bSKIP\b|\bLIMIT\b))'
+        matches = list( finditer( pattern, query, flags=IGNORECASE ) )
+        if len( matches )==0:
+            return None
+        
+        last = matches[-1]
+        expression, alias = last.group(1), last.group(2)
+        if not ( alias if alias else expression ) == n:
+            return None
+        
+        if _has_top_level_union( query ):
+            # same as in `convert_return_with_labels`
+            wrapped = 'CALL { %s } RETURN %s' % ( query.strip().rstrip( ';' ).rstrip(), n )
+            return cls.convert_return_projected( wrapped, columns, node_variable_name=node_variable_name )
+        
+        # reserved columns are not node properties
+        reserved = [ cls.identity, cls.neo4j_labels ]
+        properties = ', '.join([ '.`%s`' % col.replace( '`', '``' ) for col in columns if not col in reserved ])
+        
+        return query[:last.start()] \
+            + f'RETURN ID({expression}) AS {NODE_IDENTITY}, ' \
+            + f'{expression}{{{properties}}} AS {NODE_PROJECTION}, ' \
+            + f'labels({expression}) AS {LABELS_LIST}' \
+            + query[last.end():]
+    
+    @classmethod
+    def convert_paged( cls, query, node_variable_name=None ):
+        
+        # Rewrites a query that ends with `RETURN n` so that it
+        # returns a single page of results at a time.
+        # Returns `( paged_query, is_keyset )` or `None` if I don't
+        # understand this query or it is limited already.
+        
+        # Plain queries are paged by `ID(n)` (keyset paging):
+        # `... WITH DISTINCT n WHERE ID(n) > $page_after RETURN n ORDER BY ID(n) LIMIT $page_limit`,
+        # so that every page costs the same.
+        # A node that the query returns several times would
+        # otherwise lose its repeats after a page boundary,
+        # so paged results have each node once.
+        # Queries with their own ordering (`ORDER BY`, procedures
+        # like full text search) keep it and are paged with
+        # `SKIP $page_skip LIMIT $page_limit`.
+        
+        # short name
+        n = NODE if node_variable_name is None else node_variable_name
+        
+        query = query.strip().rstrip( ';' ).rstrip()
+        if _has_top_level_union( query ):
+            return None
+        
+        pattern = r'\bRETURN\s+(\w+)(?:\s+AS\s+(\w+))?' \
+            r'(?=\s*(?:$|\bORDER\s+BY\b))'
+        matches = list( finditer( pattern, query, flags=IGNORECASE ) )
+        if len( matches )==0:
+            return None
+        
+        last = matches[-1]
+        expression, alias = last.group(1), last.group(2)
+        if not ( alias if alias else expression ) == n:
+            return None
+        
+        tail = query[last.end():]
+        if not search( r'\b(?:SKIP|LIMIT)\b', tail, flags=IGNORECASE ) is None:
+            return None
+        
+        is_ordered = not search( r'\bORDER\s+BY\b', tail, flags=IGNORECASE ) is None
+        is_procedure = not search( r'\bCALL\b', query, flags=IGNORECASE ) is None
+        if is_ordered or is_procedure:
+            return query + ' SKIP $page_skip LIMIT $page_limit', False
+        
+        renamed = expression if alias is None else f'{expression} AS {alias}'
+        return query[:last.start()] \
+            + f'WITH DISTINCT {renamed} WHERE ID({n}) > $page_after ' \
+            + f'RETURN {n} ORDER BY ID({n}) LIMIT $page_limit', True
+    
+    @classmethod
+    def convert_limited( cls, query, limit, node_variable_name=None ):
+        
+        # Rewrites a query that ends with `RETURN n` so that it
+        # returns at most `limit` rows, for queries that
+        # can't be paged by `convert_paged`.
+        # Queries that are limited already are returned as is.
+        # Returns `None` if I don't understand this query.
+        
+        # short name
+        n = NODE if node_variable_name is None else node_variable_name
+        
+        query = query.strip().rstrip( ';' ).rstrip()
+        
+        pattern = r'\bRETURN\s+(?:DISTINCT\s+)?(\w+)(?:\s+AS\s+(\w+))?' \
+            r'(?=\s*(?:$|\bORDER\s+BY\b|\bSKIP\b|\bLIMIT\b))'
+        matches = list( finditer( pattern, query, flags=IGNORECASE ) )
+        if len( matches )==0:
+            return None
+        
+        last = matches[-1]
+        expression, alias = last.group(1), last.group(2)
+        if not ( alias if alias else expression ) == n:
+            return None
+        
+        if _has_top_level_union( query ):
+            # `LIMIT` after `UNION` would limit only the last part,
+            # all parts return the same columns though
+            return f'CALL {{ {query} }} RETURN {n} LIMIT {int(limit)}'
+        
+        tail = query[last.end():]
+        if not search( r'\bLIMIT\b', tail, flags=IGNORECASE ) is None:
+            return query
+        
+        return query + f' LIMIT {int(limit)}'
+    
+    @classmethod
+    def load_df( cls, conn, query, db_name=None, params=None, columns=None, node_variable_name=None, cache=True ):
         
-        if columns==None:
-            df = pd.DataFrame(
-                [ r.data()[n] for r in response ],
-                index=identities
-                )
-            if identity:
-                df[cls.identity] = identities
+        # Downloads nodes and converts them to df with
+        # reserved column `labels` using a single query whenever
+        # possible.
+        # If `columns` are given, only these properties
+        # are downloaded whenever possible.
+        # `cache` = whether the response may come from
+        # the connection's cache, see `Connection.query`.
+        # Returns `None` if the query failed.
+        
+        if not columns is None:
+            # reserved columns are not node properties
+            columns = [ col for col in columns if not col in [ cls.identity, cls.neo4j_labels ] ]
+            projected_query = cls.convert_return_projected( query, columns, node_variable_name=node_variable_name )
+            if not projected_query is None:
+                response = conn.query( projected_query, db_name=db_name, params=params, cache=cache )
+                if response is None:
+                    return
+                return cls.response2df_with_labels( response, columns=columns )
+            log.debug( f'can\'t download only some properties, will download whole nodes: {query}' )
+            columns = None
+        
+        labeled_query = cls.convert_return_with_labels( query, node_variable_name=node_variable_name )
+        
+        response = conn.query(
+            query if labeled_query is None else labeled_query,
+            db_name=db_name, params=params, cache=cache )
+        if response is None:
+            return
+        
+        if labeled_query is None:
+            # fallback for queries that i don't understand
+            log.debug( f'can\'t return labels together with nodes, will ask for them separately: {query}' )
+            df = cls.records2df( response, columns=columns, node_variable_name=node_variable_name )
+            cls.fill_reserved_columns( conn, df, db_name=db_name )
             return df
         
-        return pd.DataFrame([ dict(record) for record in response ])
+        return cls.response2df_with_labels( response, columns=columns, node_variable_name=node_variable_name )
     
     @classmethod
-    def convert_node_parameters( cls, param_dict ):
+    def load_df_by_identities( cls, conn, identities, db_name=None, columns=None,
+                               chunk_size=IDENTITIES_CHUNK_SIZE,
+                               max_workers=IDENTITIES_MAX_WORKERS ):
         
-        # Converts python dictionary into a string with neo4j parameters.
-        # Empty / invalid values are skipped.
+        # Downloads nodes with given identities, in the same order.
+        # Identities are sent as an int list parameter in chunks
+        # of `chunk_size`, so that no query gets too big; chunks
+        # are downloaded concurrently.
+        # Nodes that don't exist anymore are skipped.
+        # Returns `None` if any chunk failed.
         
-        # help:
-        # https://stackoverflow.com/questions/4202538/escape-special-characters-in-a-python-string
+        order = pd.Index( np.asarray( identities, dtype=np.int64 ) )
+        unique = order.unique()
+        
+        query = f'MATCH ({NODE}) WHERE ID({NODE}) IN $identities RETURN {NODE}'
+        chunks = [ [ int(loc) for loc in unique[start:start+chunk_size] ] for start in range( 0, len(unique), chunk_size ) ]
+        
+        def load( chunk ):
+            return cls.load_df( conn, query, db_name=db_name, params={ 'identities': chunk }, columns=columns )
+        
+        def load_and_forget( chunk ):
+            # `conn` keeps one session per thread,
+            # these threads die together with the executor
+            try:
+                return load( chunk )
+            finally:
+                conn.close_thread_session( db_name )
+        
+        if len( chunks ) <= 1 or max_workers <= 1:
+            dfs = [ load( chunk ) for chunk in chunks ]
+        else:
+            with ThreadPoolExecutor( max_workers=min( max_workers, len(chunks) ) ) as executor:
+                dfs = list( executor.map( load_and_forget, chunks ) )
+        
+        if any([ df is None for df in dfs ]):
+            log.error( f'failed to download {len(unique)} nodes by identities from db {db_name}' )
+            return
+        
+        if len( dfs )==0:
+            return cls.response2df_with_labels( [], columns=columns )
+        
+        df = pd.concat( dfs ).fillna( '' ) if len( dfs ) > 1 else dfs[0]
+        
+        # restore the order in one go
+        return df.reindex( order[ order.isin( df.index ) ] )
+    
+    @classmethod
+    def batches2df( cls, batches, columns=None, identity=False, node_variable_name=None ):
+        
+        # Converts record batches from `conn.query_iter`
+        # into a single dataframe, one batch at a time,
+        # so that I never hold all records in memory.
+        
+        # labels are supported if they were returned
+        # together with nodes
+        
+        dfs = []
+        for batch in batches:
+            df = cls.response2df( batch, identity=identity, properties=columns, node_variable_name=node_variable_name )
+            if df is not None:
+                dfs.append( df )
+                
+        if len( dfs )==0:
+            return
+        
+        # different batches may have different properties
+        return pd.concat( dfs ).fillna( '' )
+    
+    @classmethod
+    def clean_node_parameters( cls, param_dict ):
+        
+        # Converts python dictionary into a dictionary
+        # that can be sent to server as node properties.
+        # Reserved / empty / invalid values are skipped,
+        # all values are converted to str.
         
         if type(param_dict) is not dict: raise ValueError
-        if len(param_dict)==0: return ''
         
-        items = []
+        props = {}
         for k,v in param_dict.items():
             
             if k==cls.neo4j_labels:
@@ -117,27 +497,50 @@ class ColumnsNeo4j( BaseColumns ):
             
             if not type(v)==str: v=str(v)
             if len(v)>0:
-                v = resubstitute( r'([\\\"\'])', r'\\\1', v )
-                items.append(  f'{k}:\'{v}\'' )
-            
-        if len(items)==0: return ''
+                props[k] = v
+                
+        return props
+    
+    @classmethod
+    def convert_node_parameters( cls, param_dict, param_name='props' ):
         
-        return '{%s}' % ', '.join(items)
+        # Converts python dictionary into a `$param` placeholder
+        # and a dictionary with query parameters.
+        # Empty / invalid values are skipped.
+        
+        # Values are never written into the query text, so
+        # they don't need to be escaped, and queries of the same shape
+        # share a single cached plan on the server.
+        # help:
+        # https://neo4j.com/docs/cypher-manual/current/syntax/parameters/
+        
+        props = cls.clean_node_parameters( param_dict )
+        if len(props)==0: return '', {}
+        
+        return f'${param_name}', { param_name: props }
     
     @classmethod
-    def convert_node( cls, variable_name, label, param_dict=None ):
+    def convert_node( cls, variable_name, label, param_dict=None, param_name='props' ):
         
-        # Converts python variables into a string with neo4j node.
+        # Converts python variables into a string with neo4j node
+        # and a dictionary with query parameters.
         # Empty / invalid values are skipped.
         
+        # Labels can't be parameterized, so they remain in text.
+        # A parameter map is allowed only in `CREATE` (`CREATE (n $props)`),
+        # `MERGE`/`MATCH` reject it: match by label and `WHERE`,
+        # then `SET n += $props` instead.
+        
         label = label if label else ''
-        params = cls.convert_node_parameters( param_dict ) if param_dict else ''
+        placeholder, params = cls.convert_node_parameters( param_dict, param_name=param_name ) \
+            if param_dict \
+            else ( '', {} )
         
-        command = f"({variable_name} {params})" \
+        command = f"({variable_name} {placeholder})" \
             if label=='' \
-            else f"({variable_name}:{label} {params})"
+            else f"({variable_name}:{label} {placeholder})"
             
-        return command
+        return command, params
     
     @classmethod
     def convert_index_definition( cls, index_name, fields ):
@@ -186,6 +589,8 @@ class ColumnsNeo4j( BaseColumns ):
     @classmethod
     def df2nodes( cls, df, label=None ):
         
+        # Returns a list of `( node, params )`.
+        
         c = ColumnsNeo4j
         nodes = []
         
@@ -202,29 +607,128 @@ class ColumnsNeo4j( BaseColumns ):
             
         return nodes
     
+    @classmethod
+    def convert_labels( cls, text ):
+        
+        # Converts the value of reserved column `labels`
+        # (`A; B`, `A:B`) into a label string
+        # that can be used in a query (`A:B`).
+        # The same label set always gives the same string.
+        
+        if type(text) is not str: return ''
+        
+        labels = set()
+        for value in text.split( MULTIVALUE_SEPARATOR ):
+            for label in value.split( LABEL_SEPARATOR ):
+                label = label.strip()
+                if len(label)>0:
+                    labels.add( label )
+        
+        return LABEL_SEPARATOR.join( sorted(labels) )
+    
+    @classmethod
+    def df2batches( cls, df ):
+        
+        # Groups `df` rows by their label sets, so that each group
+        # can be sent to server as a single `UNWIND` query.
+        # Returns { labels: [ { pos: rowiloc, props: {} } ] }.
+        
+        has_labels = cls.neo4j_labels in df.columns
+        
+        batches = {}
+        for pos, row in enumerate( df.fillna( '' ).to_dict( 'records' ) ):
+            labels = cls.convert_labels( row[cls.neo4j_labels] ) if has_labels else ''
+            batches.setdefault( labels, [] ).append({
+                'pos': pos,
+                'props': cls.clean_node_parameters( row ),
+                })
+            
+        return batches
+    
+    @classmethod
+    def convert_bulk_create( cls, labels ):
+        
+        # Query that creates one node per item in `$rows`
+        # (see `df2batches`).
+        # Query text depends only on labels.
+        
+        node = f'({NODE}:{labels})' if labels else f'({NODE})'
+        
+        command = f'UNWIND $rows AS row ' \
+            f'CREATE {node} SET {NODE} = row.props ' \
+            f'RETURN row.pos AS pos, ID({NODE}) AS identity'
+            
+        return command
+    
+    @classmethod
+    def convert_bulk_replace( cls ):
+        
+        # Query that fully replaces properties of existing nodes,
+        # one per item in `$rows` = [ { identity: int, props: {} } ].
+        # Old labels are returned so that I can compare them
+        # with the new ones.
+        
+        command = f'UNWIND $rows AS row ' \
+            f'MATCH ({NODE}) WHERE ID({NODE}) = row.identity ' \
+            f'SET {NODE} = row.props ' \
+            f'RETURN ID({NODE}) AS identity, labels({NODE}) AS {LABELS_LIST}'
+            
+        return command
+    
+    @classmethod
+    def get_label_changes( cls, old_labels, new_text ):
+        
+        # Compares a list of labels that node has on server
+        # with the value of reserved column `labels`.
+        # Returns two label strings: `to_remove`, `to_add`.
+        
+        old = set( old_labels )
+        new = set( cls.convert_labels( new_text ).split( LABEL_SEPARATOR ) )
+        new.discard( '' )
+        
+        to_remove = LABEL_SEPARATOR.join( sorted( old - new ) )
+        to_add = LABEL_SEPARATOR.join( sorted( new - old ) )
+        
+        return to_remove, to_add
+    
+    @classmethod
+    def convert_bulk_relabel( cls, to_remove, to_add ):
+        
+        # Query that applies the same label change
+        # to all nodes in `$identities`.
+        
+        command = f'MATCH ({NODE}) WHERE ID({NODE}) IN $identities'
+        if to_remove:
+            command += f' REMOVE {NODE}:{to_remove}'
+        if to_add:
+            command += f' SET {NODE}:{to_add}'
+            
+        return command
+    
     @classmethod
     def fill_reserved_columns( cls, conn, df, db_name=None ):
         
         # reserved columns
         
-        identities = list( df.index.astype(str) )
+        identities = [ int(loc) for loc in df.index ]
         
         # reserved column for labels
         
         query = f'MATCH ({NODE}) ' \
-            f'WHERE toString(ID({NODE})) IN {identities} ' \
-            f'RETURN labels({NODE}) as labels_list'
+            f'WHERE ID({NODE}) IN $identities ' \
+            f'RETURN ID({NODE}) AS identity, labels({NODE}) AS {LABELS_LIST}'
         
-        response = conn.query( query, db_name=db_name )
+        response = conn.query( query, db_name=db_name, params={ 'identities': identities } )
         
         if response is None:
             msg = 'can\'t get a response'
             log.error( msg )
             raise ConnectionError( msg )
-            
-        texts = [ MULTIVALUE_SEPARATOR.join( r['labels_list'] ) for r in response ]
-        df[cls.neo4j_labels] = texts
+        
+        # server does not guarantee the order of records
+        texts = { r['identity']: MULTIVALUE_SEPARATOR.join( r[LABELS_LIST] ) for r in response }
+        df[cls.neo4j_labels] = [ texts.get( loc, '' ) for loc in identities ]
         
 #---------------------------------------------------------------------------+++
-# end 2023.10.14
-# BaseColumns
+# end 2026.10.18
+# response2df columns are record fields again
@@ -30,7 +30,7 @@ from sparkling.common.pyqt5.ActionDefinitionsColumns import ColumnsActionDefinit
 from sparkling.common.TreeNode import TreeNode
 from sparkling.common.pyqt5.TreeModel import TreeModel
 from sparkling.common.pyqt5.TreeView import TreeView
-from sparkling.neo4j.Columns import Columns as c, NODE
+from sparkling.neo4j.Neo4jColumns import ColumnsNeo4j as c, NODE
 
 def get_progressive_filter( fields_to_filter_by, chosen_tree_node ):
     
@@ -53,11 +53,11 @@ def get_progressive_filter( fields_to_filter_by, chosen_tree_node ):
     for coliloc, value in enumerate( their_values[::-1] ):
         col = fields_to_filter_by[coliloc]
         if value==NeoTreeView.Strings.MISSING_VALUE:
-            condition = f'{c.NODE}.{col} IS NULL'
+            condition = f'{NODE}.{col} IS NULL'
             conditions.append( condition )
         else:
             value = re.sub( r'([\\\"\'])', r'\\\1', value )
-            condition = f'{c.NODE}.{col} = \'{value}\''
+            condition = f'{NODE}.{col} = \'{value}\''
             conditions.append( condition )
     
     # obtain full command
@@ -119,24 +119,24 @@ class NeoTreeView( TreeView ):
         
         # obtain command
         
-        node = self.conn.convert_node(
-            c.NODE, self.conn.current_label
+        node, params = self.conn.Columns.convert_node(
+            NODE, self.conn.current_label
             )
         
         command = None
         if depth_level==0:
             # this is top-level item
-            command = f'MATCH {node} RETURN DISTINCT {c.NODE}.{col}'
+            command = f'MATCH {node} RETURN DISTINCT {NODE}.{col}'
         else:
             # this is nested item
             conditions = get_progressive_filter(
                 self.depth_level_data, chosen_node )
-            command = f'MATCH {node} WHERE {conditions} RETURN DISTINCT {c.NODE}.{col}'
+            command = f'MATCH {node} WHERE {conditions} RETURN DISTINCT {NODE}.{col}'
         
         # obtain response
         
         response = self.conn.query(
-            command, db_name=self.db_name )
+            command, db_name=self.db_name, params=params )
         
         if response is None:
             # nothing to append chosen node with
@@ -147,7 +147,7 @@ class NeoTreeView( TreeView ):
         rows = []
         col = self.depth_level_data[ depth_level ]
         for record in response:
-            rows.append( record[ f'{c.NODE}.{col}' ] )
+            rows.append( record[ f'{NODE}.{col}' ] )
         
         # append to tree
         
@@ -211,7 +211,7 @@ class NeoTreeView( TreeView ):
             )
         if response is None: return
         
-        df = self.conn.response2df( response )
+        df = c.response2df( response )
         
         self.SEND_TO_PLAYLIST.emit( df )
         
@@ -219,5 +219,5 @@ class NeoTreeView( TreeView ):
         self._conn = conn
         
 #---------------------------------------------------------------------------+++
-# end 2023.05.11
-# wip
\ No newline at end of file
+# end 2026.10.18
+# convert_node returns params
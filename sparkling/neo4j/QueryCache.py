@@ -0,0 +1,294 @@
+# -*- coding: utf-8 -*-
+#Python utility "Neo4J Query Cache". Allows to reuse responses of identical read queries to a Neo4J server. Copyright (C) 2023 Anna Anikina
+#
+#This program is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#This program is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+#---------------------------------------------------------------------------+++
+
+# logging
+import logging
+log = logging.getLogger(__name__)
+
+# embedded in python
+from collections import OrderedDict
+from re import ( sub as resubstitute, finditer, search, DOTALL, IGNORECASE )
+from threading import Lock
+from time import monotonic
+# same project
+from sparkling.common.BaseColumns import BaseColumns
+
+# how much memory cached responses may take, roughly
+CACHE_MAX_BYTES_DEFAULT = 64*1024*1024
+
+# how long a cached response stays valid, seconds
+CACHE_TTL_DEFAULT = 300
+
+# queries with these clauses change db and are never cached
+WRITE_CLAUSES_PATTERN = r'\b(?:CREATE|MERGE|SET|DELETE|REMOVE|DROP|LOAD\s+CSV|FOREACH)\b'
+
+# procedures that only read, `CALL` of any other
+# procedure may change db
+READ_PROCEDURES = [
+    'db.index.fulltext.queryNodes',
+    'db.index.fulltext.queryRelationships',
+    'db.labels',
+    'db.propertyKeys',
+    'db.relationshipTypes',
+    'db.schema.visualization',
+    'db.schema.nodeTypeProperties',
+    'db.schema.relTypeProperties',
+    'db.indexes',
+    'db.constraints',
+    'dbms.components',
+    'dbms.procedures',
+    'dbms.functions',
+    ]
+
+class ColumnsCacheStats( BaseColumns ):
+    
+    # `QueryCache.stats` returns a dictionary
+    # with these keys.
+    
+    hits = 'hits'
+    misses = 'misses'
+    
+    # entries removed because of memory budget
+    evictions = 'evictions'
+    
+    # entries removed because they were too old
+    expirations = 'expirations'
+    
+    # entries removed because their db was written to
+    invalidations = 'invalidations'
+    
+    n_entries = 'n_entries'
+    n_bytes = 'n_bytes'
+
+def strip_literals( query ):
+    
+    # Replaces string literals and backticked names with
+    # empty ones and removes comments, so that keywords
+    # are found only where they are keywords.
+    
+    pattern = r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"|`[^`]*`|//[^\n]*|/\*.*?\*/"
+    
+    def strip( match ):
+        text = match.group(0)
+        return ' ' if text[0]=='/' else text[0]*2
+    
+    return resubstitute( pattern, strip, query, flags=DOTALL )
+
+def is_write_query( query ):
+    
+    query = strip_literals( query )
+    
+    read_procedures = [ name.lower() for name in READ_PROCEDURES ]
+    for match in finditer( r'\bCALL\s+([\w.]+)', query, flags=IGNORECASE ):
+        if not match.group(1).lower() in read_procedures:
+            return True
+    
+    # property keys (`n.set`), labels (`n:Set`), map keys
+    # (`{set: 1}`) and parameters (`$set`) are not clauses
+    query = resubstitute( r'\.\s*\w+|\$\w+|\w+(?=\s*:)|:\s*\w+', ' ', query )
+    return not search( WRITE_CLAUSES_PATTERN, query, flags=IGNORECASE ) is None
+
+def _freeze( value ):
+    
+    # Converts query params into something hashable.
+    
+    if type(value) is dict:
+        return tuple(sorted([ ( k, _freeze(v) ) for k, v in value.items() ]))
+    if type(value) in [ list, tuple, set ]:
+        return tuple([ _freeze(v) for v in value ])
+    return value
+
+def _estimate_size( response ):
+    
+    # Rough size of a response in bytes. Most values
+    # I store are str, so their length is good enough.
+    
+    size = 0
+    for r in response:
+        for v in r.values():
+            items = v.items() if hasattr( v, 'items' ) else [ ( '', v ) ]
+            for k, value in items:
+                size += len( k ) + len( str(value) ) + 16
+    return size
+
+class QueryCache:
+    
+    # Remembers responses of read queries.
+    
+    # Entries are kept in LRU order and evicted when
+    # their total size exceeds `max_bytes`. An entry
+    # older than `ttl` seconds is never returned.
+    # Whenever something is written to a db, all
+    # entries of that db must be dropped via `invalidate`.
+    
+    # Responses are shared between callers, so
+    # they must not be modified.
+    
+    # A read may race with a write to the same db: capture
+    # `generation` before the read and pass it to `put`,
+    # a response that may be outdated is not cached.
+    
+    _max_bytes = None
+    _ttl = None
+    
+    # key = ( db_name, query, params ),
+    # value = ( timestamp, size, response )
+    __entries = None # future OrderedDict
+    __n_bytes = None
+    __stats = None # future dictionary
+    __lock = None
+    
+    # how many times all dbs / each db were invalidated,
+    # key = db_name
+    __generation = None
+    __generations = None # future dictionary
+    
+    def __init__( self, max_bytes=CACHE_MAX_BYTES_DEFAULT, ttl=CACHE_TTL_DEFAULT ):
+        
+        self._max_bytes = max_bytes
+        self._ttl = ttl
+        
+        self.__entries = OrderedDict()
+        self.__n_bytes = 0
+        self.__lock = Lock()
+        self.__generation = 0
+        self.__generations = {}
+        
+        c = ColumnsCacheStats
+        self.__stats = {
+            c.hits: 0,
+            c.misses: 0,
+            c.evictions: 0,
+            c.expirations: 0,
+            c.invalidations: 0,
+            }
+    
+    @staticmethod
+    def key( query, db_name=None, params=None ):
+        return ( db_name, query, _freeze( params ) )
+    
+    def get( self, key ):
+        
+        # Returns cached response or `None`.
+        
+        c = ColumnsCacheStats
+        
+        with self.__lock:
+            
+            entry = self.__entries.get( key )
+            if entry is None:
+                self.__stats[c.misses] += 1
+                return None
+            
+            timestamp, size, response = entry
+            if monotonic() - timestamp > self._ttl:
+                self.__remove( key )
+                self.__stats[c.expirations] += 1
+                self.__stats[c.misses] += 1
+                return None
+            
+            self.__entries.move_to_end( key )
+            self.__stats[c.hits] += 1
+        
+        return response
+    
+    def generation( self, db_name=None ):
+        
+        # Changes whenever entries of given db are invalidated.
+        
+        with self.__lock:
+            return self.__generation_of( db_name )
+    
+    def put( self, key, response, generation=None ):
+        
+        # If `generation` is given and the db was
+        # invalidated since then, `response` is not cached.
+        
+        c = ColumnsCacheStats
+        
+        size = _estimate_size( response )
+        if size > self._max_bytes:
+            # would evict everything else
+            return
+        
+        with self.__lock:
+            
+            if not generation is None and not generation == self.__generation_of( key[0] ):
+                # db was written to while this response
+                # was being downloaded
+                return
+            
+            if key in self.__entries:
+                self.__remove( key )
+            
+            self.__entries[key] = ( monotonic(), size, response )
+            self.__n_bytes += size
+            
+            while self.__n_bytes > self._max_bytes:
+                oldest = next(iter( self.__entries ))
+                self.__remove( oldest )
+                self.__stats[c.evictions] += 1
+    
+    def invalidate( self, db_name=None ):
+        
+        # Drops all entries of given db,
+        # or all entries if `db_name` is `None`.
+        # Entries of the server's default db (`db_name` = `None`)
+        # are always dropped, it may be the same db.
+        
+        c = ColumnsCacheStats
+        
+        with self.__lock:
+            
+            if db_name is None:
+                self.__generation += 1
+            else:
+                for name in [ db_name, None ]:
+                    self.__generations[name] = self.__generations.get( name, 0 ) + 1
+            
+            keys = [ key for key in self.__entries if db_name is None or key[0] in [ db_name, None ] ]
+            for key in keys:
+                self.__remove( key )
+            self.__stats[c.invalidations] += len( keys )
+        
+        if len( keys ) > 0:
+            log.debug( f'dropped {len(keys)} cached responses of db {db_name}' )
+    
+    def stats( self ):
+        
+        # For tuning. See `ColumnsCacheStats`.
+        
+        c = ColumnsCacheStats
+        
+        with self.__lock:
+            stats = dict( self.__stats )
+            stats[c.n_entries] = len( self.__entries )
+            stats[c.n_bytes] = self.__n_bytes
+        
+        return stats
+    
+    def __generation_of( self, db_name ):
+        return ( self.__generation, self.__generations.get( db_name, 0 ) )
+    
+    def __remove( self, key ):
+        _, size, _ = self.__entries.pop( key )
+        self.__n_bytes -= size
+
+#---------------------------------------------------------------------------+++
+# end 2026.10.18
+# is_write_query ignores literals and names, detects procedures
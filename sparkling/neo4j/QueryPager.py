@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+#Python utility "Neo4J Query Pager". Allows to download results of a Neo4J query page by page. Copyright (C) 2023 Anna Anikina
+#
+#This program is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#This program is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+#---------------------------------------------------------------------------+++
+
+# logging
+import logging
+log = logging.getLogger(__name__)
+
+# embedded in python
+from threading import Lock
+
+# how many nodes are downloaded at once
+PAGE_SIZE_DEFAULT = 1000
+
+# how many nodes are downloaded at most
+# when a query can't be paged
+UNPAGED_LIMIT_DEFAULT = 10000
+
+class QueryPager:
+    
+    # Downloads results of a single query that ends
+    # with `RETURN n`, one page at a time, as df.
+    # See `Columns.convert_paged` for how queries are paged.
+    
+    # Designed to be a page source of `PandasTableModel`:
+    # `fetch( page_size )` returns the next page or `None`
+    # if the query failed. A page shorter than `page_size`
+    # is the last one.
+    
+    _conn = None
+    _db_name = None
+    _params = None
+    _columns = None
+    _node_variable_name = None
+    
+    # `None` = query can't be paged
+    _paged_query = None
+    _is_keyset = None
+    
+    __n_fetched = None
+    __last_identity = None
+    __exhausted = None
+    __lock = None
+    
+    def __init__( self, conn, query, db_name=None, params=None, columns=None, node_variable_name=None ):
+        
+        self._conn = conn
+        self._db_name = db_name
+        self._params = {} if params is None else dict( params )
+        self._columns = columns
+        self._node_variable_name = node_variable_name
+        
+        paged = conn.Columns.convert_paged( query, node_variable_name=node_variable_name )
+        if not paged is None:
+            self._paged_query, self._is_keyset = paged
+        
+        self.__n_fetched = 0
+        self.__last_identity = -1
+        self.__exhausted = False
+        self.__lock = Lock()
+    
+    def is_pageable( self ):
+        return not self._paged_query is None
+    
+    def is_exhausted( self ):
+        return self.__exhausted
+    
+    def n_fetched( self ):
+        return self.__n_fetched
+    
+    def fetch( self, page_size=PAGE_SIZE_DEFAULT ):
+        
+        # Downloads the next page.
+        # May be called from any thread, pages
+        # are downloaded one after another.
+        
+        if not self.is_pageable():
+            raise ValueError( 'this query can\'t be paged' )
+        
+        c = self._conn.Columns
+        
+        with self.__lock:
+            
+            if self.__exhausted:
+                return c.response2df_with_labels( [], columns=self._columns )
+            
+            params = dict( self._params )
+            params['page_limit'] = page_size
+            if self._is_keyset:
+                params['page_after'] = self.__last_identity
+            else:
+                params['page_skip'] = self.__n_fetched
+            
+            df = c.load_df(
+                self._conn, self._paged_query,
+                db_name=self._db_name, params=params, columns=self._columns,
+                node_variable_name=self._node_variable_name,
+                cache=False ) # pages are never asked twice
+            if df is None:
+                log.error( f'failed to download page {self.__n_fetched}+{page_size} from db {self._db_name}' )
+                return
+            
+            self.__n_fetched += len( df.index )
+            if len( df.index ) > 0:
+                self.__last_identity = int( df.index[-1] )
+            if len( df.index ) < page_size:
+                self.__exhausted = True
+        
+        return df
+
+#---------------------------------------------------------------------------+++
+# end 2026.10.18
+# pages bypass the cache
@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+#Python utility "Neo4J Query Stats". Allows to find out which queries to a Neo4J server are slow. Copyright (C) 2023 Anna Anikina
+#
+#This program is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#This program is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+#---------------------------------------------------------------------------+++
+
+# logging
+import logging
+log = logging.getLogger(__name__)
+
+# embedded in python
+from bisect import bisect_left
+from collections import deque
+from logging.handlers import RotatingFileHandler
+from re import ( sub as resubstitute )
+from threading import Lock
+# same project
+from sparkling.common.BaseColumns import BaseColumns
+
+# how many recent calls of each query shape are remembered
+WINDOW_DEFAULT = 200
+
+# calls slower than this are written to slow query log, seconds
+SLOW_QUERY_SECONDS_DEFAULT = 1.0
+
+# upper edges of histogram buckets, seconds
+HISTOGRAM_EDGES = [ 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, float('inf') ]
+
+# separate logger, so that slow queries can be
+# written to their own file
+slow_log = logging.getLogger( __name__ + '.slow' )
+
+class ColumnsQueryStats( BaseColumns ):
+    
+    # `QueryStats.top` returns a list of dictionaries
+    # with these keys.
+    
+    shape = 'shape'
+    db_names = 'db_names'
+    
+    # all calls since start
+    n_calls = 'n_calls'
+    total_seconds = 'total_seconds'
+    
+    # recent calls only (see `WINDOW_DEFAULT`)
+    mean_seconds = 'mean_seconds'
+    p95_seconds = 'p95_seconds'
+    max_seconds = 'max_seconds'
+    mean_records = 'mean_records'
+    histogram = 'histogram' # counts per `HISTOGRAM_EDGES`
+    
+    n_slow = 'n_slow'
+    
+    # `PROFILE` / `EXPLAIN` summary of a slow call, or `None`
+    plan = 'plan'
+
+def normalize_query( query ):
+    
+    # Converts query into it's `shape`: literals are
+    # replaced with `?`, whitespace is collapsed.
+    # Queries that differ only in values have the same shape.
+    
+    shape = resubstitute( r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"", '?', query )
+    shape = resubstitute( r'(?<![\w$])-?\d+(?:\.\d+)?\b', '?', shape )
+    shape = resubstitute( r'\[\s*\?(?:\s*,\s*\?)*\s*\]', '[?]', shape )
+    shape = resubstitute( r'\s+', ' ', shape )
+    return shape.strip()
+
+def summarize_plan( plan ):
+    
+    # Converts `ResultSummary.profile` / `.plan` into
+    # a short dictionary: operators and db hits.
+    
+    if plan is None:
+        return None
+    
+    operators = []
+    db_hits = 0
+    rows = 0
+    
+    nodes = [ plan ]
+    while len( nodes ) > 0:
+        node = nodes.pop()
+        operators.append( node.get( 'operatorType', '?' ) )
+        db_hits += node.get( 'dbHits', 0 )
+        rows = max( rows, node.get( 'rows', 0 ) )
+        nodes.extend( node.get( 'children', [] ) )
+    
+    return {
+        'operators': ' <- '.join( operators ),
+        'db_hits': db_hits,
+        'max_rows': rows,
+        }
+
+class QueryStats:
+    
+    # Collects timings of queries, grouped by query shape.
+    # Thread safe, single instance is shared by all connections
+    # (see `QUERY_STATS`).
+    
+    # Whenever a call takes longer then `slow_query_seconds`,
+    # it is written to `slow_log`. If `capture_plans`, connection
+    # is asked to capture `PROFILE` of read queries / `EXPLAIN` of
+    # write queries, once per shape. `PROFILE` runs
+    # the read query again, see `Connection.capture_plan`.
+    
+    slow_query_seconds = None
+    capture_plans = None
+    
+    _window = None
+    
+    # key = shape, value = dictionary
+    __shapes = None
+    __lock = None
+    __slow_log_handler = None
+    
+    def __init__( self, window=WINDOW_DEFAULT, slow_query_seconds=SLOW_QUERY_SECONDS_DEFAULT, capture_plans=False ):
+        
+        self.slow_query_seconds = slow_query_seconds
+        self.capture_plans = capture_plans
+        
+        self._window = window
+        self.__shapes = {}
+        self.__lock = Lock()
+    
+    def set_slow_log( self, dst, max_bytes=1024*1024, backup_count=3 ):
+        
+        # Slow queries will be written to a rotating file.
+        
+        if not self.__slow_log_handler is None:
+            slow_log.removeHandler( self.__slow_log_handler )
+            self.__slow_log_handler.close()
+        
+        handler = RotatingFileHandler( dst, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8' )
+        handler.setFormatter( logging.Formatter( '%(asctime)s %(message)s' ) )
+        slow_log.addHandler( handler )
+        slow_log.setLevel( logging.INFO )
+        self.__slow_log_handler = handler
+    
+    def record( self, query, db_name, seconds, n_records ):
+        
+        # Remembers a single call.
+        # Returns `True` if I want this call's plan.
+        
+        c = ColumnsQueryStats
+        
+        shape = normalize_query( query )
+        is_slow = seconds >= self.slow_query_seconds
+        
+        with self.__lock:
+            
+            item = self.__shapes.get( shape )
+            if item is None:
+                item = self.__shapes[shape] = {
+                    c.shape: shape,
+                    c.db_names: set(),
+                    c.n_calls: 0,
+                    c.total_seconds: 0.0,
+                    c.n_slow: 0,
+                    c.plan: None,
+                    'recent': deque( maxlen=self._window ),
+                    # plan was asked for already
+                    'is_planned': False,
+                    }
+            
+            item[c.db_names].add( str(db_name) )
+            item[c.n_calls] += 1
+            item[c.total_seconds] += seconds
+            item['recent'].append( ( seconds, n_records ) )
+            if is_slow:
+                item[c.n_slow] += 1
+            
+            want_plan = is_slow and self.capture_plans and not item['is_planned']
+            if want_plan:
+                item['is_planned'] = True
+        
+        if is_slow:
+            slow_log.info( f'{seconds:.3f}s {n_records} records db {db_name}: {shape}' )
+        
+        return want_plan
+    
+    def set_plan( self, query, plan ):
+        
+        c = ColumnsQueryStats
+        
+        shape = normalize_query( query )
+        with self.__lock:
+            if shape in self.__shapes:
+                self.__shapes[shape][c.plan] = plan
+        
+        if not plan is None:
+            slow_log.info( f'plan {plan}: {shape}' )
+    
+    def top( self, n=10, key=ColumnsQueryStats.total_seconds ):
+        
+        # Returns `n` worst shapes according to `key`.
+        
+        c = ColumnsQueryStats
+        
+        with self.__lock:
+            items = [ ( dict( item ), list( item['recent'] ) ) for item in self.__shapes.values() ]
+        
+        rows = []
+        for item, recent in items:
+            
+            durations = sorted([ seconds for seconds, _ in recent ])
+            histogram = [0]*len( HISTOGRAM_EDGES )
+            for seconds in durations:
+                histogram[ bisect_left( HISTOGRAM_EDGES, seconds ) ] += 1
+            
+            rows.append({
+                c.shape: item[c.shape],
+                c.db_names: sorted( list( item[c.db_names] ) ),
+                c.n_calls: item[c.n_calls],
+                c.total_seconds: item[c.total_seconds],
+                c.mean_seconds: sum( durations )/len( durations ),
+                c.p95_seconds: durations[ min( len(durations)-1, int( 0.95*len(durations) ) ) ],
+                c.max_seconds: durations[-1],
+                c.mean_records: sum([ n_records for _, n_records in recent ])/len( recent ),
+                c.histogram: histogram,
+                c.n_slow: item[c.n_slow],
+                c.plan: item[c.plan],
+                })
+        
+        rows.sort( key=lambda row: row[key], reverse=True )
+        return rows[:n]
+    
+    def report( self, n=10, key=ColumnsQueryStats.total_seconds ):
+        
+        # Human-readable `top`.
+        
+        c = ColumnsQueryStats
+        
+        rows = self.top( n=n, key=key )
+        if len( rows )==0:
+            return 'no queries yet'
+        
+        lines = []
+        for row in rows:
+            lines.append(
+                f'{row[c.total_seconds]:.2f}s total, {row[c.n_calls]} calls, '
+                f'mean {row[c.mean_seconds]:.3f}s, p95 {row[c.p95_seconds]:.3f}s, '
+                f'{row[c.mean_records]:.0f} records, {row[c.n_slow]} slow, '
+                f'db {", ".join(row[c.db_names])}\n'
+                f'    {row[c.shape][:300]}'
+                )
+            if not row[c.plan] is None:
+                lines.append( f'    plan: {row[c.plan]}' )
+        
+        return '\n'.join( lines )
+    
+    def reset( self ):
+        with self.__lock:
+            self.__shapes.clear()
+
+# shared by all connections
+QUERY_STATS = QueryStats()
+
+#---------------------------------------------------------------------------+++
+# end 2026.10.18
+# plans are asked once per shape
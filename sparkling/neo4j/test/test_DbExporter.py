@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+#Python utility "Test for Neo4J Db Exporter". Checks how nodes are saved to disk and how interrupted exports are resumed. Copyright (C) 2023 Anna Anikina
+#
+#This program is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#This program is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+#---------------------------------------------------------------------------+++
+# Run with `pytest`.
+
+# embedded in python
+import logging
+import os
+# pip install
+import pytest
+pd = pytest.importorskip( 'pandas' )
+pytest.importorskip( 'neo4j' )
+# same project
+import sparkling.neo4j.DbExporter as exporter_module
+from sparkling.neo4j.DbExporter import ( DbExporter, ColumnsExportFormats )
+from sparkling.neo4j.Neo4jColumns import ( ColumnsNeo4j, LABELS_LIST, NODE )
+
+class FakeNode( dict ):
+    
+    def __init__( self, identity, properties ):
+        super().__init__( properties )
+        self.id = identity
+
+class FakeConnection:
+    
+    # A db of `nodes`, answers the queries of `DbExporter`.
+    # Pages after `fail_after` pages fail.
+    
+    Columns = ColumnsNeo4j
+    
+    def __init__( self, nodes, fail_after=None ):
+        self.nodes = nodes
+        self.fail_after = fail_after
+        self.n_pages = 0
+    
+    def query( self, query, db_name=None, params=None, cache=True ):
+        
+        assert cache is False
+        
+        if 'count(' in query:
+            return [ { 'n': len( self.nodes ) } ]
+        if 'keys(' in query:
+            keys = set()
+            for node in self.nodes:
+                keys.update( node.keys() )
+            return [ { 'key': key } for key in keys ]
+        
+        if not self.fail_after is None and self.n_pages >= self.fail_after:
+            return None
+        self.n_pages += 1
+        
+        page = [ node for node in self.nodes if node.id > params['last_identity'] ]
+        return [ { NODE: node, LABELS_LIST: [ 'Track' ] } for node in page[ :params['limit'] ] ]
+
+def db():
+    return [ FakeNode( identity, { 'title': f't{identity}' } ) for identity in [ 2, 3, 5, 7, 11 ] ]
+
+def read_csv( dst ):
+    return pd.read_csv( dst, dtype=str, keep_default_na=False )
+
+def test_export_csv( tmp_path ):
+    
+    dst = str( tmp_path / 'full.csv' )
+    conn = FakeConnection( db() )
+    progress = []
+    
+    exporter = DbExporter( conn, 'db', dst, batch_size=2, progress_callback=lambda n, total: progress.append( ( n, total ) ) )
+    assert exporter.run() == 5
+    
+    df = read_csv( dst )
+    assert list( df.columns ) == [ ColumnsNeo4j.identity, ColumnsNeo4j.neo4j_labels, 'title' ]
+    assert list( df[ColumnsNeo4j.identity] ) == [ '2', '3', '5', '7', '11' ]
+    assert list( df['title'] ) == [ 't2', 't3', 't5', 't7', 't11' ]
+    assert set( df[ColumnsNeo4j.neo4j_labels] ) == { 'Track' }
+    assert progress == [ ( 2, 5 ), ( 4, 5 ), ( 5, 5 ) ]
+    
+    # finished, nothing to resume
+    assert not os.path.isfile( exporter.progress_file() )
+
+def test_export_jsonl( tmp_path ):
+    
+    dst = str( tmp_path / 'full.jsonl' )
+    assert DbExporter( FakeConnection( db() ), 'db', dst, fmt=ColumnsExportFormats.jsonl, batch_size=3 ).run() == 5
+    
+    df = pd.read_json( dst, lines=True, dtype=False )
+    assert list( df['title'] ) == [ 't2', 't3', 't5', 't7', 't11' ]
+
+def test_resume( tmp_path ):
+    
+    dst = str( tmp_path / 'full.csv' )
+    
+    # interrupted after the first page
+    exporter = DbExporter( FakeConnection( db(), fail_after=1 ), 'db', dst, batch_size=2 )
+    assert exporter.run() == 2
+    assert os.path.isfile( exporter.progress_file() )
+    
+    # a chunk was written, but progress wasn't saved
+    with open( dst, 'a', encoding='utf-8' ) as f:
+        f.write( '3,Track,unconfirmed\n' )
+    
+    assert DbExporter( FakeConnection( db() ), 'db', dst, batch_size=2 ).run() == 5
+    
+    df = read_csv( dst )
+    assert list( df[ColumnsNeo4j.identity] ) == [ '2', '3', '5', '7', '11' ]
+
+def test_resume_new_properties( tmp_path, caplog ):
+    
+    dst = str( tmp_path / 'full.csv' )
+    assert DbExporter( FakeConnection( db(), fail_after=1 ), 'db', dst, batch_size=2 ).run() == 2
+    
+    # a node got a property that didn't exist
+    # when export started
+    nodes = db()
+    nodes[-1]['year'] = '1999'
+    
+    with caplog.at_level( logging.WARNING ):
+        assert DbExporter( FakeConnection( nodes ), 'db', dst, batch_size=2 ).run() == 5
+    assert "properties ['year'] appeared" in caplog.text
+    
+    assert not 'year' in read_csv( dst ).columns
+    
+    # resume=False starts from scratch
+    assert DbExporter( FakeConnection( nodes ), 'db', dst, batch_size=2 ).run( resume=False ) == 5
+    assert list( read_csv( dst )['year'] ) == [ '', '', '', '', '1999' ]
+
+def test_optional_packages( tmp_path, monkeypatch ):
+    
+    with pytest.raises( ValueError ):
+        DbExporter( FakeConnection( db() ), 'db', str( tmp_path / 'full.xls' ), fmt='xls' )
+    
+    monkeypatch.setattr( exporter_module, 'find_spec', lambda name: None )
+    with pytest.raises( ImportError, match='pip install pyarrow' ):
+        DbExporter( FakeConnection( db() ), 'db', str( tmp_path / 'full' ), fmt=ColumnsExportFormats.parquet )
+    with pytest.raises( ImportError, match='pip install zstandard' ):
+        DbExporter( FakeConnection( db() ), 'db', str( tmp_path / 'full.csv.zst' ), fmt=ColumnsExportFormats.csv_zst )
+    
+    # csv needs nothing
+    DbExporter( FakeConnection( db() ), 'db', str( tmp_path / 'full.csv' ) )
+
+#---------------------------------------------------------------------------+++
+# end 2026.10.18
+# created
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+#Python utility "Test for Neo4J Columns". Checks query rewriting and batching of Neo4J Columns. Copyright (C) 2023 Anna Anikina
+#
+#This program is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#This program is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+#---------------------------------------------------------------------------+++
+# Run with `pytest`.
+
+# embedded in python
+from threading import Lock, get_ident
+# pip install
+import pytest
+pytest.importorskip( 'neo4j' )
+pd = pytest.importorskip( 'pandas' )
+# same project
+from sparkling.neo4j.Neo4jColumns import (
+    ColumnsNeo4j,
+    LABELS_LIST, NODE_IDENTITY, NODE_PROJECTION
+    )
+
+c = ColumnsNeo4j
+
+def test_convert_paged_keyset():
+    
+    assert c.convert_paged( 'MATCH (n:A) WHERE n.x = $x RETURN n;' ) == (
+        'MATCH (n:A) WHERE n.x = $x WITH DISTINCT n WHERE ID(n) > $page_after '
+        'RETURN n ORDER BY ID(n) LIMIT $page_limit',
+        True )
+    assert c.convert_paged( 'MATCH (m) RETURN m AS n' ) == (
+        'MATCH (m) WITH DISTINCT m AS n WHERE ID(n) > $page_after '
+        'RETURN n ORDER BY ID(n) LIMIT $page_limit',
+        True )
+
+def test_convert_paged_keeps_ordering():
+    
+    query = 'MATCH (n) RETURN n ORDER BY n.title DESC'
+    assert c.convert_paged( query ) == ( query + ' SKIP $page_skip LIMIT $page_limit', False )
+    
+    query = 'CALL db.index.fulltext.queryNodes( $index, $search ) YIELD node AS n RETURN n'
+    assert c.convert_paged( query ) == ( query + ' SKIP $page_skip LIMIT $page_limit', False )
+
+def test_convert_paged_refuses():
+    
+    # limited already
+    assert c.convert_paged( 'MATCH (n) RETURN n LIMIT 10' ) is None
+    assert c.convert_paged( 'MATCH (n) RETURN n ORDER BY n.x SKIP 5' ) is None
+    # not a single part
+    assert c.convert_paged( 'MATCH (n:A) RETURN n UNION MATCH (n:B) RETURN n' ) is None
+    # not nodes
+    assert c.convert_paged( 'MATCH (n) RETURN n.title' ) is None
+    assert c.convert_paged( 'MATCH (m) RETURN m' ) is None
+    assert c.convert_paged( 'MATCH (m) RETURN m', node_variable_name='m' ) is not None
+
+def test_convert_limited():
+    
+    assert c.convert_limited( 'MATCH (n) RETURN n ORDER BY n.x', 100 ) \
+        == 'MATCH (n) RETURN n ORDER BY n.x LIMIT 100'
+    assert c.convert_limited( 'MATCH (n) RETURN n LIMIT 5;', 100 ) \
+        == 'MATCH (n) RETURN n LIMIT 5'
+    assert c.convert_limited( 'MATCH (n:A) RETURN n UNION MATCH (n:B) RETURN n', 100 ) \
+        == 'CALL { MATCH (n:A) RETURN n UNION MATCH (n:B) RETURN n } RETURN n LIMIT 100'
+    assert c.convert_limited( 'MATCH (n) RETURN count(n)', 100 ) is None
+
+def test_convert_return_with_labels():
+    
+    assert c.convert_return_with_labels( 'MATCH (n) RETURN n ORDER BY n.title' ) \
+        == f'MATCH (n) RETURN n, labels(n) AS {LABELS_LIST} ORDER BY n.title'
+    
+    # labels of every part, not only of the last one
+    assert c.convert_return_with_labels( 'MATCH (n:A) RETURN n UNION MATCH (n:B) RETURN n;' ) \
+        == 'CALL { MATCH (n:A) RETURN n UNION MATCH (n:B) RETURN n } ' \
+        f'RETURN n, labels(n) AS {LABELS_LIST}'
+    # not a top-level `UNION`
+    assert c.convert_return_with_labels( 'MATCH (n {title: "a UNION b"}) RETURN n' ) \
+        == f'MATCH (n {{title: "a UNION b"}}) RETURN n, labels(n) AS {LABELS_LIST}'
+    assert c.convert_return_with_labels( 'CALL { MATCH (n:A) RETURN n UNION MATCH (n:B) RETURN n } RETURN n' ) \
+        == 'CALL { MATCH (n:A) RETURN n UNION MATCH (n:B) RETURN n } ' \
+        f'RETURN n, labels(n) AS {LABELS_LIST}'
+    
+    assert c.convert_return_with_labels( 'MATCH (n) RETURN n.title' ) is None
+
+def test_convert_return_projected():
+    
+    query = c.convert_return_projected(
+        'MATCH (n) RETURN n ORDER BY n.title',
+        [ 'title', 'odd`name', c.identity, c.neo4j_labels ] )
+    assert query == 'MATCH (n) ' \
+        f'RETURN ID(n) AS {NODE_IDENTITY}, ' \
+        f'n{{.`title`, .`odd``name`}} AS {NODE_PROJECTION}, ' \
+        f'labels(n) AS {LABELS_LIST} ' \
+        'ORDER BY n.title'
+    
+    # only the last `RETURN` is projected
+    query = c.convert_return_projected( 'CALL { MATCH (n) RETURN n } RETURN n', [ 'title' ] )
+    assert query.startswith( 'CALL { MATCH (n) RETURN n } RETURN ID(n)' )
+    
+    # every part of a `UNION` is projected
+    query = c.convert_return_projected( 'MATCH (n:A) RETURN n UNION MATCH (n:B) RETURN n', [ 'title' ] )
+    assert query == 'CALL { MATCH (n:A) RETURN n UNION MATCH (n:B) RETURN n } ' \
+        f'RETURN ID(n) AS {NODE_IDENTITY}, ' \
+        f'n{{.`title`}} AS {NODE_PROJECTION}, ' \
+        f'labels(n) AS {LABELS_LIST}'
+
+def test_convert_return_projected_refuses():
+    
+    # projected maps of different nodes may be equal
+    assert c.convert_return_projected( 'MATCH (n) RETURN DISTINCT n', [ 'title' ] ) is None
+    # customized already
+    assert c.convert_return_projected( f'MATCH (n) RETURN n, labels(n) AS {LABELS_LIST}', [ 'title' ] ) is None
+    assert c.convert_return_projected( 'MATCH (n) RETURN n.title', [ 'title' ] ) is None
+
+class FakeNode( dict ):
+    
+    def __init__( self, identity, properties ):
+        super().__init__( properties )
+        self.id = identity
+
+def test_response2df():
+    
+    response = [
+        { 'n': FakeNode( 3, { 'title': 'a', 'year': '1999' } ) },
+        { 'n': FakeNode( 1, { 'title': 'b' } ) },
+        ]
+    
+    df = c.response2df( response, identity=True )
+    assert list( df.index ) == [ 3, 1 ]
+    assert list( df['year'] ) == [ '1999', '' ]
+    assert list( df[c.identity] ) == [ 3, 1 ]
+    
+    df = c.response2df( response, properties=[ 'year' ] )
+    assert list( df.columns ) == [ 'year' ]
+    
+    # records that are not nodes
+    df = c.response2df( [ { 'key': 'a', 'n': 2 }, { 'key': 'b', 'n': 5 } ], columns=True )
+    assert df.to_dict( 'records' ) == [ { 'key': 'a', 'n': 2 }, { 'key': 'b', 'n': 5 } ]
+    
+    assert c.response2df( [] ) is None
+
+def test_df2batches():
+    
+    df = pd.DataFrame({
+        'title': [ 'a', 'b', None, '' ],
+        'year': [ 1999, 2000, 2001, 2002 ],
+        c.identity: [ 1, 2, 3, 4 ],
+        c.neo4j_labels: [ 'A; B', 'B:A', 'C', '' ],
+        })
+    
+    assert c.df2batches( df ) == {
+        'A:B': [
+            { 'pos': 0, 'props': { 'title': 'a', 'year': '1999' } },
+            { 'pos': 1, 'props': { 'title': 'b', 'year': '2000' } },
+            ],
+        'C': [ { 'pos': 2, 'props': { 'year': '2001' } } ],
+        '': [ { 'pos': 3, 'props': { 'year': '2002' } } ],
+        }
+
+def test_df2batches_without_labels():
+    
+    df = pd.DataFrame({ 'title': [ 'a', 'b' ] })
+    assert c.df2batches( df ) == {
+        '': [
+            { 'pos': 0, 'props': { 'title': 'a' } },
+            { 'pos': 1, 'props': { 'title': 'b' } },
+            ],
+        }
+
+class FakeConnection:
+    
+    # Answers lookups by identity with projected nodes,
+    # node `identity` has `title` = str(identity).
+    # Remembers which threads asked and closed sessions.
+    
+    def __init__( self, missing=() ):
+        self.missing = set( missing )
+        self.asked = set()
+        self.closed = set()
+        self.lock = Lock()
+    
+    def query( self, query, db_name=None, params=None, cache=True ):
+        with self.lock:
+            self.asked.add( get_ident() )
+        return [ {
+            NODE_IDENTITY: identity,
+            NODE_PROJECTION: { 'title': str(identity) },
+            LABELS_LIST: [ 'Track' ],
+            } for identity in params['identities'] if not identity in self.missing ]
+    
+    def close_thread_session( self, db_name=None ):
+        with self.lock:
+            self.closed.add( get_ident() )
+
+def test_load_df_by_identities():
+    
+    conn = FakeConnection( missing=[ 4 ] )
+    df = c.load_df_by_identities( conn, [ 5, 3, 4, 1, 5, 2 ], columns=[ 'title' ], chunk_size=2, max_workers=2 )
+    
+    # same order, missing nodes are skipped
+    assert list( df.index ) == [ 5, 3, 1, 5, 2 ]
+    assert list( df['title'] ) == [ '5', '3', '1', '5', '2' ]
+    
+    # worker threads don't keep their sessions
+    assert len( conn.asked ) > 0 and conn.asked == conn.closed
+    
+    # a single chunk is downloaded right here
+    conn = FakeConnection()
+    df = c.load_df_by_identities( conn, [ 2, 1 ], columns=[ 'title' ] )
+    assert list( df.index ) == [ 2, 1 ]
+    assert conn.asked == set([ get_ident() ]) and conn.closed == set()
+
+#---------------------------------------------------------------------------+++
+# end 2026.10.18
+# created
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+#Python utility "Test for Query Cache". Checks LRU eviction, expiration and invalidation of cached Neo4J responses. Copyright (C) 2023 Anna Anikina
+#
+#This program is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#This program is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+#---------------------------------------------------------------------------+++
+# Run with `pytest`.
+
+# embedded in python
+# pip install
+import pytest
+pytest.importorskip( 'neo4j' )
+# same project
+import sparkling.neo4j.QueryCache as query_cache
+from sparkling.neo4j.QueryCache import (
+    QueryCache, ColumnsCacheStats,
+    is_write_query
+    )
+
+QUERY = 'MATCH (n) RETURN n'
+
+def response( n_chars=100 ):
+    # `_estimate_size` counts it as `n_chars` + 16 bytes
+    return [ { 'n': 'x'*n_chars } ]
+
+def test_is_write_query():
+    
+    assert not is_write_query( QUERY )
+    assert not is_write_query( 'MATCH (n) WHERE n.created > 0 RETURN n' )
+    assert is_write_query( 'CREATE (n $props) RETURN n' )
+    assert is_write_query( 'MATCH (n) WHERE ID(n) = $identity SET n += $props' )
+    assert is_write_query( 'match (n) detach delete n' )
+    assert is_write_query( 'LOAD  CSV FROM $url AS row RETURN row' )
+
+def test_is_write_query_ignores_literals_and_names():
+    
+    assert not is_write_query( "MATCH (n) WHERE n.title CONTAINS 'set' RETURN n" )
+    assert not is_write_query( 'MATCH (n) WHERE n.title = "it\\"s deleted" RETURN n' )
+    assert not is_write_query( 'MATCH (n) WHERE n.set = 1 AND n.`delete` = $create RETURN n' )
+    assert not is_write_query( 'MATCH (n:Set)-[r:CREATED]->(m { remove: 1 }) RETURN n' )
+    assert not is_write_query( 'MATCH (n) // set them all\nRETURN n' )
+    assert is_write_query( "MATCH (n) WHERE n.title = 'a' SET n:Set" )
+
+def test_is_write_query_procedures():
+    
+    # unknown procedures may write
+    assert is_write_query( "CALL db.createLabel( 'A' )" )
+    assert is_write_query( 'CALL apoc.refactor.rename.label( $old, $new )' )
+    
+    assert not is_write_query( 'CALL db.index.fulltext.queryNodes( "search", $query ) YIELD node RETURN node AS n' )
+    assert not is_write_query( 'CALL db.labels()' )
+    
+    # subqueries are not procedures
+    assert not is_write_query( 'CALL { MATCH (n:A) RETURN n UNION MATCH (n:B) RETURN n } RETURN n LIMIT 10' )
+    assert is_write_query( 'CALL { MATCH (n) DETACH DELETE n }' )
+
+def test_key_ignores_params_order():
+    
+    key1 = QueryCache.key( QUERY, db_name='a', params={ 'x': [1,2], 'y': { 'z': 1 } } )
+    key2 = QueryCache.key( QUERY, db_name='a', params={ 'y': { 'z': 1 }, 'x': [1,2] } )
+    assert key1 == key2
+    assert not key1 == QueryCache.key( QUERY, db_name='b', params={ 'x': [1,2], 'y': { 'z': 1 } } )
+
+def test_lru_eviction():
+    
+    c = ColumnsCacheStats
+    
+    # room for two responses
+    cache = QueryCache( max_bytes=300 )
+    first, second, third = [ cache.key( QUERY, params={ 'i': i } ) for i in range(3) ]
+    
+    cache.put( first, response() )
+    cache.put( second, response() )
+    
+    # `first` becomes the most recently used one
+    assert cache.get( first ) == response()
+    
+    cache.put( third, response() )
+    assert cache.get( second ) is None
+    assert cache.get( first ) == response()
+    assert cache.get( third ) == response()
+    
+    stats = cache.stats()
+    assert stats[c.evictions] == 1
+    assert stats[c.n_entries] == 2
+    assert stats[c.n_bytes] == 2*116
+
+def test_too_big_response_is_not_cached():
+    
+    cache = QueryCache( max_bytes=100 )
+    key = cache.key( QUERY )
+    cache.put( key, response() )
+    assert cache.get( key ) is None
+
+def test_ttl( monkeypatch ):
+    
+    c = ColumnsCacheStats
+    
+    now = [ 1000.0 ]
+    monkeypatch.setattr( query_cache, 'monotonic', lambda: now[0] )
+    
+    cache = QueryCache( ttl=10 )
+    key = cache.key( QUERY )
+    cache.put( key, response() )
+    
+    now[0] += 10
+    assert cache.get( key ) == response()
+    
+    now[0] += 1
+    assert cache.get( key ) is None
+    assert cache.stats()[c.expirations] == 1
+    assert cache.stats()[c.n_entries] == 0
+
+def test_invalidate():
+    
+    cache = QueryCache()
+    key_a = cache.key( QUERY, db_name='a' )
+    key_b = cache.key( QUERY, db_name='b' )
+    key_default = cache.key( QUERY )
+    for key in [ key_a, key_b, key_default ]:
+        cache.put( key, response() )
+    
+    # default db may be the same db
+    cache.invalidate( 'a' )
+    assert cache.get( key_a ) is None
+    assert cache.get( key_default ) is None
+    assert cache.get( key_b ) == response()
+    
+    cache.invalidate()
+    assert cache.get( key_b ) is None
+
+def test_put_after_write_is_skipped():
+    
+    cache = QueryCache()
+    key = cache.key( QUERY, db_name='a' )
+    
+    # written to another db while reading
+    generation = cache.generation( 'a' )
+    cache.invalidate( 'b' )
+    cache.put( key, response(), generation=generation )
+    assert cache.get( key ) == response()
+    
+    # written to the same db while reading
+    generation = cache.generation( 'a' )
+    cache.invalidate( 'a' )
+    cache.put( key, response( 50 ), generation=generation )
+    assert cache.get( key ) is None
+    
+    # everything was written to while reading
+    generation = cache.generation( 'a' )
+    cache.invalidate()
+    cache.put( key, response(), generation=generation )
+    assert cache.get( key ) is None
+
+#---------------------------------------------------------------------------+++
+# end 2026.10.18
+# literals, names and procedures
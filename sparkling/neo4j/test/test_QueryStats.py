@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+#Python utility "Test for Query Stats". Checks how Neo4J queries are converted into their shapes. Copyright (C) 2023 Anna Anikina
+#
+#This program is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#This program is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+#---------------------------------------------------------------------------+++
+# Run with `pytest`.
+
+# embedded in python
+# pip install
+import pytest
+pytest.importorskip( 'neo4j' )
+# same project
+from sparkling.neo4j.QueryStats import normalize_query, QueryStats
+
+def test_literals_become_placeholders():
+    
+    assert normalize_query( "MATCH (n) WHERE n.title = 'abc' AND n.year > 1999 RETURN n" ) \
+        == 'MATCH (n) WHERE n.title = ? AND n.year > ? RETURN n'
+    assert normalize_query( 'MATCH (n) WHERE n.title = "a \\"b\\" c" RETURN n' ) \
+        == 'MATCH (n) WHERE n.title = ? RETURN n'
+    assert normalize_query( 'MATCH (n) WHERE n.x = -1.5 RETURN n' ) \
+        == 'MATCH (n) WHERE n.x = ? RETURN n'
+
+def test_lists_of_literals_collapse():
+    
+    assert normalize_query( 'MATCH (n) WHERE ID(n) IN [1, 2, 3] RETURN n' ) \
+        == 'MATCH (n) WHERE ID(n) IN [?] RETURN n'
+    assert normalize_query( 'MATCH (n) WHERE ID(n) IN [7] RETURN n' ) \
+        == normalize_query( 'MATCH (n) WHERE ID(n) IN [1,2,3,4,5] RETURN n' )
+
+def test_names_and_params_are_kept():
+    
+    assert normalize_query( 'MATCH (n2) WHERE n2.v1 = $p1 RETURN n2 LIMIT $page_10' ) \
+        == 'MATCH (n2) WHERE n2.v1 = $p1 RETURN n2 LIMIT $page_10'
+
+def test_whitespace_collapses():
+    
+    assert normalize_query( '  MATCH (n)\n    WHERE n.x = 1\tRETURN n  ' ) \
+        == 'MATCH (n) WHERE n.x = ? RETURN n'
+
+def test_plan_is_asked_once_per_shape():
+    
+    stats = QueryStats( slow_query_seconds=1.0, capture_plans=True )
+    
+    assert not stats.record( 'MATCH (n) WHERE n.x = 1 RETURN n', None, 0.5, 1 )
+    assert stats.record( 'MATCH (n) WHERE n.x = 1 RETURN n', None, 2.0, 1 )
+    # not even while the first plan is still being captured
+    assert not stats.record( 'MATCH (n) WHERE n.x = 2 RETURN n', None, 2.0, 1 )
+    stats.set_plan( 'MATCH (n) WHERE n.x = 1 RETURN n', None )
+    assert not stats.record( 'MATCH (n) WHERE n.x = 2 RETURN n', None, 2.0, 1 )
+    
+    stats.capture_plans = False
+    assert not stats.record( 'MATCH (m) RETURN m', None, 2.0, 1 )
+
+#---------------------------------------------------------------------------+++
+# end 2026.10.18
+# plans are asked once